@@ -5,11 +5,19 @@ compute_resume_jd_scores.py
 - Fetches resume chunk vectors from Pinecone namespace 'Resumes'
 - Fetches JD vectors from Pinecone namespace 'Job_Descriptions'
 - Computes cosine similarity between every resume chunk and every JD vector
+  (vectorized: normalized float32 matrices + one matrix multiply, see scoring_engine.py)
+- With --tiled, walks the resumes in fixed-size blocks sized by a memory budget and
+  streams each block's rows to the CSV, so peak memory does not grow with corpus size
 - Writes chunk-level scores to resume_jd_scores.csv
 - Aggregates chunk scores to candidate-level using section-weighted mean and writes candidate_jd_scores.csv
 
 Usage:
   python compute_resume_jd_scores.py
+  python compute_resume_jd_scores.py --tiled --memory-budget-mb 1024   # bounded memory for large corpora
+  python compute_resume_jd_scores.py --top-k 50                        # only the 50 best chunks/candidates per JD
+  python compute_resume_jd_scores.py --from-mirror .vector_mirror      # read vectors from the local mirror
+  python compute_resume_jd_scores.py --from-mirror .vector_mirror --incremental   # rescore only what changed
+  python compute_resume_jd_scores.py --mode query --top-k 200          # server-side top-K per JD (index.query)
 
 Environment required:
   - PINECONE_API_KEY
@@ -21,8 +29,9 @@ import os
 import sys
 import csv
 import math
-from collections import defaultdict
-from typing import List, Dict
+import heapq
+import argparse
+from typing import List, Dict, Tuple
 from pathlib import Path
 
 # --- Config ---
@@ -30,7 +39,13 @@ RESUMES_NS = "Resumes"
 JDS_NS = "Job_Descriptions"
 OUT_CHUNK_CSV = "resume_jd_scores.csv"
 OUT_CAND_CSV = "candidate_jd_scores.csv"
-LIST_LIMIT = 100  # how many ids to list in namespaces (adjust/paginate if needed)
+LIST_LIMIT = 100  # ids per list() page; listing follows pagination to the end of the namespace
+LIST_WORKERS = 4  # concurrent prefix walkers when --id-prefixes is given
+FETCH_BATCH = 100  # max ids per index.fetch call
+FETCH_WORKERS = 8  # concurrent fetch requests (pooled connections)
+DEFAULT_MEMORY_BUDGET_MB = 512  # per-block budget in --tiled mode
+TOP_PRINT = 200  # chunk-level rows printed to the console
+QUERY_TOP_K = 100  # default chunks retrieved per JD in --mode query (Pinecone allows up to 1000 with metadata)
 
 # Section weights: tweak as necessary
 SECTION_WEIGHTS = {
@@ -60,121 +75,474 @@ except Exception as e:
     print("ERROR: Failed to import Pinecone client. Ensure correct venv and pinecone package installed.")
     raise
 
+import numpy as np
+from pinecone_io import list_all_ids, open_index, fetch_vectors, fetch_matrix, query_many
+from score_cache import ScoreCache, content_hashes, CACHE_DIR
+from scoring_engine import (l2_normalize, score_matrix, rows_for_budget, top_pairs,
+                            topk_per_column, ColumnTopK)
+
 pc = Pinecone(api_key=PINECONE_KEY)
-index = pc.Index(INDEX_NAME)
+index = open_index(pc, INDEX_NAME, pool_threads=FETCH_WORKERS)
+MIRRORS = {}  # namespace -> vector_mirror.NamespaceMirror when running --from-mirror
 
 # -------------------- Helpers --------------------
-def cosine_similarity(a: List[float], b: List[float]) -> float:
-    if not a or not b:
-        return 0.0
-    if len(a) != len(b):
-        n = min(len(a), len(b))
-        a = a[:n]; b = b[:n]
-    dot = sum(x * y for x, y in zip(a, b))
-    na = math.sqrt(sum(x * x for x in a))
-    nb = math.sqrt(sum(y * y for y in b))
-    if na == 0 or nb == 0:
-        return 0.0
-    return dot / (na * nb)
-
-def safe_get_vector_values(vobj):
-    # Accept dict-like or object-like from various SDK shapes
-    if vobj is None:
-        return []
-    if isinstance(vobj, dict):
-        if "values" in vobj and isinstance(vobj["values"], (list, tuple)):
-            return list(vobj["values"])
-        if "vector" in vobj and isinstance(vobj["vector"], (list, tuple)):
-            return list(vobj["vector"])
-    vals = getattr(vobj, "values", None) or getattr(vobj, "vector", None)
-    if isinstance(vals, (list, tuple)):
-        return list(vals)
-    # final fallback
-    return []
-
-def safe_get_metadata(vobj):
-    if vobj is None:
-        return {}
-    if isinstance(vobj, dict):
-        return vobj.get("metadata", {}) or {}
-    meta = getattr(vobj, "metadata", None)
-    if isinstance(meta, dict):
-        return meta
-    return {}
-
-def list_vector_ids(namespace: str, limit: int = LIST_LIMIT) -> List[str]:
+def list_vector_ids(namespace: str, limit: int = LIST_LIMIT, prefixes: List[str] = None,
+                    workers: int = LIST_WORKERS) -> List[str]:
     """
-    Returns a list of vector ids in the namespace (best-effort).
-    For large corpora, replace with paginated listing.
+    Returns every vector id in the namespace: follows pagination tokens to the end,
+    walking the given id prefixes concurrently (see pinecone_io.iter_vector_ids).
     """
+    if namespace in MIRRORS:
+        return [vid for vid in MIRRORS[namespace].ids()
+                if not prefixes or any(vid.startswith(p) for p in prefixes)]
     try:
-        resp = index.list(namespace=namespace, limit=limit)
+        return list_all_ids(index, namespace, prefixes=prefixes, workers=workers, limit=limit)
     except Exception as e:
         print(f"Could not list vectors for namespace '{namespace}': {e}")
         return []
-    ids = []
-    # resp may be generator, list, or object depending on SDK
-    try:
-        for item in resp:
-            if isinstance(item, str):
-                ids.append(item)
-            elif isinstance(item, list):
-                for it in item:
-                    if isinstance(it, str):
-                        ids.append(it)
-                    elif isinstance(it, dict) and "id" in it:
-                        ids.append(it["id"])
-            elif isinstance(item, dict):
-                # common shape: {'matches': [{'id':...}, ...]}
-                if "matches" in item and isinstance(item["matches"], list):
-                    for m in item["matches"]:
-                        if isinstance(m, dict) and "id" in m:
-                            ids.append(m["id"])
-    except TypeError:
-        # resp not iterable; try dict access
-        if isinstance(resp, dict):
-            if "matches" in resp and isinstance(resp["matches"], list):
-                for m in resp["matches"]:
-                    if isinstance(m, dict) and "id" in m:
-                        ids.append(m["id"])
-    # dedupe preserve order
-    return list(dict.fromkeys(ids))
-
-def fetch_vectors_by_ids(ids: List[str], namespace: str) -> Dict[str, Dict]:
+
+def fetch_vectors_by_ids(ids: List[str], namespace: str, workers: int = FETCH_WORKERS) -> Dict[str, Dict]:
     """
-    Fetch vector objects for ids. Return mapping id -> {'values': [...], 'metadata': {...}}
+    Fetch vector objects for ids in concurrent, retried batches (see pinecone_io.fetch_batches).
+    Return mapping id -> {'values': [...], 'metadata': {...}}
     """
-    if not ids:
-        return {}
-    try:
-        fetched = index.fetch(ids=ids, namespace=namespace)
-    except Exception as e:
-        print(f"Fetch failed for namespace='{namespace}': {e}")
-        return {}
-    out = {}
-    vecs = getattr(fetched, "vectors", None)
-    if vecs is None and isinstance(fetched, dict):
-        vecs = fetched.get("vectors", {})
-    if not vecs:
-        return {}
-    if isinstance(vecs, dict):
-        for vid, vobj in vecs.items():
-            out[vid] = {"values": safe_get_vector_values(vobj), "metadata": safe_get_metadata(vobj)}
+    if namespace in MIRRORS:
+        return MIRRORS[namespace].fetch_vectors(ids)
+    return fetch_vectors(index, ids, namespace, batch_size=FETCH_BATCH, workers=workers)
+
+def fetch_vector_matrix(ids: List[str], namespace: str, dim: int = 0, workers: int = FETCH_WORKERS):
+    """Fetch ids straight into (found_ids, float32 matrix, metadata list), rows in id order."""
+    if namespace in MIRRORS:
+        return MIRRORS[namespace].fetch_matrix(ids, dim=dim)
+    return fetch_matrix(index, ids, namespace, dim=dim, batch_size=FETCH_BATCH, workers=workers)
+
+# -------------------- Candidate aggregation --------------------
+def resolve_candidate_and_section(resume_id: str, meta: Dict) -> Tuple[str, str]:
+    """Candidate id and lower-cased section for a chunk (metadata first, then id heuristics)."""
+    meta = meta or {}
+    candidate = meta.get("candidate_id") or ""
+    if not candidate:
+        candidate = resume_id.split("_chunk")[0] if "_chunk" in resume_id else resume_id
+    # section from metadata or derive from id suffix
+    section = (meta.get("section") or "").strip()
+    if not section:
+        # heuristic: everything after first "_chunkN_" part
+        if "_chunk" in resume_id:
+            try:
+                after = resume_id.split("_chunk", 1)[1]
+                parts = after.split("_")
+                # remove leading chunk index token if present (e.g. '1', '1_summary')
+                # assume section tokens are after the chunk index
+                if parts and parts[0].isdigit():
+                    section = "_".join(parts[1:]) if len(parts) > 1 else ""
+                else:
+                    section = "_".join(parts)
+            except Exception:
+                section = ""
+    return candidate, section.lower()
+
+def section_weight(section: str) -> float:
+    # choose canonical key
+    sec_key = section.split("_")[0] if section else ""
+    # exact match first, then full section, then default
+    return SECTION_WEIGHTS.get(sec_key, SECTION_WEIGHTS.get(section, DEFAULT_WEIGHT))
+
+class CandidateAggregator:
+    """
+    Running candidate x JD aggregates (max_score, weighted_mean, chunks_count),
+    fed one score tile at a time so the full chunk x JD matrix never has to be kept.
+
+    Each chunk is resolved once to an integer candidate code and a section weight;
+    a tile is then folded in with segment reductions (rows grouped by code via one
+    stable argsort, reduced with np.maximum.reduceat / np.add.reduceat).
+    """
+    def __init__(self, n_jds: int):
+        self.n_jds = n_jds
+        self.codes: Dict[str, int] = {}  # candidate_id -> row in the aggregate matrices
+        self.max_scores = np.full((0, n_jds), -np.inf, dtype=np.float64)
+        self.weighted_sums = np.zeros((0, n_jds), dtype=np.float64)
+        self.weight_sums = np.zeros(0, dtype=np.float64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self._weight_cache: Dict[str, float] = {}
+
+    def _grow(self, n: int) -> None:
+        cap = self.max_scores.shape[0]
+        if n <= cap:
+            return
+        new_cap = max(n, 2 * cap, 64)
+        pad = new_cap - cap
+        self.max_scores = np.vstack([self.max_scores, np.full((pad, self.n_jds), -np.inf)])
+        self.weighted_sums = np.vstack([self.weighted_sums, np.zeros((pad, self.n_jds))])
+        self.weight_sums = np.concatenate([self.weight_sums, np.zeros(pad)])
+        self.counts = np.concatenate([self.counts, np.zeros(pad, dtype=np.int64)])
+
+    def encode(self, resume_ids: List[str], metas: List[Dict]):
+        """Resolve every chunk once -> (candidate codes, section weights)."""
+        codes = np.empty(len(resume_ids), dtype=np.int64)
+        weights = np.empty(len(resume_ids), dtype=np.float64)
+        for row, (rid, meta) in enumerate(zip(resume_ids, metas)):
+            candidate, section = resolve_candidate_and_section(rid, meta)
+            codes[row] = self.codes.setdefault(candidate, len(self.codes))
+            w = self._weight_cache.get(section)
+            if w is None:
+                w = self._weight_cache[section] = section_weight(section)
+            weights[row] = w
+        self._grow(len(self.codes))
+        return codes, weights
+
+    def update(self, resume_ids: List[str], metas: List[Dict], scores) -> None:
+        if not resume_ids:
+            return
+        codes, weights = self.encode(resume_ids, metas)
+        order = np.argsort(codes, kind="stable")
+        codes_sorted = codes[order]
+        starts = np.flatnonzero(np.r_[True, codes_sorted[1:] != codes_sorted[:-1]])
+        seg = codes_sorted[starts]
+        block = scores[order]
+        self.max_scores[seg] = np.maximum(self.max_scores[seg], np.maximum.reduceat(block, starts, axis=0))
+        self.weighted_sums[seg] += np.add.reduceat(block * weights[order][:, None], starts, axis=0)
+        self.weight_sums += np.bincount(codes, weights=weights, minlength=len(self.weight_sums))
+        self.counts += np.bincount(codes, minlength=len(self.counts))
+
+    def matrices(self):
+        """(candidate ids, max_scores, weighted_means, chunks_count) over all candidates x JDs."""
+        n = len(self.codes)
+        candidates = list(self.codes.keys())
+        ws = self.weight_sums[:n, None]
+        means = np.divide(self.weighted_sums[:n], ws, out=np.zeros((n, self.n_jds)), where=ws > 0)
+        return candidates, self.max_scores[:n], means, self.counts[:n]
+
+    def rows(self, jd_ids: List[str]) -> List[Dict]:
+        """All candidate x JD rows, sorted by weighted_mean (descending, stable)."""
+        candidates, max_scores, means, counts = self.matrices()
+        means = np.round(means, 6)
+        order = np.argsort(-means, axis=None, kind="stable")
+        ci_all, ji_all = np.divmod(order, len(jd_ids))
+        return [self._row(candidates, max_scores, means, counts, ci, ji, jd_ids)
+                for ci, ji in zip(ci_all.tolist(), ji_all.tolist())]
+
+    def top_rows(self, jd_ids: List[str], k: int) -> List[Dict]:
+        """K best candidates per JD by weighted_mean (argpartition, no full sort), grouped by JD."""
+        candidates, max_scores, means, counts = self.matrices()
+        if not candidates:
+            return []
+        rows, _ = topk_per_column(means, k)
+        return [self._row(candidates, max_scores, means, counts, ci, ji, jd_ids)
+                for ji in range(len(jd_ids)) for ci in rows[:, ji].tolist()]
+
+    @staticmethod
+    def _row(candidates, max_scores, means, counts, ci: int, ji: int, jd_ids: List[str]) -> Dict:
+        return {
+            "candidate_id": candidates[ci],
+            "jd_id": jd_ids[ji],
+            "max_score": round(float(max_scores[ci, ji]), 6),
+            "weighted_mean": round(float(means[ci, ji]), 6),
+            "chunks_count": int(counts[ci])
+        }
+
+# -------------------- Tiled scoring --------------------
+def score_resume_blocks(resume_ids: List[str], jd_ids: List[str], jd_mat, block_rows: int,
+                        chunk_writer, aggregator: CandidateAggregator, top_n: int = TOP_PRINT,
+                        chunk_topk: ColumnTopK = None, scored: List[Tuple[str, str]] = None,
+                        fetch_workers: int = FETCH_WORKERS):
+    """
+    Walk resume ids in blocks of `block_rows`: fetch the block, score it against the
+    normalized JD matrix, stream its rows to the chunk CSV and fold it into the
+    candidate aggregates. Only one block of vectors/scores is alive at a time.
+    In top-K mode (chunk_topk given) rows are not written; each block is merged into the
+    per-JD top-K instead and `scored` collects (resume_id, candidate_id) by row number.
+    Returns (rows_written, vectors_found, top_n best (score, resume_id, jd_id)).
+    """
+    rows_written = 0
+    found = 0
+    best = []  # min-heap of (score, resume_id, jd_id)
+    n_blocks = (len(resume_ids) + block_rows - 1) // block_rows
+    for b, start in enumerate(range(0, len(resume_ids), block_rows), start=1):
+        block_ids = resume_ids[start:start + block_rows]
+        if n_blocks > 1:
+            print(f"Scoring block {b}/{n_blocks} ({len(block_ids)} resume ids)...")
+        block_ids, block_mat, metas = fetch_vector_matrix(block_ids, RESUMES_NS, dim=jd_mat.shape[1],
+                                                          workers=fetch_workers)
+        if not block_ids:
+            continue
+        found += len(block_ids)
+        scores = score_matrix(l2_normalize(block_mat), jd_mat)
+
+        if chunk_writer is not None:
+            for ri, rid in enumerate(block_ids):
+                candidate_id = metas[ri].get("candidate_id", "") or ""
+                chunk_writer.writerows([rid, jd_id, f"{s:.6f}", candidate_id]
+                                       for jd_id, s in zip(jd_ids, scores[ri].tolist()))
+            rows_written += scores.size
+        if chunk_topk is not None:
+            chunk_topk.update(scores, row_offset=len(scored))
+            scored.extend((rid, meta.get("candidate_id", "") or "") for rid, meta in zip(block_ids, metas))
+
+        aggregator.update(block_ids, metas, scores)
+
+        for score, ri, ji in top_pairs(scores, top_n):
+            item = (score, block_ids[ri], jd_ids[ji])
+            if len(best) < top_n:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+    return rows_written, found, sorted(best, reverse=True)
+
+def write_candidate_csv(cand_rows: List[Dict]) -> None:
+    with open(OUT_CAND_CSV, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["candidate_id", "jd_id", "max_score", "weighted_mean", "chunks_count"])
+        for r in cand_rows:
+            w.writerow([r["candidate_id"], r["jd_id"], f"{r['max_score']:.6f}", f"{r['weighted_mean']:.6f}", r["chunks_count"]])
+
+def run_top_k(resume_ids: List[str], jd_ids: List[str], jd_mat, block_rows: int,
+              aggregator: CandidateAggregator, k: int, fetch_workers: int = FETCH_WORKERS) -> None:
+    """
+    Top-K mode: keep the K best chunks and K best candidates per JD. Both CSVs keep their
+    schemas but hold only those rows, grouped by JD and best first.
+    """
+    chunk_topk = ColumnTopK(len(jd_ids), k)
+    scored = []
+    _, n_found, _ = score_resume_blocks(resume_ids, jd_ids, jd_mat, block_rows, None, aggregator,
+                                        top_n=0, chunk_topk=chunk_topk, scored=scored,
+                                        fetch_workers=fetch_workers)
+    print(f"Resume vectors available: {n_found}/{len(resume_ids)}")
+    if not n_found:
+        print("ERROR: Missing vectors. Cannot compute scores.")
+        return
+
+    rows, vals = chunk_topk.result()
+    write_top_k_outputs(rows, vals, scored, jd_ids, aggregator, k)
+
+def write_top_k_outputs(rows, vals, scored: List[Tuple[str, str]], jd_ids: List[str],
+                        aggregator: CandidateAggregator, k: int) -> None:
+    """Write/print per-JD top-K chunks (rows/vals from topk_per_column) and top-K candidates."""
+    n_rows = 0
+    with open(OUT_CHUNK_CSV, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["resume_id", "jd_id", "score", "candidate_id"])
+        for ji, jd_id in enumerate(jd_ids):
+            print(f"\nTop {rows.shape[0]} chunks for {jd_id}:")
+            for ri, score in zip(rows[:, ji].tolist(), vals[:, ji].tolist()):
+                rid, candidate_id = scored[ri]
+                w.writerow([rid, jd_id, f"{score:.6f}", candidate_id])
+                print(f"  {rid} | {score:.6f}")
+                n_rows += 1
+    print(f"\nSaved {n_rows} rows to {OUT_CHUNK_CSV}")
+
+    cand_rows = aggregator.top_rows(jd_ids, k)
+    write_candidate_csv(cand_rows)
+    print("\nTop candidates per JD:")
+    print("Candidate ID | JD ID | max_score | weighted_mean | chunks")
+    for r in cand_rows:
+        print(f"{r['candidate_id']:40} | {r['jd_id']:30} | {r['max_score']:.6f} | {r['weighted_mean']:.6f} | {r['chunks_count']}")
+    print(f"\nSaved {len(cand_rows)} rows to {OUT_CAND_CSV}")
+
+# -------------------- Server-side retrieval --------------------
+def aggregate_matches(matches_by_jd: Dict[str, List[Dict]]) -> List[Dict]:
+    """
+    Candidate rollup of retrieved chunks, per JD, with the same SECTION_WEIGHTS logic as the
+    matrix path. Only the chunks Pinecone returned for a JD count towards that JD
+    (chunks_count = retrieved chunks of the candidate). Rows sorted by weighted_mean.
+    """
+    resolved: Dict[str, Tuple[str, float]] = {}
+    weights: Dict[str, float] = {}
+    cand_rows = []
+    for jd_id, matches in matches_by_jd.items():
+        stats: Dict[str, List[float]] = {}  # candidate -> [max, weighted_sum, weight_sum, count]
+        for m in matches:
+            rid = m["id"]
+            if rid not in resolved:
+                candidate, section = resolve_candidate_and_section(rid, m["metadata"])
+                if section not in weights:
+                    weights[section] = section_weight(section)
+                resolved[rid] = (candidate, weights[section])
+            candidate, w = resolved[rid]
+            st = stats.setdefault(candidate, [-math.inf, 0.0, 0.0, 0])
+            st[0] = max(st[0], m["score"])
+            st[1] += w * m["score"]
+            st[2] += w
+            st[3] += 1
+        for candidate, (max_score, weighted_sum, weight_sum, count) in stats.items():
+            cand_rows.append({
+                "candidate_id": candidate,
+                "jd_id": jd_id,
+                "max_score": round(max_score, 6),
+                "weighted_mean": round(weighted_sum / weight_sum, 6) if weight_sum > 0 else 0.0,
+                "chunks_count": count
+            })
+    cand_rows.sort(key=lambda x: x["weighted_mean"], reverse=True)
+    return cand_rows
+
+def run_query_mode(jd_ids: List[str], jd_mat, k: int, workers: int = FETCH_WORKERS) -> None:
+    """
+    Retrieval mode: one index.query(top_k=k) per JD against the Resumes namespace, run in
+    parallel. Cost scales with n_JDs x k, not with the number of resume chunks.
+    Relies on the index metric being cosine (as created by resume_to_pinecone.ensure_index).
+    """
+    queries = {jd_id: jd_mat[i].tolist() for i, jd_id in enumerate(jd_ids)}
+    matches_by_jd: Dict[str, List[Dict]] = {}
+    for n, (jd_id, matches) in enumerate(query_many(index, queries, RESUMES_NS, k, workers=workers), start=1):
+        matches_by_jd[jd_id] = matches
+        if n % 100 == 0:
+            print(f"  queried {n}/{len(queries)} JDs")
+    matches_by_jd = {jd_id: matches_by_jd.get(jd_id, []) for jd_id in jd_ids}
+
+    n_rows = 0
+    with open(OUT_CHUNK_CSV, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["resume_id", "jd_id", "score", "candidate_id"])
+        for jd_id, matches in matches_by_jd.items():
+            print(f"\nTop {len(matches)} chunks for {jd_id}:")
+            for m in matches:
+                w.writerow([m["id"], jd_id, f"{m['score']:.6f}", m["metadata"].get("candidate_id", "") or ""])
+                print(f"  {m['id']} | {m['score']:.6f}")
+                n_rows += 1
+    print(f"\nSaved {n_rows} rows to {OUT_CHUNK_CSV}")
+
+    cand_rows = aggregate_matches(matches_by_jd)
+    write_candidate_csv(cand_rows)
+    print("\nCandidate-level scoring (per JD, retrieved chunks only):")
+    print("Candidate ID | JD ID | max_score | weighted_mean | chunks")
+    for r in cand_rows[:200]:
+        print(f"{r['candidate_id']:40} | {r['jd_id']:30} | {r['max_score']:.6f} | {r['weighted_mean']:.6f} | {r['chunks_count']}")
+    print(f"\nSaved {len(cand_rows)} rows to {OUT_CAND_CSV}")
+
+# -------------------- Incremental scoring --------------------
+def run_incremental(resume_ids: List[str], jd_ids: List[str], jd_mat, cache_dir: str, k: int = 0,
+                    fetch_workers: int = FETCH_WORKERS) -> None:
+    """
+    Score only new/changed resume rows and JD columns against the cached matrix
+    (score_cache.py), drop deleted ids, and refresh candidate aggregates only for the
+    candidates whose chunks changed and the JDs that are new or changed.
+    Pair with --from-mirror so reading the current vectors is local.
+    """
+    cache = ScoreCache(cache_dir)
+    had_cache = cache.load()
+
+    rids, rmat, rmetas = fetch_vector_matrix(resume_ids, RESUMES_NS, dim=jd_mat.shape[1], workers=fetch_workers)
+    print(f"Resume vectors available: {len(rids)}/{len(resume_ids)}")
+    if not rids:
+        print("ERROR: Missing vectors. Cannot compute scores.")
+        return
+    resolved = [resolve_candidate_and_section(rid, meta) for rid, meta in zip(rids, rmetas)]
+    row_cands = [c for c, _ in resolved]
+    row_hashes = content_hashes(rmat, [f"{c}|{sec}" for c, sec in resolved])
+    col_hashes = content_hashes(jd_mat)
+    l2_normalize(rmat)
+
+    rp, cp = cache.plan(rids, row_hashes, jd_ids, col_hashes)
+    print(f"Incremental: resume rows reused={len(rp.kept_new)} scored={len(rp.fresh)} dropped={len(rp.dropped)}; "
+          f"JD columns reused={len(cp.kept_new)} scored={len(cp.fresh)} dropped={len(cp.dropped)}")
+
+    # ---- score matrix: reuse cached block, score fresh rows (all JDs) and kept rows x fresh JDs
+    scores = np.empty((len(rids), len(jd_ids)), dtype=np.float32)
+    if had_cache and rp.kept_new and cp.kept_new:
+        scores[np.ix_(rp.kept_new, cp.kept_new)] = cache.scores[np.ix_(rp.kept_old, cp.kept_old)]
+    if rp.fresh:
+        scores[rp.fresh] = score_matrix(rmat[rp.fresh], jd_mat)
+    if rp.kept_new and cp.fresh:
+        scores[np.ix_(rp.kept_new, cp.fresh)] = score_matrix(rmat[rp.kept_new], jd_mat[cp.fresh])
+    del rmat
+
+    # ---- candidate aggregates: touched candidates fully, untouched ones only on fresh JDs
+    touched = {row_cands[i] for i in rp.fresh} | {cache.row_candidates[j] for j in rp.dropped}
+    aggregator = CandidateAggregator(len(jd_ids))
+    touched_rows = [i for i, c in enumerate(row_cands) if c in touched]
+    aggregator.update([rids[i] for i in touched_rows], [rmetas[i] for i in touched_rows], scores[touched_rows])
+
+    old_code = {c: i for i, c in enumerate(cache.candidates)}
+    untouched = [c for c in dict.fromkeys(row_cands) if c not in touched]
+    if untouched:
+        new_ci = np.array([aggregator.codes.setdefault(c, len(aggregator.codes)) for c in untouched])
+        old_ci = np.array([old_code[c] for c in untouched])
+        aggregator._grow(len(aggregator.codes))
+        if cp.kept_new:
+            for name in ("max_scores", "weighted_sums"):
+                getattr(aggregator, name)[np.ix_(new_ci, cp.kept_new)] = cache.agg[name][np.ix_(old_ci, cp.kept_old)]
+        aggregator.weight_sums[new_ci] = cache.agg["weight_sums"][old_ci]
+        aggregator.counts[new_ci] = cache.agg["counts"][old_ci]
+        if cp.fresh:
+            fresh_agg = CandidateAggregator(len(cp.fresh))
+            rows = [i for i, c in enumerate(row_cands) if c not in touched]
+            fresh_agg.update([rids[i] for i in rows], [rmetas[i] for i in rows], scores[np.ix_(rows, cp.fresh)])
+            fi = np.array([fresh_agg.codes[c] for c in untouched])
+            aggregator.max_scores[np.ix_(new_ci, cp.fresh)] = fresh_agg.max_scores[fi]
+            aggregator.weighted_sums[np.ix_(new_ci, cp.fresh)] = fresh_agg.weighted_sums[fi]
+    print(f"Candidates recomputed: {len(touched & set(row_cands))}; reused: {len(untouched)} "
+          f"(updated on {len(cp.fresh)} new/changed JDs)")
+
+    # ---- outputs
+    scored = [(rid, meta.get("candidate_id", "") or "") for rid, meta in zip(rids, rmetas)]
+    if k > 0:
+        rows, vals = topk_per_column(scores, k)
+        write_top_k_outputs(rows, vals, scored, jd_ids, aggregator, k)
     else:
-        # iterable case
-        try:
-            for entry in vecs:
-                if isinstance(entry, dict) and "id" in entry:
-                    vid = entry["id"]
-                    out[vid] = {"values": safe_get_vector_values(entry), "metadata": safe_get_metadata(entry)}
-        except Exception:
-            pass
-    return out
+        with open(OUT_CHUNK_CSV, "w", newline="", encoding="utf-8") as fh:
+            w = csv.writer(fh)
+            w.writerow(["resume_id", "jd_id", "score", "candidate_id"])
+            for ri, (rid, candidate_id) in enumerate(scored):
+                w.writerows([rid, jd_id, f"{s:.6f}", candidate_id] for jd_id, s in zip(jd_ids, scores[ri].tolist()))
+        print(f"\nSaved {scores.size} rows to {OUT_CHUNK_CSV}")
+        cand_rows = aggregator.rows(jd_ids)
+        write_candidate_csv(cand_rows)
+        print(f"Saved {len(cand_rows)} rows to {OUT_CAND_CSV}")
+
+    candidates, max_scores, _, counts = aggregator.matrices()
+    n = len(candidates)
+    cache.save(rids, row_hashes, row_cands, jd_ids, col_hashes, scores, candidates,
+               {"max_scores": max_scores, "weighted_sums": aggregator.weighted_sums[:n],
+                "weight_sums": aggregator.weight_sums[:n], "counts": counts})
+    print(f"Score cache updated: {cache_dir}")
 
 # -------------------- Main --------------------
 def main():
+    parser = argparse.ArgumentParser(description="Score every resume chunk against every JD.")
+    parser.add_argument("--mode", choices=["matrix", "query"], default="matrix",
+                        help="matrix: score every chunk x JD locally; query: server-side top-K per JD (index.query)")
+    parser.add_argument("--tiled", action="store_true",
+                        help="Score resumes in fixed-size blocks, streaming results (bounded memory)")
+    parser.add_argument("--memory-budget-mb", type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="Peak memory budget per block in tiled mode (MB)")
+    parser.add_argument("--block-rows", type=int, default=0,
+                        help="Override block size (resume rows per block) in tiled mode")
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="Keep only the K best chunks and K best candidates per JD (no full cross product); "
+                             f"in --mode query: chunks retrieved per JD (default {QUERY_TOP_K})")
+    parser.add_argument("--id-prefixes", default="",
+                        help="Comma-separated resume id prefixes to list concurrently (default: whole namespace)")
+    parser.add_argument("--list-workers", type=int, default=LIST_WORKERS,
+                        help="Concurrent listing threads when --id-prefixes is given")
+    parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS,
+                        help="Concurrent fetch requests")
+    parser.add_argument("--from-mirror", default="",
+                        help="Read vectors from a local mirror dir (see vector_mirror.py sync) instead of Pinecone")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse the cached score matrix; score only new/changed chunks and JDs")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Score cache directory for --incremental")
+    args = parser.parse_args()
+    if args.from_mirror:
+        from vector_mirror import NamespaceMirror
+        for ns in (RESUMES_NS, JDS_NS):
+            MIRRORS[ns] = NamespaceMirror(args.from_mirror, ns)
+        print(f"Using local vector mirror: {args.from_mirror} (synced_at={MIRRORS[RESUMES_NS].synced_at})")
+    prefixes = [p.strip() for p in args.id_prefixes.split(",") if p.strip()]
+
+    if args.mode == "query":
+        print("Listing JD vectors in namespace:", JDS_NS)
+        jd_ids = list_vector_ids(JDS_NS, limit=LIST_LIMIT)
+        jd_ids, jd_mat, _ = fetch_vector_matrix(sorted(jd_ids), JDS_NS, workers=args.fetch_workers)
+        print("JD vectors available:", len(jd_ids))
+        if not jd_ids:
+            print("No JD vectors found. Exiting.")
+            return
+        k = args.top_k or QUERY_TOP_K
+        print(f"Querying top {k} resume chunks per JD ({args.fetch_workers} parallel requests)...")
+        run_query_mode(jd_ids, jd_mat, k, workers=args.fetch_workers)
+        return
+
     print("Listing resume vectors in namespace:", RESUMES_NS)
-    resume_ids = list_vector_ids(RESUMES_NS, limit=LIST_LIMIT)
+    resume_ids = list_vector_ids(RESUMES_NS, limit=LIST_LIMIT, prefixes=prefixes, workers=args.list_workers)
     print("Found resumes:", len(resume_ids))
 
     print("Listing JD vectors in namespace:", JDS_NS)
@@ -188,117 +556,57 @@ def main():
         print("No JD vectors found. Exiting.")
         return
 
-    # Fetch vectors (batching could be added for large sets)
-    print("Fetching resume vectors...")
-    resumes = fetch_vectors_by_ids(resume_ids, RESUMES_NS)
-    print(f"Resume vectors available: {len(resumes)}/{len(resume_ids)}")
-
     print("Fetching JD vectors...")
-    jds = fetch_vectors_by_ids(jd_ids, JDS_NS)
-    print(f"JD vectors available: {len(jds)}/{len(jd_ids)}")
-
-    if not resumes or not jds:
+    n_listed = len(jd_ids)
+    jd_ids, jd_mat, _ = fetch_vector_matrix(sorted(jd_ids), JDS_NS, workers=args.fetch_workers)
+    print(f"JD vectors available: {len(jd_ids)}/{n_listed}")
+    if not jd_ids:
         print("ERROR: Missing vectors. Cannot compute scores.")
         return
+    l2_normalize(jd_mat)
 
-    # Prepare items
-    resume_items = sorted(resumes.items(), key=lambda x: x[0])  # (id, {values,metadata})
-    jd_items = sorted(jds.items(), key=lambda x: x[0])
-
-    # Compute chunk-level scores
-    chunk_rows = []
-    for r_id, r_obj in resume_items:
-        r_vec = r_obj.get("values") or []
-        for jd_id, jd_obj in jd_items:
-            j_vec = jd_obj.get("values") or []
-            score = cosine_similarity(r_vec, j_vec)
-            chunk_rows.append({
-                "resume_id": r_id,
-                "jd_id": jd_id,
-                "score": float(score),
-                "candidate_id": (r_obj.get("metadata") or {}).get("candidate_id", "")
-            })
+    resume_ids = sorted(resume_ids)
+    if args.incremental:
+        run_incremental(resume_ids, jd_ids, jd_mat, args.cache_dir, k=args.top_k, fetch_workers=args.fetch_workers)
+        return
+    if args.tiled:
+        block_rows = args.block_rows or rows_for_budget(args.memory_budget_mb * 1024 * 1024,
+                                                        jd_mat.shape[1], len(jd_ids))
+        print(f"Tiled mode: {block_rows} resume rows per block (budget {args.memory_budget_mb} MB)")
+    else:
+        block_rows = len(resume_ids)
+
+    print("Fetching and scoring resume vectors...")
+    aggregator = CandidateAggregator(len(jd_ids))
+    if args.top_k > 0:
+        run_top_k(resume_ids, jd_ids, jd_mat, block_rows, aggregator, args.top_k,
+                  fetch_workers=args.fetch_workers)
+        return
 
-    # Write chunk-level CSV
+    # Compute chunk-level scores block by block, streaming to CSV
     with open(OUT_CHUNK_CSV, "w", newline="", encoding="utf-8") as fh:
         w = csv.writer(fh)
         w.writerow(["resume_id", "jd_id", "score", "candidate_id"])
-        for r in chunk_rows:
-            w.writerow([r["resume_id"], r["jd_id"], f"{r['score']:.6f}", r.get("candidate_id") or ""])
+        n_rows, n_found, top_chunks = score_resume_blocks(resume_ids, jd_ids, jd_mat, block_rows, w, aggregator,
+                                                          fetch_workers=args.fetch_workers)
+    print(f"Resume vectors available: {n_found}/{len(resume_ids)}")
+
+    if not n_found:
+        print("ERROR: Missing vectors. Cannot compute scores.")
+        return
 
     # Print top chunk-level results
     print("\nResume ID | JD ID | Score")
-    for r in sorted(chunk_rows, key=lambda x: x["score"], reverse=True)[:200]:
-        print(f"{r['resume_id']} | {r['jd_id']} | {r['score']:.6f}")
+    for score, rid, jd_id in top_chunks:
+        print(f"{rid} | {jd_id} | {score:.6f}")
 
-    print(f"\nSaved {len(chunk_rows)} rows to {OUT_CHUNK_CSV}")
+    print(f"\nSaved {n_rows} rows to {OUT_CHUNK_CSV}")
 
     # ------------------ Weighted aggregation to candidate-level ------------------
-    # Map resume_id -> metadata for section extraction
-    resume_meta_map = {rid: (resumes.get(rid, {}).get("metadata") or {}) for rid in resume_ids}
-
-    grouped = defaultdict(list)  # key: (candidate_id, jd_id) -> list of (score, section)
-    for r in chunk_rows:
-        resume_id = r["resume_id"]
-        meta = resume_meta_map.get(resume_id, {}) or {}
-        candidate = meta.get("candidate_id") or ""
-        if not candidate:
-            candidate = resume_id.split("_chunk")[0] if "_chunk" in resume_id else resume_id
-        # section from metadata or derive from id suffix
-        section = (meta.get("section") or "").strip()
-        if not section:
-            # heuristic: everything after first "_chunkN_" part
-            if "_chunk" in resume_id:
-                try:
-                    after = resume_id.split("_chunk", 1)[1]
-                    parts = after.split("_")
-                    # remove leading chunk index token if present (e.g. '1', '1_summary')
-                    # assume section tokens are after the chunk index
-                    if parts and parts[0].isdigit():
-                        section = "_".join(parts[1:]) if len(parts) > 1 else ""
-                    else:
-                        section = "_".join(parts)
-                except Exception:
-                    section = ""
-        section = section.lower()
-        grouped[(candidate, r["jd_id"])].append((r["score"], section))
+    # already sorted by weighted_mean
+    cand_rows = aggregator.rows(jd_ids)
 
-    cand_rows = []
-    for (candidate, jd), vals in grouped.items():
-        if not vals:
-            continue
-        scores = [s for s, sec in vals]
-        max_score = max(scores)
-        chunks_count = len(vals)
-        weighted_sum = 0.0
-        weight_sum = 0.0
-        for score, section in vals:
-            # choose canonical key
-            sec_key = section.split("_")[0] if section else ""
-            # exact match first, then full section, then default
-            w = SECTION_WEIGHTS.get(sec_key,
-                                   SECTION_WEIGHTS.get(section,
-                                                       DEFAULT_WEIGHT))
-            weighted_sum += score * w
-            weight_sum += w
-        weighted_mean = (weighted_sum / weight_sum) if weight_sum > 0 else 0.0
-        cand_rows.append({
-            "candidate_id": candidate,
-            "jd_id": jd,
-            "max_score": round(max_score, 6),
-            "weighted_mean": round(weighted_mean, 6),
-            "chunks_count": chunks_count
-        })
-
-    # sort by weighted_mean
-    cand_rows.sort(key=lambda x: x["weighted_mean"], reverse=True)
-
-    # Write candidate CSV
-    with open(OUT_CAND_CSV, "w", newline="", encoding="utf-8") as fh:
-        w = csv.writer(fh)
-        w.writerow(["candidate_id", "jd_id", "max_score", "weighted_mean", "chunks_count"])
-        for r in cand_rows:
-            w.writerow([r["candidate_id"], r["jd_id"], f"{r['max_score']:.6f}", f"{r['weighted_mean']:.6f}", r["chunks_count"]])
+    write_candidate_csv(cand_rows)
 
     # Print top candidates
     print("\nCandidate-level scoring (per JD):")
@@ -310,4 +618,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+content_store.py
+
+Optional local store for the text behind each vector, so chunk/JD text does not have to
+ride in Pinecone metadata. Every fetch or query with include_metadata=True otherwise
+returns kilobytes of text per match, and long chunks risk the per-vector metadata size
+limit. Off by default: offloaded text is only readable where the store file is, so enable
+it only when every consumer of the index shares that file.
+
+- Store: one SQLite file keyed by (namespace, vector id); text is zlib-compressed.
+- Writers call offload_text(): the text goes to the store and the metadata keeps only a
+  pointer (TEXT_REF = "<namespace>/<vector id>").
+- Readers call load_texts() for the matches they actually display or send to an LLM.
+  Metadata that still has an inline `text` (older vectors, or store disabled) is used as is.
+
+Configuration (environment):
+  CONTENT_STORE_PATH   store file, e.g. .content_store.sqlite (default "off": text stays inline in metadata);
+                       set it for writers and readers alike
+
+Usage:
+  store = get_content_store()
+  md_text = offload_text(store, "Resumes", vid, chunk_text, metadata)   # before upsert
+  texts = load_texts([m["metadata"] for m in top_matches])            # after query
+
+  python content_store.py stats
+  python content_store.py clear [--namespace Resumes]
+"""
+
+import os
+import time
+import zlib
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlite_store import SQLiteStore, StoreSingleton, is_enabled, open_for_cli, store_cli
+
+CONTENT_STORE_PATH = os.environ.get("CONTENT_STORE_PATH", "off")
+STORE_FILE = ".content_store.sqlite"  # CLI default while CONTENT_STORE_PATH is off
+TEXT_REF = "text_ref"  # metadata key holding the store pointer
+
+
+def make_ref(namespace: str, vid: str) -> str:
+    return f"{namespace}/{vid}"
+
+
+def _split_ref(ref: str) -> Tuple[str, str]:
+    namespace, _, vid = ref.partition("/")
+    return namespace, vid
+
+
+class ContentStore(SQLiteStore):
+    """Compressed vector text keyed by (namespace, vector id)."""
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS content ("
+              "namespace TEXT, id TEXT, data BLOB, chars INTEGER, updated_at REAL, PRIMARY KEY (namespace, id))",)
+
+    def put_many(self, namespace: str, items: Sequence[Tuple[str, str]]) -> None:
+        """Store (vector id, text) pairs, replacing earlier text for the same ids."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(namespace, vid, zlib.compress((text or "").encode("utf-8"), 6), len(text or ""), now)
+                for vid, text in items]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO content (namespace, id, data, chars, updated_at) "
+                                 "VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def get_many(self, namespace: str, ids: Iterable[str]) -> Dict[str, str]:
+        """{vector id: text} for the ids that are stored."""
+        ids = list(dict.fromkeys(ids))
+        out: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                marks = ",".join("?" * len(part))
+                for vid, data in self._db.execute(
+                        f"SELECT id, data FROM content WHERE namespace=? AND id IN ({marks})", [namespace] + part):
+                    out[vid] = zlib.decompress(data).decode("utf-8")
+        return out
+
+    def delete_many(self, namespace: str, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        if not ids:
+            return 0
+        with self._lock:
+            cur = self._db.executemany("DELETE FROM content WHERE namespace=? AND id=?", [(namespace, v) for v in ids])
+            self._db.commit()
+            return cur.rowcount
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        with self._lock:
+            if namespace:
+                cur = self._db.execute("DELETE FROM content WHERE namespace=?", (namespace,))
+            else:
+                cur = self._db.execute("DELETE FROM content")
+            self._db.commit()
+            return cur.rowcount
+
+    def stats(self) -> List[Tuple[str, int, int, int]]:
+        """(namespace, entries, text chars, compressed bytes) per namespace."""
+        with self._lock:
+            return self._db.execute("SELECT namespace, COUNT(*), SUM(chars), SUM(LENGTH(data)) FROM content "
+                                    "GROUP BY namespace ORDER BY namespace").fetchall()
+
+
+_default_store = StoreSingleton(ContentStore, CONTENT_STORE_PATH, "Content store")
+
+
+def get_content_store() -> Optional[ContentStore]:
+    """Process-wide store from CONTENT_STORE_PATH (see sqlite_store.StoreSingleton)."""
+    return _default_store.get()
+
+
+# -------------------- Writer / reader helpers --------------------
+def offload_text(store: Optional[ContentStore], namespace: str, vid: str, text: str, metadata: Dict) -> Dict:
+    """Metadata for upsert: the text becomes a pointer when a store is available, else stays inline."""
+    md = dict(metadata)
+    md.pop("text", None)
+    if store is None:
+        md["text"] = text
+        return md
+    store.put_many(namespace, [(vid, text)])
+    md[TEXT_REF] = make_ref(namespace, vid)
+    return md
+
+
+def offload_many(store: Optional[ContentStore], namespace: str,
+                 vectors: Sequence[Tuple[str, List[float], Dict]]) -> List[Tuple[str, List[float], Dict]]:
+    """offload_text for (id, values, metadata) tuples whose metadata carries `text`; one store write."""
+    if store is None:
+        return list(vectors)
+    out, items = [], []
+    for vid, values, md in vectors:
+        if "text" in (md or {}):
+            md = dict(md)
+            items.append((vid, md.pop("text") or ""))
+            md[TEXT_REF] = make_ref(namespace, vid)
+        out.append((vid, values, md))
+    store.put_many(namespace, items)
+    return out
+
+
+def load_texts(metadatas: Sequence[Optional[Mapping]], store: Optional[ContentStore] = None) -> List[Optional[str]]:
+    """Text for each metadata dict: inline `text`, else the stored text behind TEXT_REF, else None."""
+    out: List[Optional[str]] = [None] * len(metadatas)
+    wanted: Dict[str, List[Tuple[int, str]]] = {}
+    for i, md in enumerate(metadatas):
+        md = md or {}
+        if md.get("text"):
+            out[i] = md["text"]
+        elif md.get(TEXT_REF):
+            namespace, vid = _split_ref(md[TEXT_REF])
+            wanted.setdefault(namespace, []).append((i, vid))
+    if wanted:
+        store = store or get_content_store()
+        if store is None:
+            return out
+        for namespace, refs in wanted.items():
+            found = store.get_many(namespace, [vid for _i, vid in refs])
+            for i, vid in refs:
+                out[i] = found.get(vid)
+    return out
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = store_cli("Inspect or clear the local content store.", ["stats", "clear"],
+                       CONTENT_STORE_PATH if is_enabled(CONTENT_STORE_PATH) else STORE_FILE, path_help="Store file")
+    parser.add_argument("--namespace", help="clear: only this namespace")
+    args = parser.parse_args()
+
+    store = open_for_cli(ContentStore, args.path, "content store")
+    if store is None:
+        return
+    if args.command == "stats":
+        for namespace, n, chars, size in store.stats():
+            print(f"{namespace:25} entries={n} chars={chars or 0} stored={(size or 0) / 1e6:.1f}MB")
+    else:
+        print(f"Deleted {store.clear(args.namespace)} entries")
+
+
+if __name__ == "__main__":
+    main()
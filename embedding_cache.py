@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+embedding_cache.py
+
+Content-addressed on-disk embedding cache shared by the ingestion scripts
+(upload_to_pinecone.py, resume_to_pinecone.py, jd_to_pinecone.py and the
+SentenceTransformer loaders).
+
+- Key: sha256 of (model name, dimension, normalized text). Text is normalized with
+  Unicode NFC + whitespace collapsing, so re-flowed but otherwise identical text hits.
+- Store: one SQLite file; vectors are kept as packed float32 blobs (stdlib array, no numpy).
+- Size-bounded LRU: every hit refreshes the entry's last-used time; when the store
+  grows past the byte budget the least recently used entries are evicted.
+
+Configuration (environment):
+  EMBED_CACHE_PATH    cache file (default .embedding_cache.sqlite); "off" disables caching
+  EMBED_CACHE_MAX_MB  size budget in MB (default 2048)
+
+Usage:
+  from embedding_cache import get_cache, embed_with_cache
+  vecs = embed_with_cache(get_cache(), "text-embedding-3-large", 0, texts, call_api)
+
+  python embedding_cache.py stats
+  python embedding_cache.py clear
+"""
+
+import os
+import time
+import hashlib
+import unicodedata
+from array import array
+from typing import Callable, List, Optional, Sequence
+
+from sqlite_store import SQLiteStore, StoreSingleton, open_for_cli, store_cli
+
+EMBED_CACHE_PATH = os.environ.get("EMBED_CACHE_PATH", ".embedding_cache.sqlite")
+EMBED_CACHE_MAX_MB = int(os.environ.get("EMBED_CACHE_MAX_MB", "2048"))
+EVICT_TO = 0.9  # after eviction the store is trimmed to this fraction of the budget
+
+
+def normalize_text(text: str) -> str:
+    """NFC + collapse all whitespace runs to one space + strip."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def cache_key(model: str, dim: int, text: str) -> str:
+    h = hashlib.sha256(f"{model}\x1f{int(dim or 0)}\x1f".encode("utf-8"))
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache(SQLiteStore):
+    """Embedding vectors as packed float32 blobs, with LRU eviction."""
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS embeddings ("
+              "key TEXT PRIMARY KEY, model TEXT, dim INTEGER, vec BLOB, nbytes INTEGER, last_used REAL)",
+              "CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_bytes: int = EMBED_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+    # ---------- reads ----------
+    def get_many(self, model: str, dim: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vector (or None) for every text, in input order. Hits are marked as recently used."""
+        keys = [cache_key(model, dim, t) for t in texts]
+        found = {}
+        with self._lock:
+            uniq = list(dict.fromkeys(keys))
+            for start in range(0, len(uniq), 500):  # stay under SQLite's bound-parameter limit
+                part = uniq[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part)
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE embeddings SET last_used=? WHERE key=?",
+                                     [(now, k) for k in found])
+                self._db.commit()
+        out = [found.get(k) for k in keys]
+        hits = sum(1 for v in out if v is not None)
+        self.hits += hits
+        self.misses += len(out) - hits
+        return out
+
+    # ---------- writes ----------
+    def put_many(self, model: str, dim: int, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        now = time.time()
+        rows = {}
+        for t, v in zip(texts, vectors):
+            blob = array("f", v).tobytes()
+            rows[cache_key(model, dim, t)] = (model, int(dim or 0), blob, len(blob), now)
+        if not rows:
+            return
+        with self._lock:
+            uniq = list(rows)
+            old = 0
+            for start in range(0, len(uniq), 500):
+                part = uniq[start:start + 500]
+                old += self._db.execute(
+                    f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part).fetchone()[0]
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, model, dim, vec, nbytes, last_used) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", [(k,) + r for k, r in rows.items()])
+            self._total += sum(r[3] for r in rows.values()) - old
+            if self._total > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the store is under EVICT_TO of the budget."""
+        target = int(self.max_bytes * EVICT_TO)
+        cur = self._db.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used ASC")
+        doomed = []
+        total = self._total
+        for key, nbytes in cur:
+            if total <= target:
+                break
+            doomed.append((key,))
+            total -= nbytes
+        cur.close()
+        self._db.executemany("DELETE FROM embeddings WHERE key=?", doomed)
+        self._total = total
+
+    # ---------- maintenance ----------
+    def stats(self) -> dict:
+        with self._lock:
+            n, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+            models = self._db.execute("SELECT model, dim, COUNT(*) FROM embeddings GROUP BY model, dim").fetchall()
+        return {"entries": n, "bytes": total, "max_bytes": self.max_bytes, "models": models}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self._db.execute("VACUUM")
+            self._total = 0
+
+
+_default_cache = StoreSingleton(EmbeddingCache, EMBED_CACHE_PATH, "Embedding cache")
+
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache from EMBED_CACHE_PATH / EMBED_CACHE_MAX_MB (see sqlite_store.StoreSingleton)."""
+    return _default_cache.get()
+
+
+def embed_with_cache(cache: Optional[EmbeddingCache], model: str, dim: int, texts: Sequence[str],
+                     embed_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+    """
+    Embeddings for `texts` in order. Cached texts are served from disk; the rest are
+    de-duplicated (by cache key), embedded with one embed_fn call and stored.
+    """
+    texts = list(texts)
+    if cache is None or not texts:
+        return embed_fn(texts) if texts else []
+    out = cache.get_many(model, dim, texts)
+    missing = {}
+    for i, (t, v) in enumerate(zip(texts, out)):
+        if v is None:
+            missing.setdefault(cache_key(model, dim, t), []).append(i)
+    if missing:
+        todo = [texts[idx[0]] for idx in missing.values()]
+        vecs = embed_fn(todo)
+        if len(vecs) != len(todo):
+            raise RuntimeError(f"Embedding backend returned {len(vecs)} vectors for {len(todo)} texts")
+        cache.put_many(model, dim, todo, vecs)
+        for idx, v in zip(missing.values(), vecs):
+            v = list(v)
+            for i in idx:
+                out[i] = v
+    return out
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = store_cli("Inspect or clear the on-disk embedding cache.", ["stats", "clear"], EMBED_CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = open_for_cli(EmbeddingCache, args.path, "embedding cache")
+    if cache is None:
+        return
+    if args.command == "clear":
+        cache.clear()
+        print("Cleared", args.path)
+        return
+    s = cache.stats()
+    print(f"{args.path}: {s['entries']} entries, {s['bytes'] / 1e6:.1f} MB of {s['max_bytes'] / 1e6:.0f} MB")
+    for model, dim, n in s["models"]:
+        print(f"  {model:50} dim={dim or 'native'} entries={n}")
+
+
+if __name__ == "__main__":
+    main()
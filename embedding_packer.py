@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+embedding_packer.py
+
+Packs texts into as few embedding requests as the model limits allow.
+
+- Each request holds up to MAX_INPUTS_PER_REQUEST texts and REQUEST_TOKEN_BUDGET tokens
+  (OpenAI: 2048 inputs / 300k tokens per embeddings request).
+- A text longer than the model's per-input limit is split into token windows; the
+  pieces are embedded with everything else and recombined into one vector
+  (token-weighted mean, re-normalized), so oversize inputs never fail a request.
+- Token counts come from tiktoken when installed, otherwise from a conservative
+  UTF-8 byte estimate.
+
+Usage:
+  from embedding_packer import embed_packed
+  vectors = embed_packed(texts, lambda batch: call_api(batch), model="text-embedding-3-large")
+"""
+
+import math
+from typing import Callable, List, Sequence, Tuple
+
+try:
+    import tiktoken
+except Exception:
+    tiktoken = None
+
+MAX_INPUTS_PER_REQUEST = 2048
+REQUEST_TOKEN_BUDGET = 250_000  # headroom under the 300k/request cap for estimate error
+MODEL_INPUT_TOKENS = {
+    "text-embedding-3-large": 8191,
+    "text-embedding-3-small": 8191,
+    "text-embedding-ada-002": 8191,
+}
+DEFAULT_INPUT_TOKENS = 8191
+SPLIT_MARGIN = 0.95  # split oversize texts into windows of this fraction of the input limit
+
+_encoders = {}
+
+
+def _encoder(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encoders:
+        try:
+            _encoders[model] = tiktoken.encoding_for_model(model)
+        except Exception:
+            _encoders[model] = tiktoken.get_encoding("cl100k_base")
+    return _encoders[model]
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    enc = _encoder(model)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # ~4 bytes/token for English, ~3 for CJK: bytes/3 errs on the high side
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def split_text(text: str, max_tokens: int, model: str = "") -> List[Tuple[str, int]]:
+    """Split text into (piece, tokens) windows of at most max_tokens tokens."""
+    enc = _encoder(model)
+    if enc is not None:
+        toks = enc.encode(text, disallowed_special=())
+        return [(enc.decode(toks[i:i + max_tokens]), len(toks[i:i + max_tokens]))
+                for i in range(0, len(toks), max_tokens)] or [(text, 0)]
+    pieces, cur, cur_tokens = [], [], 0
+    for word in text.split(" "):
+        cost = count_tokens(word + " ")
+        if cur and cur_tokens + cost > max_tokens:
+            pieces.append((" ".join(cur), cur_tokens))
+            cur, cur_tokens = [], 0
+        while cost > max_tokens:  # a single enormous "word" (no spaces): hard cut
+            cut = max_tokens * 3
+            while cut > 1 and count_tokens(word[:cut]) > max_tokens:
+                cut = cut * 3 // 4
+            pieces.append((word[:cut], count_tokens(word[:cut])))
+            word = word[cut:]
+            cost = count_tokens(word + " ")
+        cur.append(word)
+        cur_tokens += cost
+    if cur:
+        pieces.append((" ".join(cur), cur_tokens))
+    return pieces
+
+
+def pack_requests(token_counts: Sequence[int], max_inputs: int = MAX_INPUTS_PER_REQUEST,
+                  max_tokens: int = REQUEST_TOKEN_BUDGET) -> List[List[int]]:
+    """Greedy, order-preserving packing of input positions into requests under both caps."""
+    batches, cur, cur_tokens = [], [], 0
+    for i, n in enumerate(token_counts):
+        if cur and (len(cur) >= max_inputs or cur_tokens + n > max_tokens):
+            batches.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(i)
+        cur_tokens += n
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _combine(vectors: List[List[float]], weights: List[int]) -> List[float]:
+    """Token-weighted mean of piece vectors, L2-normalized."""
+    total = float(sum(weights)) or 1.0
+    dim = len(vectors[0])
+    mean = [0.0] * dim
+    for v, w in zip(vectors, weights):
+        f = w / total
+        for d in range(dim):
+            mean[d] += f * v[d]
+    norm = math.sqrt(sum(x * x for x in mean))
+    return [x / norm for x in mean] if norm > 0 else mean
+
+
+def embed_packed(texts: Sequence[str], embed_fn: Callable[[List[str]], List[List[float]]], model: str = "",
+                 max_inputs: int = MAX_INPUTS_PER_REQUEST, max_tokens: int = REQUEST_TOKEN_BUDGET,
+                 input_tokens: int = 0) -> List[List[float]]:
+    """
+    One vector per text, in order, using as few embed_fn calls as the limits allow.
+    embed_fn receives a list of strings that fits in one request.
+    """
+    limit = input_tokens or MODEL_INPUT_TOKENS.get(model, DEFAULT_INPUT_TOKENS)
+    window = max(1, int(limit * SPLIT_MARGIN))
+    inputs, owners, weights = [], [], []
+    for i, t in enumerate(texts):
+        n = count_tokens(t, model)
+        pieces = split_text(t, window, model) if n > limit else [(t, n)]
+        for piece, n_piece in pieces:
+            inputs.append(piece)
+            owners.append(i)
+            weights.append(max(1, n_piece))
+
+    piece_vecs: List[List[float]] = [None] * len(inputs)
+    for batch in pack_requests(weights, max_inputs=max_inputs, max_tokens=max_tokens):
+        vecs = embed_fn([inputs[j] for j in batch])
+        if len(vecs) != len(batch):
+            raise RuntimeError(f"Embedding backend returned {len(vecs)} vectors for {len(batch)} inputs")
+        for j, v in zip(batch, vecs):
+            piece_vecs[j] = list(v)
+
+    grouped: List[List[int]] = [[] for _ in texts]
+    for j, i in enumerate(owners):
+        grouped[i].append(j)
+    out = []
+    for js in grouped:
+        if len(js) == 1:
+            out.append(piece_vecs[js[0]])
+        else:
+            out.append(_combine([piece_vecs[j] for j in js], [weights[j] for j in js]))
+    return out
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+extraction_cache.py
+
+Cache of text extracted from source documents (PDF / DOCX), shared by file_converter.py,
+txt_to_json.py and jd_to_json.py. Parsing is the slowest step of those scripts; with the
+cache an unchanged document is hashed, not parsed.
+
+- Key: (sha256 of the file bytes, extractor id). The extractor id names the parser and
+  its version (e.g. "pdf-pypdf2/1"); bump the version whenever the extraction logic
+  changes so old text is not reused. Renamed or copied files still hit.
+- Store: one SQLite file, text zlib-compressed. Failed extractions are not cached.
+- Size-bounded LRU like embedding_cache.py, and prunable by age / size from the CLI.
+
+Configuration (environment):
+  EXTRACT_CACHE_PATH    cache file (default .extract_cache.sqlite); "off" disables caching
+  EXTRACT_CACHE_MAX_MB  size budget in MB (default 512)
+
+Usage:
+  text = cached_extract(path, "pdf-pypdf2/1", parse_pdf)
+
+  python extraction_cache.py stats
+  python extraction_cache.py prune --max-age-days 30 --max-mb 200
+  python extraction_cache.py clear
+"""
+
+import os
+import sys
+import time
+import zlib
+import hashlib
+from typing import Callable, Optional
+
+from sqlite_store import SQLiteStore, StoreSingleton, open_for_cli, store_cli
+
+EXTRACT_CACHE_PATH = os.environ.get("EXTRACT_CACHE_PATH", ".extract_cache.sqlite")
+EXTRACT_CACHE_MAX_MB = int(os.environ.get("EXTRACT_CACHE_MAX_MB", "512"))
+EVICT_TO = 0.9  # after eviction the store is trimmed to this fraction of the budget
+
+
+def file_hash(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ExtractionCache(SQLiteStore):
+    """Compressed extracted text keyed by (file hash, extractor id), with LRU eviction."""
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS extracted ("
+              "file_hash TEXT, extractor TEXT, text BLOB, nbytes INTEGER, "
+              "created_at REAL, last_used REAL, PRIMARY KEY (file_hash, extractor))",
+              "CREATE INDEX IF NOT EXISTS extracted_lru ON extracted(last_used)")
+
+    def __init__(self, path: str = EXTRACT_CACHE_PATH, max_bytes: int = EXTRACT_CACHE_MAX_MB * 1024 * 1024):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str, extractor: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT text FROM extracted WHERE file_hash=? AND extractor=?",
+                                   (digest, extractor)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE extracted SET last_used=? WHERE file_hash=? AND extractor=?",
+                             (time.time(), digest, extractor))
+            self._db.commit()
+        self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def put(self, digest: str, extractor: str, text: str) -> None:
+        blob = zlib.compress((text or "").encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO extracted (file_hash, extractor, text, nbytes, created_at, last_used) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", (digest, extractor, blob, len(blob), now, now))
+            total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM extracted").fetchone()[0]
+            if total > self.max_bytes:
+                self._trim(int(self.max_bytes * EVICT_TO), total)
+            self._db.commit()
+
+    def _trim(self, target: int, total: int) -> int:
+        """Drop least recently used entries until the store holds at most `target` bytes."""
+        doomed = []
+        for digest, extractor, nbytes in self._db.execute(
+                "SELECT file_hash, extractor, nbytes FROM extracted ORDER BY last_used ASC").fetchall():
+            if total <= target:
+                break
+            doomed.append((digest, extractor))
+            total -= nbytes
+        self._db.executemany("DELETE FROM extracted WHERE file_hash=? AND extractor=?", doomed)
+        return len(doomed)
+
+    # ---------- maintenance ----------
+    def prune(self, max_age_days: Optional[float] = None, max_mb: Optional[float] = None) -> int:
+        """Delete entries unused for max_age_days, then LRU entries beyond max_mb. Returns entries removed."""
+        removed = 0
+        with self._lock:
+            if max_age_days is not None:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self._db.execute("DELETE FROM extracted WHERE last_used<?", (cutoff,)).rowcount
+            if max_mb is not None:
+                total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM extracted").fetchone()[0]
+                removed += self._trim(int(max_mb * 1024 * 1024), total)
+            self._db.commit()
+            self._db.execute("VACUUM")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM extracted").fetchone()
+            extractors = self._db.execute("SELECT extractor, COUNT(*) FROM extracted GROUP BY extractor").fetchall()
+        return {"entries": n, "bytes": total, "max_bytes": self.max_bytes, "extractors": extractors}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM extracted")
+            self._db.commit()
+            self._db.execute("VACUUM")
+
+
+_default_cache = StoreSingleton(ExtractionCache, EXTRACT_CACHE_PATH, "Extraction cache", per_process=True)
+
+
+def get_extract_cache() -> Optional[ExtractionCache]:
+    """Per-process cache from EXTRACT_CACHE_PATH, reopened in pool workers (see sqlite_store.StoreSingleton)."""
+    return _default_cache.get()
+
+
+def cached_extract(path, extractor: str, parse: Callable[[object], str]) -> str:
+    """
+    parse(path), served from the cache when this file content was already parsed by `extractor`.
+    The cache is best-effort: a failing read or write (lock timeout, full disk) never fails the extraction.
+    """
+    cache = get_extract_cache()
+    if cache is None:
+        return parse(path)
+    digest = file_hash(path)
+    try:
+        text = cache.get(digest, extractor)
+    except Exception as e:
+        print(f"WARNING: extraction cache read failed for {path}: {e}", file=sys.stderr)
+        text = None
+    if text is None:
+        text = parse(path)
+        try:
+            cache.put(digest, extractor, text)
+        except Exception as e:  # e.g. lock timeout with many converter workers, disk full
+            print(f"WARNING: extraction cache write failed for {path}: {e}", file=sys.stderr)
+    return text
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = store_cli("Inspect, prune or clear the document extraction cache.", ["stats", "prune", "clear"],
+                       EXTRACT_CACHE_PATH)
+    parser.add_argument("--max-age-days", type=float, help="prune: drop entries not used for this many days")
+    parser.add_argument("--max-mb", type=float, help="prune: trim least recently used entries down to this size")
+    args = parser.parse_args()
+
+    cache = open_for_cli(ExtractionCache, args.path, "extraction cache")
+    if cache is None:
+        return
+    if args.command == "stats":
+        s = cache.stats()
+        print(f"entries={s['entries']} size={s['bytes'] / 1e6:.1f}MB budget={s['max_bytes'] / 1e6:.0f}MB")
+        for extractor, n in s["extractors"]:
+            print(f"  {extractor:24} {n}")
+    elif args.command == "prune":
+        if args.max_age_days is None and args.max_mb is None:
+            parser.error("prune needs --max-age-days and/or --max-mb")
+        print(f"Removed {cache.prune(args.max_age_days, args.max_mb)} entries")
+    else:
+        cache.clear()
+        print("Cleared", args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 import os
+import csv
 import json
+import time
+import argparse
+import multiprocessing as mp
+from collections import deque
 from pathlib import Path
 from docx import Document
 from PyPDF2 import PdfReader
 
+from extraction_cache import cached_extract
+
 # ==============================
 # 📂 Directories
 # ==============================
@@ -16,6 +23,13 @@ CLEAN_JDS = BASE_DIR / "job_descriptions_cleaned"
 CLEAN_RESUMES.mkdir(parents=True, exist_ok=True)
 CLEAN_JDS.mkdir(parents=True, exist_ok=True)
 
+FILE_TIMEOUT = 120  # seconds before a stuck conversion is abandoned (parallel mode)
+MAX_TASKS_PER_CHILD = 200  # recycle workers now and then (parser memory growth)
+
+# extractor ids for the extraction cache; bump the version when a reader's output changes
+DOCX_EXTRACTOR = "docx-lines/1"
+PDF_EXTRACTOR = "pdf-pypdf2/1"
+
 
 # ==============================
 # 🔧 Helper Functions
@@ -25,12 +39,12 @@ def read_txt(file_path):
         return f.read()
 
 
-def read_docx(file_path):
+def _parse_docx(file_path):
     doc = Document(file_path)
     return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
 
 
-def read_pdf(file_path):
+def _parse_pdf(file_path):
     reader = PdfReader(file_path)
     text = []
     for page in reader.pages:
@@ -40,12 +54,24 @@ def read_pdf(file_path):
     return "\n".join(text)
 
 
+def read_docx(file_path):
+    return cached_extract(file_path, DOCX_EXTRACTOR, _parse_docx)
+
+
+def read_pdf(file_path):
+    return cached_extract(file_path, PDF_EXTRACTOR, _parse_pdf)
+
+
 def read_json(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
         return json.dumps(json.load(f), indent=2)
 
 
-def convert_to_json(input_path, output_dir, prefix):
+def convert_file(input_path, output_dir, prefix):
+    """Convert one file; returns a status record (never raises, so one bad file cannot stop a batch)."""
+    t0 = time.perf_counter()
+    record = {"file": input_path.name, "bytes": input_path.stat().st_size if input_path.exists() else 0,
+              "status": "ok", "seconds": 0.0, "error": ""}
     ext = input_path.suffix.lower()
     try:
         if ext == ".txt":
@@ -57,8 +83,8 @@ def convert_to_json(input_path, output_dir, prefix):
         elif ext == ".json":
             text = read_json(input_path)
         else:
-            print(f"⚠️ Skipping unsupported file: {input_path}")
-            return
+            record["status"] = "skipped"
+            return record
 
         output_data = {
             "id": input_path.stem,
@@ -70,28 +96,133 @@ def convert_to_json(input_path, output_dir, prefix):
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(output_data, f, indent=2, ensure_ascii=False)
 
-        print(f"✅ Converted {input_path.name} → {output_file.name}")
-
     except Exception as e:
-        print(f"❌ Error processing {input_path.name}: {e}")
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        record["seconds"] = round(time.perf_counter() - t0, 3)
+    return record
+
+
+def print_status(input_path, record):
+    if record["status"] == "ok":
+        print(f"✅ Converted {input_path.name} → {input_path.stem}.json")
+    elif record["status"] == "skipped":
+        print(f"⚠️ Skipping unsupported file: {input_path}")
+    else:
+        print(f"❌ Error processing {input_path.name}: {record['error']}")
+
+
+def convert_to_json(input_path, output_dir, prefix):
+    record = convert_file(input_path, output_dir, prefix)
+    print_status(input_path, record)
+    return record
 
 
 def process_folder(input_dir, output_dir, prefix):
-    for file in sorted(input_dir.glob("*")):
-        convert_to_json(file, output_dir, prefix)
+    return [convert_to_json(file, output_dir, prefix) for file in sorted(input_dir.glob("*"))]
+
+
+def process_folder_parallel(input_dir, output_dir, prefix, workers=0, timeout=FILE_TIMEOUT):
+    """
+    convert_file over a process pool (workers=0: one per core), largest files first so the
+    slow ones do not straggle at the end. At most `workers` files are in flight, so a file
+    that runs past `timeout` (hung parser, or a worker that died on it) is marked "timeout";
+    the pool is then restarted and the other in-flight files are retried.
+    """
+    workers = workers or os.cpu_count() or 1
+    files = sorted((f for f in input_dir.glob("*") if f.is_file()), key=lambda f: f.stat().st_size, reverse=True)
+    todo = deque(files)
+    inflight = {}  # path -> (AsyncResult, started)
+    records = []
+    pool = None
+    try:
+        while todo or inflight:
+            if pool is None:
+                pool = mp.Pool(workers, maxtasksperchild=MAX_TASKS_PER_CHILD)
+            while todo and len(inflight) < workers:
+                f = todo.popleft()
+                inflight[f] = (pool.apply_async(convert_file, (f, output_dir, prefix)), time.monotonic())
+            time.sleep(0.02)
+            for f, (result, started) in list(inflight.items()):
+                if result.ready():
+                    del inflight[f]
+                    try:
+                        record = result.get()
+                    except Exception as e:  # e.g. the record could not be sent back
+                        record = {"file": f.name, "bytes": f.stat().st_size, "status": "error",
+                                  "seconds": round(time.monotonic() - started, 3), "error": f"{type(e).__name__}: {e}"}
+                elif time.monotonic() - started > timeout:
+                    del inflight[f]
+                    record = {"file": f.name, "bytes": f.stat().st_size, "status": "timeout",
+                              "seconds": round(time.monotonic() - started, 3), "error": f"no result after {timeout}s"}
+                    pool.terminate()
+                    pool.join()
+                    pool = None
+                    todo.extendleft(reversed(list(inflight)))  # innocent bystanders start over
+                    inflight.clear()
+                else:
+                    continue
+                print_status(f, record)
+                records.append(record)
+                if pool is None:
+                    break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return records
+
+
+def write_report(records, report_path, wall_seconds):
+    """Per-file CSV (file, bytes, status, seconds, error) plus a short console summary."""
+    with open(report_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file", "bytes", "status", "seconds", "error"])
+        writer.writeheader()
+        writer.writerows(records)
+    counts = {}
+    for r in records:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    busy = sum(r["seconds"] for r in records)
+    print(f"📊 {len(records)} files in {wall_seconds:.1f}s (conversion time {busy:.1f}s): "
+          + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) + f" → {report_path}")
+    for r in sorted(records, key=lambda r: r["seconds"], reverse=True)[:3]:
+        if r["seconds"] > 0:
+            print(f"   slowest: {r['file']} {r['seconds']:.2f}s ({r['status']})")
 
 
 # ==============================
 # 🚀 Main
 # ==============================
+def convert_folder(input_dir, output_dir, prefix, workers=1, timeout=FILE_TIMEOUT):
+    t0 = time.perf_counter()
+    if workers == 1:
+        records = process_folder(input_dir, output_dir, prefix)
+    else:
+        records = process_folder_parallel(input_dir, output_dir, prefix, workers, timeout)
+    write_report(records, output_dir.parent / f"{output_dir.name}_report.csv", time.perf_counter() - t0)
+    return records
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Convert raw resumes / JDs (txt, docx, pdf, json) to JSON.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Conversion processes (1 = sequential, 0 = one per CPU core)")
+    parser.add_argument("--timeout", type=float, default=FILE_TIMEOUT,
+                        help="Parallel mode: seconds before a single file is given up on")
+    args = parser.parse_args()
+
     print("🔄 Converting resumes...")
-    process_folder(RAW_RESUMES, CLEAN_RESUMES, "resume")
+    records = convert_folder(RAW_RESUMES, CLEAN_RESUMES, "resume", args.workers, args.timeout)
 
     print("\n🔄 Converting job descriptions...")
-    process_folder(RAW_JDS, CLEAN_JDS, "jd")
+    records += convert_folder(RAW_JDS, CLEAN_JDS, "jd", args.workers, args.timeout)
 
-    print("\n✅ All files converted successfully!")
+    failed = sum(1 for r in records if r["status"] in ("error", "timeout"))
+    if failed:
+        print(f"\n⚠️ Done with {failed} failed file(s); see the *_report.csv files.")
+    else:
+        print("\n✅ All files converted successfully!")
 
 
 if __name__ == "__main__":
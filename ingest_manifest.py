@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+ingest_manifest.py
+
+Local record of what each ingestion script already put into Pinecone, so re-runs only
+touch files that changed.
+
+Per source file (absolute path) and scope (script + index + namespace) the manifest keeps:
+  hash        sha256 of the file bytes
+  model       embedding model used
+  config      anything else that changes the vectors (chunk size, id method, ...)
+  ids         vector ids the file produced
+  ingested_at timestamp
+
+A file is skipped when hash, model and config all match. When a file changed, the ids
+it no longer produces are orphans; when a file disappeared, all of its ids are. An id
+that another remaining entry still produces (same email-based candidate id, two copies
+of a file) is never an orphan. The ingest scripts delete orphans from the index
+(pinecone_io.delete_ids) and update the manifest only after their upserts succeed.
+
+Usage:
+  manifest = IngestManifest(".ingest_manifest.json", scope="resume_to_pinecone:polaris:Resumes")
+  if manifest.unchanged(path, model, config): skip
+  ...
+  orphans = manifest.record(path, ids, model, config); manifest.save()
+  orphans = manifest.release(manifest.vanished(present))   # removed files
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+MANIFEST_PATH = ".ingest_manifest.json"
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+    def __init__(self, path: str = MANIFEST_PATH, scope: str = "default"):
+        self.path = path
+        self.scope = scope
+        self.data: Dict[str, Dict[str, Dict]] = {}
+        self._hashes: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fh:
+                self.data = json.load(fh).get("scopes", {})
+        self.entries: Dict[str, Dict] = self.data.setdefault(scope, {})
+
+    @staticmethod
+    def key(path) -> str:
+        return os.path.abspath(str(path))
+
+    def hash_of(self, path) -> str:
+        """File hash, computed once per run."""
+        k = self.key(path)
+        if k not in self._hashes:
+            self._hashes[k] = file_hash(k)
+        return self._hashes[k]
+
+    def get(self, path) -> Optional[Dict]:
+        return self.entries.get(self.key(path))
+
+    def unchanged(self, path, model: str, config: str = "") -> bool:
+        e = self.get(path)
+        return bool(e) and e.get("model") == model and e.get("config") == config and e.get("hash") == self.hash_of(path)
+
+    def record(self, path, ids: Iterable[str], model: str, config: str = "") -> List[str]:
+        """Store the file's current state; returns its previous ids that no entry produces any more."""
+        ids = list(dict.fromkeys(ids))
+        old = (self.get(path) or {}).get("ids") or []
+        self.entries[self.key(path)] = {"hash": self.hash_of(path), "model": model, "config": config,
+                                        "ids": ids, "ingested_at": datetime.now().isoformat()}
+        return self.unowned(old)
+
+    def unowned(self, ids: Iterable[str]) -> List[str]:
+        """The ids (deduplicated, in order) that no entry of this scope references."""
+        owned = {vid for e in self.entries.values() for vid in (e.get("ids") or [])}
+        return [vid for vid in dict.fromkeys(ids) if vid not in owned]
+
+    def vanished(self, present: Iterable[str], within: Optional[Callable[[str], bool]] = None) -> Dict[str, List[str]]:
+        """{path: ids} of recorded files that are not in `present` (and pass `within`, e.g. same folder)."""
+        present = {self.key(p) for p in present}
+        return {k: list(e.get("ids") or []) for k, e in self.entries.items()
+                if k not in present and (within is None or within(k))}
+
+    def forget(self, path) -> None:
+        self.entries.pop(self.key(path), None)
+
+    def release(self, paths: Iterable[str]) -> List[str]:
+        """Forget the given files; returns their ids that no remaining entry references (safe to delete)."""
+        old = []
+        for path in paths:
+            old.extend((self.get(path) or {}).get("ids") or [])
+            self.forget(path)
+        return self.unowned(old)
+
+    def save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"scopes": self.data}, fh, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+
+def under_dir(folder) -> Callable[[str], bool]:
+    """`within` filter: files directly inside `folder`."""
+    root = os.path.abspath(str(folder))
+    return lambda k: os.path.dirname(k) == root
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+ingest_pipeline.py
+
+Small staged pipeline for ingestion: each stage runs on its own worker threads and
+stages are connected by bounded queues, so parsing, note generation, embedding and
+upserts overlap. A full queue blocks the stage feeding it (backpressure), so the
+pipeline runs at the pace of its slowest stage without fixed sleeps or unbounded
+buffering.
+
+- Stage(name, fn, workers, queue_size, expand): fn maps one item to one output item;
+  with expand=True it returns an iterable and every element is passed on separately.
+  Returning None drops the item. An optional flush() is called once after the stage's
+  last input (e.g. to emit a partially filled batch) and its outputs are passed on too.
+- run_pipeline(source, stages): feeds `source` through the stages and returns per-stage
+  stats; the first exception in any stage stops the pipeline and is re-raised.
+
+Usage:
+  stats = run_pipeline(files, [Stage("parse", parse, expand=True),
+                               Stage("embed", embed, workers=2),
+                               Stage("upsert", upsert, workers=2)])
+  print_stage_stats(stats)
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1,
+                 queue_size: int = 4, expand: bool = False, flush: Optional[Callable[[], Iterable[Any]]] = None):
+        self.name = name
+        self.fn = fn
+        self.flush = flush
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)  # bounded input queue of this stage
+        self.expand = expand
+        self.items = 0
+        self.busy = 0.0  # seconds spent inside fn, summed over workers
+        self.blocked = 0.0  # seconds spent waiting for room downstream
+        self.lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"stage": self.name, "workers": self.workers, "items": self.items,
+                "busy_s": round(self.busy, 3), "blocked_s": round(self.blocked, 3)}
+
+
+class _Abort(Exception):
+    pass
+
+
+def _put(q: "queue.Queue", item: Any, stop: threading.Event) -> float:
+    """Blocking put that gives up when the pipeline is stopping; returns seconds blocked."""
+    t0 = time.monotonic()
+    while True:
+        if stop.is_set():
+            raise _Abort()
+        try:
+            q.put(item, timeout=0.2)
+            return time.monotonic() - t0
+        except queue.Full:
+            continue
+
+
+def _get(q: "queue.Queue", stop: threading.Event) -> Any:
+    while True:
+        if stop.is_set():
+            raise _Abort()
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+
+
+def run_pipeline(source: Iterable[Any], stages: List[Stage],
+                 sink: Optional[Callable[[Any], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Run every item of `source` through `stages` concurrently. Outputs of the last stage
+    go to `sink` (if given). Returns per-stage stats; re-raises the first stage error.
+    """
+    queues = [queue.Queue(maxsize=s.queue_size) for s in stages] + [queue.Queue(maxsize=64)]
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def fail(e: BaseException) -> None:
+        if not isinstance(e, _Abort):
+            errors.append(e)
+        stop.set()
+
+    def feed():
+        try:
+            for item in source:
+                _put(queues[0], item, stop)
+            _put(queues[0], _DONE, stop)
+        except BaseException as e:
+            fail(e)
+
+    def work(i: int, stage: Stage, remaining: List[int]):
+        q_in, q_out = queues[i], queues[i + 1]
+        try:
+            while True:
+                item = _get(q_in, stop)
+                if item is _DONE:
+                    _put(q_in, _DONE, stop)  # let sibling workers see it too
+                    break
+                t0 = time.monotonic()
+                out = stage.fn(item)
+                if stage.expand and out is not None:
+                    out = list(out)
+                busy = time.monotonic() - t0
+                blocked = 0.0
+                if out is not None:
+                    for o in (out if stage.expand else [out]):
+                        blocked += _put(q_out, o, stop)
+                with stage.lock:
+                    stage.items += 1
+                    stage.busy += busy
+                    stage.blocked += blocked
+            with stage.lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                if stage.flush is not None:
+                    for o in stage.flush() or []:
+                        _put(q_out, o, stop)
+                _put(q_out, _DONE, stop)
+        except BaseException as e:
+            fail(e)
+
+    threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+    for i, stage in enumerate(stages):
+        remaining = [stage.workers]
+        for w in range(stage.workers):
+            threads.append(threading.Thread(target=work, args=(i, stage, remaining),
+                                            name=f"pipeline-{stage.name}-{w}", daemon=True))
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            item = _get(queues[-1], stop)
+            if item is _DONE:
+                break
+            if sink is not None:
+                sink(item)
+    except _Abort:
+        pass
+    except BaseException as e:
+        fail(e)
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return [s.stats() for s in stages]
+
+
+def print_stage_stats(stats: List[Dict[str, Any]]) -> None:
+    """One line per stage; the stage with the most busy time per worker is the bottleneck."""
+    if not stats:
+        return
+    slowest = max(stats, key=lambda s: s["busy_s"] / s["workers"])
+    for s in stats:
+        mark = "  <- bottleneck" if s is slowest else ""
+        print(f"  {s['stage']:8} workers={s['workers']} items={s['items']} "
+              f"busy={s['busy_s']:.2f}s blocked={s['blocked_s']:.2f}s{mark}")
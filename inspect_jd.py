@@ -5,8 +5,11 @@ import re
 import sys
 from pinecone import Pinecone
 from openai import OpenAI
+from rate_limit import get_controller, call_openai
 from sentence_transformers import SentenceTransformer
 
+from content_store import TEXT_REF, load_texts
+
 # ---------------- CONFIG ----------------
 INDEX_NAME = "prototype-index"
 JD_NAMESPACE = "jd"
@@ -27,7 +30,7 @@ if not OPENAI_API_KEY:
 # ---------------- CLIENTS ----------------
 pc = Pinecone(api_key=PINECONE_API_KEY)
 index = pc.Index(INDEX_NAME)
-llm = OpenAI(api_key=OPENAI_API_KEY)
+llm = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)  # retries: rate_limit.CallController
 
 embed_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
 EMBED_DIM = embed_model.get_sentence_embedding_dimension()  # should match your index dimension
@@ -125,6 +128,8 @@ def fetch_jds():
         # prefer explicit 'text' field, else construct one
         if md.get("text"):
             text = md.get("text")
+        elif md.get(TEXT_REF):
+            text = None  # read from the content store only for the JD that is used
         else:
             title = md.get("title", "")
             exp = md.get("experience_required", "")
@@ -209,6 +214,8 @@ def main():
     # choose first JD for now
     jd = jds[0]
     jd_text = jd["text"]
+    if jd_text is None:
+        jd_text = load_texts([jd["metadata"]])[0] or ""
     print(f"[INFO] Using JD id={jd['id']} (len={len(jd_text)} chars)")
 
     # 3) Create JD embedding (ensure same model used when upserting JDs if possible)
@@ -238,7 +245,9 @@ def main():
     # 6) Build prompt and call GPT
     prompt = build_prompt(jd_text, candidates)
     print("[INFO] Calling GPT-4o-mini for re-ranking (this may take a few seconds)...")
-    response = llm.chat.completions.create(
+    response = call_openai(
+        get_controller("openai-chat"), llm.chat.completions,
+        tokens=len(prompt) // 4 + 1000,
         model=OPENAI_MODEL,
         messages=[{"role": "system", "content": "You are a strict JSON-only responder."},
                   {"role": "user", "content": prompt}],
@@ -1,13 +1,42 @@
+"""
+jd_extractor.py
+
+Extract structured JD fields (job_title, experience_required, primary_skills, ...) from
+raw JD text with the Responses API.
+
+Single file:  python jd_extractor.py --input data/jds_raw/backend.txt
+Batch:        python jd_extractor.py --dir data/jds_raw --pattern "*.txt" --workers 8
+
+Batch mode runs the extractions concurrently under the shared rate limiter
+(rate_limit.py) and writes every output plus a per-file report (<out>_report.csv) in
+one run. Results are cached by (JD text hash, prompt version, model) in their own
+store, JD_RESULT_CACHE_PATH (default .jd_result_cache.sqlite, "off" disables), so
+unchanged JDs are never sent twice; the prompt version changes automatically when
+the prompt template is edited.
+"""
 import os
+import csv
+import sys
 import json
+import time
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from openai import OpenAI
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+from rate_limit import get_controller, call_openai, CallFailed
+from note_cache import prompt_fingerprint
+from sqlite_store import SQLiteStore, StoreSingleton
+
+client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), max_retries=0)  # retries: rate_limit.CallController
 
-def extract_jd(text: str):
-    prompt = f"""
+MODEL = "gpt-4o-mini"
+OUT_DIR = "data/jds"
+JD_RESULT_CACHE_PATH = os.environ.get("JD_RESULT_CACHE_PATH", ".jd_result_cache.sqlite")
+
+def make_prompt(text: str) -> str:
+    return f"""
 You are an expert Job Description extractor.
 
 Given the raw JD text below, extract the following fields:
@@ -26,40 +55,165 @@ JD TEXT:
 {text}
 """
 
-    resp = client.responses.create(
-        model="gpt-4o-mini",
+# bump PROMPT_VERSION for semantic changes; template edits change the fingerprint on their own
+PROMPT_VERSION = "v1"
+EXTRACT_PROMPT_VERSION = f"{PROMPT_VERSION}:{prompt_fingerprint(lambda _section, text: make_prompt(text))}"
+
+class JDResultCache(SQLiteStore):
+    """Extracted JD JSON keyed by (text hash, prompt version, model)."""
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS jd_results ("
+              "text_hash TEXT, prompt_version TEXT, model TEXT, result TEXT, created_at REAL, "
+              "PRIMARY KEY (text_hash, prompt_version, model))",)
+
+    @staticmethod
+    def key(text: str):
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+    def get(self, text: str, prompt_version: str, model: str):
+        with self._lock:
+            row = self._db.execute("SELECT result FROM jd_results WHERE text_hash=? AND prompt_version=? AND model=?",
+                                   (self.key(text), prompt_version, model)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, text: str, prompt_version: str, model: str, result) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO jd_results (text_hash, prompt_version, model, result, created_at) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (self.key(text), prompt_version, model, json.dumps(result, ensure_ascii=False), time.time()))
+            self._db.commit()
+
+_result_cache = StoreSingleton(JDResultCache, JD_RESULT_CACHE_PATH, "JD result cache")
+
+def get_jd_result_cache():
+    return _result_cache.get()
+
+def extract_jd(text: str, model: str = MODEL):
+    prompt = make_prompt(text)
+
+    resp = call_openai(
+        get_controller("openai-responses"), client.responses,
+        tokens=len(prompt) // 4 + 1000,
+        model=model,
         input=prompt
     )
 
+    out = resp.output_text
     try:
-        out = resp.output_text
         return json.loads(out)
     except Exception:
         # fallback safe parse
         cleaned = out[out.find("{") : out.rfind("}") + 1]
         return json.loads(cleaned)
 
+def extract_jd_cached(text: str, model: str = MODEL):
+    """(jd, from_cache): cached by (text hash, prompt version, model); failures are not cached.
+    The cache is best-effort: a read or write error is logged and the call goes to the API."""
+    cache = get_jd_result_cache()
+    if cache:
+        try:
+            hit = cache.get(text, EXTRACT_PROMPT_VERSION, model)
+        except Exception as e:
+            print(f"WARNING: JD result cache read failed: {e}", file=sys.stderr)
+            hit = None
+        if hit is not None:
+            return hit, True
+    jd = extract_jd(text, model)
+    if cache:
+        try:
+            cache.put(text, EXTRACT_PROMPT_VERSION, model, jd)
+        except Exception as e:
+            print(f"WARNING: JD result cache write failed: {e}", file=sys.stderr)
+    return jd, False
+
+def output_path(src_file: Path, out_dir: Path) -> Path:
+    return out_dir / (src_file.stem.replace(" ", "_") + ".json")
+
+def process_file(src_file: Path, out_dir: Path, model: str = MODEL) -> dict:
+    """Extract one JD file and write its JSON; returns a report row (never raises)."""
+    t0 = time.perf_counter()
+    row = {"file": str(src_file), "status": "ok", "seconds": 0.0, "output": "", "error": ""}
+    try:
+        raw_text = src_file.read_text(encoding="utf-8", errors="replace")
+        if not raw_text.strip():
+            raise ValueError("empty JD text")
+        jd, cached = extract_jd_cached(raw_text, model)
+        out_path = output_path(src_file, out_dir)
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(jd, f, indent=2)
+        row["status"] = "cached" if cached else "ok"
+        row["output"] = str(out_path)
+    except CallFailed as e:
+        row["status"], row["error"] = "error", f"API: {e}"
+    except Exception as e:
+        row["status"], row["error"] = "error", f"{type(e).__name__}: {e}"
+    row["seconds"] = round(time.perf_counter() - t0, 3)
+    return row
+
+def run_batch(files, out_dir: Path, model: str, workers: int):
+    """Extract all files concurrently (the shared controller enforces rpm/tpm and backs off on 429s)."""
+    done = 0
+    rows = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for row in pool.map(lambda p: process_file(p, out_dir, model), files):
+            done += 1
+            rows.append(row)
+            mark = "ERROR " + row["error"] if row["status"] == "error" else row["status"]
+            print(f"[{done}/{len(files)}] {Path(row['file']).name}: {mark}")
+    return rows
+
+def write_report(rows, report_path: Path):
+    with open(report_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["file", "status", "seconds", "output", "error"])
+        writer.writeheader()
+        writer.writerows(rows)
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, help="Path to JD text file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="Path to JD text file")
+    source.add_argument("--dir", help="Batch mode: folder of JD text files")
+    parser.add_argument("--pattern", default="*.txt", help="Batch mode: file glob inside --dir")
+    parser.add_argument("--out", default=OUT_DIR, help="Output folder for extracted JD JSON")
+    parser.add_argument("--model", default=MODEL)
+    parser.add_argument("--workers", type=int, default=8, help="Batch mode: concurrent extractions")
+    parser.add_argument("--rpm", type=int, default=500, help="Requests/minute (refined from rate-limit headers)")
+    parser.add_argument("--tpm", type=int, default=200000, help="Tokens/minute (refined from rate-limit headers)")
     args = parser.parse_args()
 
-    src_file = Path(args.input)
-    if not src_file.exists():
-        print("ERROR: JD input file NOT found:", src_file)
+    get_controller("openai-responses", rpm=args.rpm, tpm=args.tpm, max_concurrency=max(1, args.workers))
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.input:
+        src_file = Path(args.input)
+        if not src_file.exists():
+            print("ERROR: JD input file NOT found:", src_file)
+            return
+        row = process_file(src_file, out_dir, args.model)
+        if row["status"] == "error":
+            print("ERROR: JD extraction failed:", row["error"])
+            sys.exit(1)
+        print("JD extraction completed:", row["output"] + (" (cached)" if row["status"] == "cached" else ""))
         return
 
-    raw_text = src_file.read_text(encoding="utf-8", errors="replace")
-
-    jd = extract_jd(raw_text)
-
-    out_path = Path("data/jds") / (src_file.stem.replace(" ", "_") + ".json")
-    out_path.parent.mkdir(exist_ok=True)
-
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(jd, f, indent=2)
-
-    print("JD extraction completed:", out_path)
+    files = sorted(p for p in Path(args.dir).glob(args.pattern) if p.is_file())
+    if not files:
+        print("ERROR: no JD files match", Path(args.dir) / args.pattern)
+        sys.exit(1)
+    print(f"Batch mode: {len(files)} files, {args.workers} workers, model={args.model}")
+    t0 = time.perf_counter()
+    rows = run_batch(files, out_dir, args.model, args.workers)
+    report_path = out_dir.parent / f"{out_dir.name}_report.csv"
+    write_report(rows, report_path)
+
+    counts = {}
+    for r in rows:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    print(f"Done in {time.perf_counter() - t0:.1f}s: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items()))
+          + f". Report: {report_path}")
+    if counts.get("error"):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
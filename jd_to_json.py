@@ -7,6 +7,8 @@ Each output is a single JSON object (not a list); keys: jd_id, title, primary_sk
 import os, sys, json, argparse, uuid, re
 from pathlib import Path
 from datetime import datetime
+
+from extraction_cache import cached_extract
 try:
     import docx
 except Exception:
@@ -15,11 +17,16 @@ except Exception:
 def read_txt(path: Path) -> str:
     return path.read_text(encoding="utf-8-sig")
 
+DOCX_EXTRACTOR = "docx-paragraphs/1"  # extraction cache id; bump when _parse_docx output changes
+
+def _parse_docx(path: Path) -> str:
+    d = docx.Document(str(path))
+    return "\n\n".join(p.text for p in d.paragraphs if p.text and p.text.strip())
+
 def read_docx(path: Path) -> str:
     if not docx:
         raise RuntimeError("python-docx required to read .docx (pip install python-docx)")
-    d = docx.Document(str(path))
-    return "\n\n".join(p.text for p in d.paragraphs if p.text and p.text.strip())
+    return cached_extract(path, DOCX_EXTRACTOR, _parse_docx)
 
 def simple_extract_skills(text: str):
     # naive: look for "Skills:" or "Primary Skills" line and take following comma list
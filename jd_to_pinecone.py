@@ -4,6 +4,10 @@ jd_to_pinecone.py
 
 Load job-description JSON files from data/jds (or convert from jds_raw),
 generate a short embedding-text field, and upsert each JD into Pinecone under namespace Job_Descriptions.
+All JDs of the folder are embedded together in token-budgeted requests (see embedding_packer.py)
+and upserted in batches. Files unchanged since the last run (per the ingestion manifest,
+see ingest_manifest.py) are skipped; JDs whose file was removed or whose jd_id changed are
+deleted from the namespace.
 
 Usage:
   python jd_to_pinecone.py --data-dir data/jds
@@ -13,11 +17,19 @@ from pathlib import Path
 from openai import OpenAI
 from pinecone import Pinecone
 
+from embedding_cache import get_cache, embed_with_cache
+from embedding_packer import embed_packed
+from rate_limit import get_controller, call_openai
+from pinecone_io import upsert_vectors, delete_ids
+from ingest_manifest import IngestManifest, MANIFEST_PATH, under_dir
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--data-dir", default="data/jds")
 parser.add_argument("--namespace", default="Job_Descriptions")
 parser.add_argument("--index", default=os.environ.get("PINECONE_INDEX"))
 parser.add_argument("--emb-model", default="text-embedding-3-large")
+parser.add_argument("--manifest", default=MANIFEST_PATH,
+                    help="Ingestion manifest for skipping unchanged files ('off' to re-ingest everything)")
 args = parser.parse_args()
 
 DATA_DIR = Path(args.data_dir)
@@ -31,7 +43,7 @@ if not PINECONE_KEY or not INDEX_NAME:
     print("ERROR: set PINECONE_API_KEY and PINECONE_INDEX", file=sys.stderr); sys.exit(1)
 pc = Pinecone(api_key=PINECONE_KEY)
 ix = pc.Index(INDEX_NAME)
-client = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
+client = OpenAI(api_key=OPENAI_KEY, max_retries=0) if OPENAI_KEY else None  # retries: rate_limit.CallController
 
 def build_text_for_embedding(j):
     # combine title, skills, description, experience into one text for embedding
@@ -50,7 +62,28 @@ def build_text_for_embedding(j):
         parts.append(str(meta["experience_required"]))
     return "\n".join(parts)
 
-for f in sorted(DATA_DIR.glob("*.json")):
+def embed_request(texts):
+    resp = call_openai(get_controller("openai-embeddings"), client.embeddings,
+                       tokens=sum(len(t) for t in texts) // 4, model=EMB_MODEL, input=texts)
+    return [d.embedding for d in resp.data]
+
+manifest = None
+if args.manifest.lower() != "off":
+    manifest = IngestManifest(args.manifest, scope=f"jd_to_pinecone:{INDEX_NAME}:{NAMESPACE}")
+
+files = sorted(DATA_DIR.glob("*.json"))
+if manifest:
+    gone = manifest.vanished([str(f) for f in files], within=under_dir(DATA_DIR))
+    if gone:
+        n = delete_ids(ix, manifest.release(gone), NAMESPACE)  # ids still produced by another file are kept
+        manifest.save()
+        print(f"Deleted {n} JDs of {len(gone)} removed files")
+    todo = [f for f in files if not manifest.unchanged(f, EMB_MODEL)]
+    print(f"Manifest: {len(files) - len(todo)} unchanged JD files skipped, {len(todo)} to ingest")
+    files = todo
+
+jds = []
+for f in files:
     with f.open("r", encoding="utf-8-sig") as fh:
         j = json.load(fh)
     # ensure metadata keys
@@ -59,16 +92,28 @@ for f in sorted(DATA_DIR.glob("*.json")):
     j.setdefault("title", j.get("title") or f.stem)
     jd_id = j.get("jd_id") or j.get("metadata", {}).get("jd_id") or f.stem
     emb_text = build_text_for_embedding(j)
-    # generate embedding
-    if not client:
-        print("ERROR: OPENAI_API_KEY required to generate embeddings", file=sys.stderr); sys.exit(1)
-    emb_resp = client.embeddings.create(model=EMB_MODEL, input=[emb_text])
-    vec = emb_resp.data[0].embedding
     # prepare metadata to upsert
     meta = j.get("metadata", {})
     meta.update({"title": j.get("title",""), "experience_required": j.get("experience_required",""), "primary_skills": meta.get("primary_skills",[])})
+    jds.append((f, jd_id, emb_text, meta))
+
+if jds:
+    # generate embeddings: cache hits first, misses packed into as few requests as the limits allow
+    if not client:
+        print("ERROR: OPENAI_API_KEY required to generate embeddings", file=sys.stderr); sys.exit(1)
+    vecs = embed_with_cache(get_cache(), EMB_MODEL, 0, [t for (_f, _id, t, _m) in jds],
+                            lambda texts: embed_packed(texts, embed_request, model=EMB_MODEL))
     try:
-        ix.upsert(vectors=[(jd_id, vec, meta)], namespace=NAMESPACE)
-        print(f"Upserted {f.name} -> jd_id={jd_id}")
+        upsert_vectors(ix, [(jd_id, vec, meta) for (_f, jd_id, _t, meta), vec in zip(jds, vecs)], NAMESPACE)
+        for f, jd_id, _t, _m in jds:
+            print(f"Upserted {f.name} -> jd_id={jd_id}")
+        if manifest:
+            orphans = []
+            for f, jd_id, _t, _m in jds:
+                orphans.extend(manifest.record(f, [jd_id], EMB_MODEL))
+            orphans = manifest.unowned(orphans)
+            if orphans:
+                delete_ids(ix, orphans, NAMESPACE)
+            manifest.save()
     except Exception as e:
         print("Upsert failed:", e, file=sys.stderr)
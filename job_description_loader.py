@@ -1,8 +1,10 @@
 import os
 import json
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
 
+from local_embedder import LocalEmbedder
+from content_store import get_content_store, offload_text
+
 # === CONFIGURATION ===
 INDEX_NAME = "prototype-index"
 JD_NAMESPACE = "jd"
@@ -11,52 +13,60 @@ EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 # Pinecone API key from environment
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY", "YOUR_PINECONE_API_KEY")
 
-# === INITIALIZE ===
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(INDEX_NAME)
-
-model = SentenceTransformer(EMBEDDING_MODEL)
-
 # === LOAD JDs FROM FILES ===
 JD_FOLDER = "data/job_description"
-jd_files = [f for f in os.listdir(JD_FOLDER) if f.endswith(".json")]
-
-if not jd_files:
-    print("[ERROR] No JD JSON files found in folder:", JD_FOLDER)
-    exit()
-
-print(f"[INFO] Found {len(jd_files)} JD JSON files:")
-for f in jd_files:
-    print("  -", os.path.join(JD_FOLDER, f))
-
-# === UPLOAD JDs TO PINECONE ===
-to_upsert = []
-for jd_file in jd_files:
-    path = os.path.join(JD_FOLDER, jd_file)
-    with open(path, "r", encoding="utf-8") as f:
-        jd_json = json.load(f)
-
-    # Assume each JD JSON has "id" and "text"
-    jd_id = jd_json.get("id", jd_file.replace(".json", ""))
-    jd_text = jd_json.get("text", "")
-    if not jd_text:
-        print(f"[WARNING] JD '{jd_file}' has empty 'text', skipping...")
-        continue
-
-    # Generate embedding
-    embedding = model.encode(jd_text).tolist()
-
-    metadata = {
-        "jd_id": jd_id,
-        "text": jd_text,
-        "source_file": jd_file
-    }
-
-    to_upsert.append((jd_id, embedding, metadata))
-
-# Upsert into Pinecone
-if to_upsert:
-    index.upsert(vectors=to_upsert, namespace=JD_NAMESPACE)
-    print(f"[INFO] Upserted {len(to_upsert)} JDs into namespace '{JD_NAMESPACE}' ✅")
-else:
-    print("[ERROR] No JDs to upsert.")
+
+
+def iter_jd_docs(jd_files):
+    """
+    (jd_id, text, metadata) per JD file with non-empty text. The text is offloaded to the
+    content store only when CONTENT_STORE_PATH enables it; otherwise it stays in the metadata.
+    """
+    store = get_content_store()
+    for jd_file in jd_files:
+        path = os.path.join(JD_FOLDER, jd_file)
+        with open(path, "r", encoding="utf-8") as f:
+            jd_json = json.load(f)
+
+        # Assume each JD JSON has "id" and "text"
+        jd_id = jd_json.get("id", jd_file.replace(".json", ""))
+        jd_text = jd_json.get("text", "")
+        if not jd_text:
+            print(f"[WARNING] JD '{jd_file}' has empty 'text', skipping...")
+            continue
+
+        metadata = offload_text(store, JD_NAMESPACE, jd_id, jd_text, {
+            "jd_id": jd_id,
+            "source_file": jd_file
+        })
+
+        yield jd_id, jd_text, metadata
+
+
+def main():
+    jd_files = [f for f in os.listdir(JD_FOLDER) if f.endswith(".json")]
+
+    if not jd_files:
+        print("[ERROR] No JD JSON files found in folder:", JD_FOLDER)
+        exit()
+
+    print(f"[INFO] Found {len(jd_files)} JD JSON files:")
+    for f in jd_files:
+        print("  -", os.path.join(JD_FOLDER, f))
+
+    # === INITIALIZE (here, not at import: pool workers re-import this module) ===
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    index = pc.Index(INDEX_NAME)
+    embedder = LocalEmbedder(EMBEDDING_MODEL)
+
+    # === UPLOAD JDs TO PINECONE (embedded in length-sorted batches, upserted per window) ===
+    upserted = embedder.upsert_stream(iter_jd_docs(jd_files), index, JD_NAMESPACE)
+    if upserted:
+        print(f"[INFO] Upserted {upserted} JDs into namespace '{JD_NAMESPACE}' ✅")
+    else:
+        print("[ERROR] No JDs to upsert.")
+
+
+# the guard matters with LOCAL_EMBED_PROCESSES > 1: pool workers re-import this module
+if __name__ == "__main__":
+    main()
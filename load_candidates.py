@@ -1,48 +1,47 @@
 import os
 import json
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
 
-# Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+from local_embedder import LocalEmbedder
+
 index_name = "prototype-index"
-index = pc.Index(index_name)
 
 # Embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 
 folder = "data/resumes"
-candidates = []
-
-for file in os.listdir(folder):
-    if file.endswith(".json"):
-        path = os.path.join(folder, file)
-        with open(path, "r", encoding="utf-8") as f:
-            resume = json.load(f)
-
-        # Join fields to make text for embedding
-        text_parts = [
-            resume.get("summary", ""),
-            " ".join(resume.get("key_skills", [])),
-            " ".join(resume.get("technical_skills", {}).get("languages", [])),
-            " ".join(resume.get("technical_skills", {}).get("technologies", [])),
-        ]
-        combined_text = " ".join(text_parts)
-
-        embedding = model.encode(combined_text).tolist()
-
-        candidates.append({
-            "id": resume["id"],
-            "values": embedding,
-            "metadata": {
+
+
+def iter_candidate_docs():
+    for file in os.listdir(folder):
+        if file.endswith(".json"):
+            path = os.path.join(folder, file)
+            with open(path, "r", encoding="utf-8") as f:
+                resume = json.load(f)
+
+            # Join fields to make text for embedding
+            text_parts = [
+                resume.get("summary", ""),
+                " ".join(resume.get("key_skills", [])),
+                " ".join(resume.get("technical_skills", {}).get("languages", [])),
+                " ".join(resume.get("technical_skills", {}).get("technologies", [])),
+            ]
+            combined_text = " ".join(text_parts)
+
+            yield resume["id"], combined_text, {
                 "name": resume.get("name", ""),
                 "summary": resume.get("summary", "")
             }
-        })
-
-# Insert into Pinecone
-if candidates:
-    index.upsert(vectors=candidates, namespace="JD-Backend-2025")
-    print(f"✅ Inserted {len(candidates)} candidates into namespace 'JD-Backend-2025'")
-else:
-    print("⚠️ No resumes found")
+
+
+# Embed in length-sorted batches and insert into Pinecone window by window
+# (guarded, clients and model built here: with LOCAL_EMBED_PROCESSES > 1 the pool workers re-import this module)
+if __name__ == "__main__":
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    index = pc.Index(index_name)
+    embedder = LocalEmbedder(EMBEDDING_MODEL)
+    inserted = embedder.upsert_stream(iter_candidate_docs(), index, "JD-Backend-2025")
+    if inserted:
+        print(f"✅ Inserted {inserted} candidates into namespace 'JD-Backend-2025'")
+    else:
+        print("⚠️ No resumes found")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+local_embedder.py
+
+Batched local embedding backend for the SentenceTransformer loaders
+(resume_loader.py, job_description_loader.py, load_candidates.py).
+
+- Documents are encoded in batches sorted by text length, so each batch pads to a
+  similar length (much less wasted work than one encode() call per document).
+- Optionally fans out across CPU cores with SentenceTransformer's multi-process pool.
+  The pool's workers re-import the calling script, so callers build the embedder and
+  their clients inside main() (behind the __main__ guard), never at import time.
+- Results are streamed in windows: while one window is being upserted (on a background
+  thread) the next one is already encoding.
+- Texts already in the on-disk embedding cache (embedding_cache.py) are not re-encoded.
+
+Configuration (environment):
+  LOCAL_EMBED_BATCH      texts per encode batch (default 64)
+  LOCAL_EMBED_PROCESSES  worker processes; 0/1 = encode in-process (default 0)
+  LOCAL_EMBED_WINDOW     documents encoded before each upsert (default 1024)
+
+Usage:
+  embedder = LocalEmbedder("sentence-transformers/all-MiniLM-L6-v2")
+  n = embedder.upsert_stream(docs, index, namespace)   # docs: iterable of (id, text, metadata)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from embedding_cache import get_cache, embed_with_cache
+
+LOCAL_EMBED_BATCH = int(os.environ.get("LOCAL_EMBED_BATCH", "64"))
+LOCAL_EMBED_PROCESSES = int(os.environ.get("LOCAL_EMBED_PROCESSES", "0"))
+LOCAL_EMBED_WINDOW = int(os.environ.get("LOCAL_EMBED_WINDOW", "1024"))
+UPSERT_BATCH = 100
+
+
+class LocalEmbedder:
+    def __init__(self, model_name: str, model=None, batch_size: int = LOCAL_EMBED_BATCH,
+                 processes: int = LOCAL_EMBED_PROCESSES):
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = model
+        self.dim = model.get_sentence_embedding_dimension()
+        self.batch_size = max(1, batch_size)
+        self.processes = processes
+        self._pool = None
+
+    # ---------- encoding ----------
+    def _start_pool(self):
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+        return self._pool
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def encode(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed texts (any order) in length-sorted batches; vectors come back in input order."""
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        ordered = [texts[i] for i in order]
+        if self.processes > 1 and len(texts) > self.batch_size:
+            chunk = max(self.batch_size, len(ordered) // (self.processes * 4))
+            vecs = self.model.encode_multi_process(ordered, self._start_pool(), batch_size=self.batch_size,
+                                                   chunk_size=chunk)
+        else:
+            vecs = self.model.encode(ordered, batch_size=self.batch_size, convert_to_numpy=True,
+                                     show_progress_bar=False)
+        out: List[Optional[List[float]]] = [None] * len(texts)
+        for pos, i in enumerate(order):
+            out[i] = vecs[pos].tolist()
+        return out
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """encode() behind the on-disk embedding cache."""
+        return embed_with_cache(get_cache(), self.model_name, self.dim, list(texts), self.encode)
+
+    # ---------- streaming ----------
+    def stream(self, docs: Iterable[Tuple[str, str, Dict]],
+               window: int = LOCAL_EMBED_WINDOW) -> Iterator[List[Tuple[str, List[float], Dict]]]:
+        """Yield lists of (id, vector, metadata), one per window of input documents."""
+        buf: List[Tuple[str, str, Dict]] = []
+        for doc in docs:
+            buf.append(doc)
+            if len(buf) >= window:
+                yield self._embed_window(buf)
+                buf = []
+        if buf:
+            yield self._embed_window(buf)
+
+    def _embed_window(self, buf: List[Tuple[str, str, Dict]]) -> List[Tuple[str, List[float], Dict]]:
+        vecs = self.embed([text for _id, text, _meta in buf])
+        return [(vid, vec, meta) for (vid, _text, meta), vec in zip(buf, vecs)]
+
+    def upsert_stream(self, docs: Iterable[Tuple[str, str, Dict]], index, namespace: str,
+                      window: int = LOCAL_EMBED_WINDOW, batch_size: int = UPSERT_BATCH) -> int:
+        """Embed docs window by window and upsert each window while the next one encodes."""
+        from pinecone_io import upsert_vectors
+        written = 0
+        pending = None
+        with ThreadPoolExecutor(max_workers=1) as uploader:
+            try:
+                for vectors in self.stream(docs, window=window):
+                    if pending is not None:
+                        written += pending.result()
+                    pending = uploader.submit(upsert_vectors, index, vectors, namespace, batch_size=batch_size)
+                if pending is not None:
+                    written += pending.result()
+            finally:
+                self.close()
+        return written
@@ -15,7 +15,9 @@ import sys
 import json
 import csv
 import math
-from typing import List, Dict, Any
+import heapq
+import argparse
+from typing import List, Dict, Any, Tuple
 
 # try numpy for speed/accuracy; fall back to pure-Python
 try:
@@ -28,6 +30,8 @@ try:
 except Exception as e:
     raise SystemExit("Missing dependency: pinecone (v4). Install with: python -m pip install 'pinecone-client'") from e
 
+from pinecone_io import iter_vector_ids, open_index, fetch_vectors
+
 # ---------- Helpers ----------
 def cosine_sim(a: List[float], b: List[float]) -> float:
     if a is None or b is None:
@@ -77,102 +81,98 @@ def safe_extract_vector(entry: Any) -> List[float]:
     # nothing found
     return None
 
+def candidate_of(rid: str, metadata: Dict[str, Any]) -> str:
+    return (metadata or {}).get("candidate_id") or (rid.split("_chunk")[0] if "_chunk" in rid else rid)
+
+class TopKPerJD:
+    """
+    Bounded min-heaps per JD: the K best chunks and the K best candidates (by best chunk
+    score) without materializing or sorting the full resume x JD list.
+    """
+    def __init__(self, k: int):
+        self.k = k
+        self.chunks: Dict[str, List[Tuple[float, str]]] = {}
+        self.cand_best: Dict[str, Dict[str, float]] = {}
+
+    def add(self, rid: str, candidate: str, jid: str, score: float) -> None:
+        heap = self.chunks.setdefault(jid, [])
+        if len(heap) < self.k:
+            heapq.heappush(heap, (score, rid))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, rid))
+        best = self.cand_best.setdefault(jid, {})
+        if score > best.get(candidate, -math.inf):
+            best[candidate] = score
+
+    def top_chunks(self, jid: str) -> List[Tuple[str, float]]:
+        return [(rid, score) for score, rid in sorted(self.chunks.get(jid, []), reverse=True)]
+
+    def top_candidates(self, jid: str) -> List[Tuple[str, float]]:
+        return heapq.nlargest(self.k, self.cand_best.get(jid, {}).items(), key=lambda x: x[1])
+
 # ---------- Pinecone wrapper ----------
 class PineconeHelper:
     def __init__(self, api_key: str, index_name: str):
         self.pc = Pinecone(api_key=api_key)
         try:
-            self.index = self.pc.Index(index_name)
+            self.index = open_index(self.pc, index_name)
         except Exception as e:
             raise RuntimeError(f"Could not access index '{index_name}': {e}")
 
-    def list_vectors(self, namespace: str, limit: int = 100) -> List[Dict[str, Any]]:
+    def list_vectors(self, namespace: str, limit: int = 100, prefixes: List[str] = None) -> List[Dict[str, Any]]:
         """
-        Return list of vector entries in the namespace. Handles generator/list/dict shapes.
-        Each item in returned list is either a dict (with possible keys 'id','metadata','values'...) or a converted dict.
+        Return every vector entry in the namespace as {'id': ...} dicts. Follows pagination
+        tokens to the end (limit is the page size); prefixes are walked concurrently.
+        Values/metadata are filled in later via fetch_vectors.
         """
-        gen = self.index.list(namespace=namespace, limit=limit)
-        out = []
-        if gen is None:
-            return out
-        if isinstance(gen, dict):
-            # common shape: {'vectors': [...]}
-            if "vectors" in gen and isinstance(gen["vectors"], list):
-                return gen["vectors"][:limit]
-            # flatten any list value
-            for k, v in gen.items():
-                if isinstance(v, list):
-                    return v[:limit]
-            return [gen]
-        # if generator/iterable
-        if hasattr(gen, "__iter__") and not isinstance(gen, str):
-            try:
-                for item in gen:
-                    if item is None:
-                        continue
-                    if isinstance(item, dict):
-                        out.append(item)
-                    else:
-                        # try to coerce object to dict with common attrs
-                        d = {}
-                        if hasattr(item, "id"):
-                            d["id"] = getattr(item, "id")
-                        if hasattr(item, "metadata"):
-                            d["metadata"] = getattr(item, "metadata")
-                        # values/ vector
-                        if hasattr(item, "values"):
-                            d["values"] = getattr(item, "values")
-                        elif hasattr(item, "vector"):
-                            d["vector"] = getattr(item, "vector")
-                        out.append(d)
-                return out
-            except TypeError:
-                pass
-        # fallback
-        return [gen]
+        return [{"id": vid} for vid in iter_vector_ids(self.index, namespace, prefixes=prefixes, limit=limit)]
 
     def fetch_vectors(self, ids: List[str], namespace: str) -> Dict[str, Any]:
         """
-        Fetch by ids and return dict keyed by id containing vector/metadata
+        Fetch by ids and return dict keyed by id containing vector/metadata.
+        Ids are split into batches fetched concurrently with retries (pinecone_io.fetch_vectors).
         """
-        fetched = self.index.fetch(ids=ids, namespace=namespace)
-        # fetched may be object with .to_dict() or dict-like
-        if hasattr(fetched, "to_dict"):
-            fetched = fetched.to_dict()
-        # expected shapes:
-        # {'vectors': {id: { 'metadata':..., 'values': [...] }, ...}}
-        vectors = {}
-        if isinstance(fetched, dict):
-            if "vectors" in fetched and isinstance(fetched["vectors"], dict):
-                vectors = fetched["vectors"]
-            elif "vectors" in fetched and isinstance(fetched["vectors"], list):
-                # list of dicts
-                for v in fetched["vectors"]:
-                    vid = v.get("id") or v.get("vector_id")
-                    if vid:
-                        vectors[vid] = v
-            else:
-                # try keys for matches/items
-                for k in ("matches", "items", "results"):
-                    if k in fetched and isinstance(fetched[k], list):
-                        for v in fetched[k]:
-                            vid = v.get("id") or v.get("vector_id")
-                            if vid:
-                                vectors[vid] = v
-        else:
-            # object-like fallback not implemented further
-            pass
-        return vectors
+        return fetch_vectors(self.index, ids, namespace)
+
+class MirrorHelper:
+    """Same interface as PineconeHelper, served from the local vector mirror (vector_mirror.py)."""
+    def __init__(self, mirror_dir: str):
+        from vector_mirror import NamespaceMirror
+        self.mirror_dir = mirror_dir
+        self._mirrors: Dict[str, Any] = {}
+        self._cls = NamespaceMirror
+
+    def _mirror(self, namespace: str):
+        if namespace not in self._mirrors:
+            self._mirrors[namespace] = self._cls(self.mirror_dir, namespace)
+        return self._mirrors[namespace]
+
+    def list_vectors(self, namespace: str, limit: int = 100, prefixes: List[str] = None) -> List[Dict[str, Any]]:
+        return [{"id": vid} for vid in self._mirror(namespace).ids()
+                if not prefixes or any(vid.startswith(p) for p in prefixes)]
+
+    def fetch_vectors(self, ids: List[str], namespace: str) -> Dict[str, Any]:
+        return self._mirror(namespace).fetch_vectors(ids)
 
 # ---------- Main flow ----------
 def main():
-    api_key = os.environ.get("PINECONE_API_KEY")
-    index_name = os.environ.get("PINECONE_INDEX")
-    if not api_key or not index_name:
-        print("ERROR: Set PINECONE_API_KEY and PINECONE_INDEX in environment (activate_env.ps1).")
-        sys.exit(2)
+    parser = argparse.ArgumentParser(description="Score all resume vectors against all JD vectors.")
+    parser.add_argument("--top-k", type=int, default=0,
+                        help="Keep only the K best chunks and K best candidates per JD (bounded heaps, no full sort)")
+    parser.add_argument("--from-mirror", default="",
+                        help="Read vectors from a local mirror dir (see vector_mirror.py sync) instead of Pinecone")
+    args = parser.parse_args()
 
-    helper = PineconeHelper(api_key=api_key, index_name=index_name)
+    if args.from_mirror:
+        print("Using local vector mirror:", args.from_mirror)
+        helper = MirrorHelper(args.from_mirror)
+    else:
+        api_key = os.environ.get("PINECONE_API_KEY")
+        index_name = os.environ.get("PINECONE_INDEX")
+        if not api_key or not index_name:
+            print("ERROR: Set PINECONE_API_KEY and PINECONE_INDEX in environment (activate_env.ps1).")
+            sys.exit(2)
+        helper = PineconeHelper(api_key=api_key, index_name=index_name)
 
     resumes_ns = "Resumes"
     jds_ns = "Job_Descriptions"
@@ -234,6 +234,8 @@ def main():
             entry = fetched.get(rid)
             vec = safe_extract_vector(entry) if entry else None
             resume_map[rid]["vector"] = vec
+            if entry:  # id-only listing carries no metadata; candidate_of needs its candidate_id
+                resume_map[rid]["metadata"] = entry.get("metadata") or resume_map[rid]["metadata"]
 
     if jd_ids_missing_vec:
         print(f"Fetching missing JD vectors ({len(jd_ids_missing_vec)}) via fetch()...")
@@ -242,6 +244,8 @@ def main():
             entry = fetched.get(jid)
             vec = safe_extract_vector(entry) if entry else None
             jd_map[jid]["vector"] = vec
+            if entry:
+                jd_map[jid]["metadata"] = entry.get("metadata") or jd_map[jid]["metadata"]
 
     # Confirm we have vectors
     resume_vec_count = sum(1 for v in resume_map.values() if v["vector"])
@@ -253,6 +257,10 @@ def main():
         print("ERROR: Missing vectors. Cannot compute scores.")
         sys.exit(1)
 
+    if args.top_k > 0:
+        run_top_k(resume_map, jd_map, args.top_k)
+        return
+
     # Compute pairwise scores and write CSV
     out_rows = []
     for rid, rinfo in resume_map.items():
@@ -284,5 +292,35 @@ def main():
 
     print(f"\nSaved {len(out_rows_sorted)} rows to {csv_file}")
 
+def run_top_k(resume_map: Dict[str, Any], jd_map: Dict[str, Any], k: int) -> None:
+    top = TopKPerJD(k)
+    for rid, rinfo in resume_map.items():
+        rvec = rinfo["vector"]
+        if not rvec:
+            continue
+        candidate = candidate_of(rid, rinfo["metadata"])
+        for jid, jinfo in jd_map.items():
+            jvec = jinfo["vector"]
+            if not jvec:
+                continue
+            top.add(rid, candidate, jid, cosine_sim(rvec, jvec))
+
+    csv_file = "resume_jd_scores.csv"
+    n_rows = 0
+    with open(csv_file, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["resume_id", "jd_id", "score"])
+        for jid in jd_map:
+            print(f"\nJD {jid}: top {k} chunks")
+            for rid, score in top.top_chunks(jid):
+                print(f"  {rid} | {score:.6f}")
+                writer.writerow([rid, jid, f"{score:.6f}"])
+                n_rows += 1
+            print(f"JD {jid}: top {k} candidates (best chunk score)")
+            for candidate, score in top.top_candidates(jid):
+                print(f"  {candidate} | {score:.6f}")
+
+    print(f"\nSaved {n_rows} rows to {csv_file}")
+
 if __name__ == "__main__":
     main()
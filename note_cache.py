@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+note_cache.py
+
+Persistent cache for the one-line chunk notes generated by upload_to_pinecone.py.
+
+- Key: (summarization model, prompt version, section label, sha256 of the chunk text).
+- The prompt version should change whenever make_prompt changes; upload_to_pinecone
+  derives it from PROMPT_VERSION plus a fingerprint of the rendered template, so an
+  edited prompt misses the cache automatically.
+- Stale versions can be dropped in bulk (purge), or everything for a model cleared.
+- Only notes actually returned by the model are stored; snippet fallbacks are not.
+
+Configuration (environment):
+  NOTE_CACHE_PATH   cache file (default .note_cache.sqlite); "off" disables caching
+
+Usage:
+  python note_cache.py stats
+  python note_cache.py purge --keep-version v1:3f2a9c01   # drop notes from older prompts
+  python note_cache.py clear [--model gpt-4o-mini]
+"""
+
+import os
+import time
+import hashlib
+from typing import List, Optional, Sequence, Tuple
+
+from sqlite_store import SQLiteStore, StoreSingleton, open_for_cli, store_cli
+
+NOTE_CACHE_PATH = os.environ.get("NOTE_CACHE_PATH", ".note_cache.sqlite")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(render) -> str:
+    """Short hash of a prompt template, rendered with placeholder section/text."""
+    return hashlib.sha256(render("{SECTION}", "{TEXT}").encode("utf-8")).hexdigest()[:8]
+
+
+class NoteCache(SQLiteStore):
+    """Chunk notes keyed by (model, prompt version, section, text hash)."""
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS notes ("
+              "model TEXT, prompt_version TEXT, section TEXT, text_hash TEXT, note TEXT, created_at REAL, "
+              "PRIMARY KEY (model, prompt_version, section, text_hash))",)
+
+    def __init__(self, path: str = NOTE_CACHE_PATH):
+        super().__init__(path)
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, prompt_version: str,
+                 items: Sequence[Tuple[str, str]]) -> List[Optional[str]]:
+        """Cached note (or None) for every (section, text), in input order."""
+        out = []
+        with self._lock:
+            for section, text in items:
+                row = self._db.execute(
+                    "SELECT note FROM notes WHERE model=? AND prompt_version=? AND section=? AND text_hash=?",
+                    (model, prompt_version, section or "", text_hash(text))).fetchone()
+                out.append(row[0] if row else None)
+        hits = sum(1 for n in out if n is not None)
+        self.hits += hits
+        self.misses += len(out) - hits
+        return out
+
+    def put_many(self, model: str, prompt_version: str, entries: Sequence[Tuple[str, str, str]]) -> None:
+        """Store (section, text, note) entries."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO notes (model, prompt_version, section, text_hash, note, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(model, prompt_version, section or "", text_hash(text), note, now) for section, text, note in entries])
+            self._db.commit()
+
+    # ---------- invalidation ----------
+    def purge(self, keep_version: str, model: Optional[str] = None) -> int:
+        """Delete every note whose prompt version differs from keep_version (optionally one model only)."""
+        with self._lock:
+            if model:
+                cur = self._db.execute("DELETE FROM notes WHERE prompt_version<>? AND model=?", (keep_version, model))
+            else:
+                cur = self._db.execute("DELETE FROM notes WHERE prompt_version<>?", (keep_version,))
+            self._db.commit()
+            return cur.rowcount
+
+    def clear(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            if model:
+                cur = self._db.execute("DELETE FROM notes WHERE model=?", (model,))
+            else:
+                cur = self._db.execute("DELETE FROM notes")
+            self._db.commit()
+            return cur.rowcount
+
+    def stats(self) -> List[Tuple[str, str, int]]:
+        with self._lock:
+            return self._db.execute("SELECT model, prompt_version, COUNT(*) FROM notes "
+                                    "GROUP BY model, prompt_version ORDER BY model, prompt_version").fetchall()
+
+
+_default_cache = StoreSingleton(NoteCache, NOTE_CACHE_PATH, "Note cache")
+
+
+def get_note_cache() -> Optional[NoteCache]:
+    """Process-wide cache from NOTE_CACHE_PATH (see sqlite_store.StoreSingleton)."""
+    return _default_cache.get()
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = store_cli("Inspect or invalidate the chunk-note cache.", ["stats", "purge", "clear"], NOTE_CACHE_PATH)
+    parser.add_argument("--keep-version", help="purge: prompt version to keep (all others are deleted)")
+    parser.add_argument("--model", help="Restrict purge/clear to one summarization model")
+    args = parser.parse_args()
+
+    cache = open_for_cli(NoteCache, args.path, "note cache")
+    if cache is None:
+        return
+    if args.command == "stats":
+        for model, version, n in cache.stats():
+            print(f"{model:30} prompt={version:20} notes={n}")
+    elif args.command == "purge":
+        if not args.keep_version:
+            parser.error("purge needs --keep-version")
+        print(f"Deleted {cache.purge(args.keep_version, args.model)} notes")
+    else:
+        print(f"Deleted {cache.clear(args.model)} notes")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,10 +39,12 @@ if not OPENAI_KEY:
 # import clients (same style your repo uses)
 from pinecone import Pinecone
 from openai import OpenAI
+from rate_limit import get_controller, call_openai, CallFailed
+from pinecone_io import stamp_metadata
 
 pc = Pinecone(api_key=PINECONE_KEY)
 ix = pc.Index(INDEX_NAME)
-ocl = OpenAI(api_key=OPENAI_KEY)
+ocl = OpenAI(api_key=OPENAI_KEY, max_retries=0)  # retries: rate_limit.CallController
 
 # load file (try JSON first, fallback to raw text)
 p = Path(args.jd_file)
@@ -141,7 +143,12 @@ Return EXACTLY a JSON object, e.g.:
 """
 
 print("Calling LLM to extract title and primary_skills...")
-resp = ocl.responses.create(model=args.openai_model, input=prompt)
+try:
+    resp = call_openai(get_controller("openai-responses"), ocl.responses,
+                       tokens=len(prompt) // 4 + 200, model=args.openai_model, input=prompt)
+except CallFailed as e:
+    print("ERROR:", e, file=sys.stderr)
+    sys.exit(1)
 out_text = getattr(resp, "output_text", None) or ""
 if not out_text:
     # fallback deep-inspect
@@ -186,6 +193,7 @@ if need_skills:
 meta.setdefault("source_file", p.name if p.exists() else meta.get("source_file"))
 
 # upsert back into Pinecone with same vector values
+meta = stamp_metadata(meta)  # lets vector_mirror.py pick up the in-place change
 tuple_upsert = [(jd_id, vec, meta)]
 try:
     ix.upsert(vectors=tuple_upsert, namespace=NAMESPACE)
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+pinecone_io.py
+
+Shared Pinecone read/write helpers for the scoring, inspection and ingest scripts.
+
+- iter_vector_ids: follows pagination tokens to the end of a namespace and streams
+  ids to the caller page by page; with several id prefixes the prefixes are walked
+  concurrently on a small thread pool.
+- list_all_ids: same, collected into a de-duplicated list.
+- fetch_batches / fetch_vectors / fetch_matrix: split ids into right-sized fetch
+  batches, run them on a bounded thread pool (over the index's pooled connections,
+  see open_index), retry failed batches with exponential backoff, and optionally
+  return the vectors directly as a float32 matrix plus a metadata table.
+- query_many: one index.query per query vector, run concurrently with the same
+  retry/backoff policy, yielding normalized matches as each query returns.
+- existing_ids / upsert_vectors: batched existence checks and upserts split into
+  payload-sized requests (by vector count and estimated request bytes). Upserted
+  metadata is stamped with a numeric UPDATED_TS (epoch seconds), which
+  ids_updated_since filters on to find vectors changed in place without fetching them.
+- delete_ids: batched deletes (e.g. orphans found by ingest_manifest.py).
+
+The helpers take an already-constructed index (pc.Index(...)) so importing this
+module has no side effects.
+"""
+
+import json
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+PAGE_LIMIT = 100  # Pinecone caps list() pages at 100 ids
+LIST_WORKERS = 4
+FETCH_BATCH = 100  # max ids per fetch request
+FETCH_MAX_CHARS = 4000  # keep the ids of one GET /vectors/fetch well under URL length limits
+FETCH_WORKERS = 8
+FETCH_RETRIES = 4
+FETCH_BACKOFF = 0.5  # seconds, doubled per attempt (+ jitter)
+UPSERT_BATCH = 100  # vectors per upsert request (Pinecone allows up to 1000)
+UPSERT_MAX_BYTES = 2 * 1024 * 1024 - 128 * 1024  # Pinecone rejects upsert requests over 2MB
+DELETE_BATCH = 1000  # max ids per delete request
+QUERY_MAX_TOP_K = 10000  # Pinecone's top_k cap for queries without values / metadata
+UPDATED_TS = "updated_ts"  # metadata key: epoch seconds of the last upsert (numeric, so filterable)
+
+
+def open_index(pc, index_name: str, pool_threads: int = FETCH_WORKERS):
+    """pc.Index with a connection pool sized for concurrent requests (older SDKs: plain Index)."""
+    try:
+        return pc.Index(index_name, pool_threads=pool_threads)
+    except TypeError:
+        return pc.Index(index_name)
+
+
+# -------------------- Listing --------------------
+def ids_from_page(page: Any) -> List[str]:
+    """Extract vector ids from any page shape the SDKs return (list, dict, ListResponse)."""
+    if page is None:
+        return []
+    if isinstance(page, str):
+        return [page]
+    if isinstance(page, dict):
+        for key in ("vectors", "ids", "matches"):
+            if isinstance(page.get(key), list):
+                return ids_from_page(page[key])
+        return []
+    vectors = getattr(page, "vectors", None)
+    if vectors is not None and not isinstance(page, (list, tuple)):
+        return ids_from_page(list(vectors))
+    out = []
+    try:
+        for item in page:
+            if isinstance(item, str):
+                out.append(item)
+            elif isinstance(item, dict) and item.get("id"):
+                out.append(item["id"])
+            elif getattr(item, "id", None):
+                out.append(item.id)
+    except TypeError:
+        pass
+    return out
+
+
+def _next_token(page: Any) -> Optional[str]:
+    pagination = page.get("pagination") if isinstance(page, dict) else getattr(page, "pagination", None)
+    if not pagination:
+        return None
+    if isinstance(pagination, dict):
+        return pagination.get("next")
+    return getattr(pagination, "next", None)
+
+
+def iter_id_pages(index, namespace: str, prefix: Optional[str] = None,
+                  limit: int = PAGE_LIMIT) -> Iterator[List[str]]:
+    """
+    Yield one list of ids per page until the namespace (or prefix) is exhausted.
+    Uses list_paginated + pagination tokens when the SDK has it, else the SDK's
+    own paginating list() generator.
+    """
+    limit = max(1, min(PAGE_LIMIT, int(limit)))
+    kwargs = {"namespace": namespace, "limit": limit}
+    if prefix:
+        kwargs["prefix"] = prefix
+    if hasattr(index, "list_paginated"):
+        token = None
+        while True:
+            page = index.list_paginated(pagination_token=token, **kwargs) if token else index.list_paginated(**kwargs)
+            ids = ids_from_page(page)
+            if ids:
+                yield ids
+            token = _next_token(page)
+            if not token or not ids:
+                return
+    for page in index.list(**kwargs):
+        ids = ids_from_page(page)
+        if ids:
+            yield ids
+
+
+def iter_vector_ids(index, namespace: str, prefixes: Optional[Iterable[str]] = None,
+                    workers: int = LIST_WORKERS, limit: int = PAGE_LIMIT) -> Iterator[str]:
+    """
+    Stream every id in the namespace (de-duplicated, as pages arrive).
+    With several prefixes, each prefix is walked on its own worker thread.
+    """
+    prefixes = [p for p in (prefixes or []) if p]
+    seen = set()
+    if len(prefixes) <= 1:
+        for ids in iter_id_pages(index, namespace, prefixes[0] if prefixes else None, limit):
+            for vid in ids:
+                if vid not in seen:
+                    seen.add(vid)
+                    yield vid
+        return
+
+    pages: "queue.Queue" = queue.Queue(maxsize=workers * 4)
+    done = object()
+    stop = threading.Event()
+
+    def walk(prefix: str):
+        try:
+            for ids in iter_id_pages(index, namespace, prefix, limit):
+                if stop.is_set():
+                    return
+                pages.put(ids)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(done)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(prefixes)))) as pool:
+        for p in prefixes:
+            pool.submit(walk, p)
+        remaining = len(prefixes)
+        try:
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                for vid in item:
+                    if vid not in seen:
+                        seen.add(vid)
+                        yield vid
+        finally:
+            stop.set()
+            # drain so blocked workers can finish
+            while remaining:
+                if pages.get() is done:
+                    remaining -= 1
+
+
+def list_all_ids(index, namespace: str, prefixes: Optional[Iterable[str]] = None,
+                 workers: int = LIST_WORKERS, limit: int = PAGE_LIMIT) -> List[str]:
+    """Complete, de-duplicated id list for a namespace (see iter_vector_ids)."""
+    return list(iter_vector_ids(index, namespace, prefixes=prefixes, workers=workers, limit=limit))
+
+
+# -------------------- Fetching --------------------
+def safe_get_vector_values(vobj) -> List[float]:
+    # Accept dict-like or object-like from various SDK shapes
+    if vobj is None:
+        return []
+    if isinstance(vobj, dict):
+        for key in ("values", "vector"):
+            if isinstance(vobj.get(key), (list, tuple)):
+                return list(vobj[key])
+    vals = getattr(vobj, "values", None) or getattr(vobj, "vector", None)
+    if isinstance(vals, (list, tuple)):
+        return list(vals)
+    return []
+
+
+def safe_get_metadata(vobj) -> Dict:
+    if vobj is None:
+        return {}
+    if isinstance(vobj, dict):
+        return vobj.get("metadata", {}) or {}
+    meta = getattr(vobj, "metadata", None)
+    return meta if isinstance(meta, dict) else {}
+
+
+def plan_fetch_batches(ids: List[str], max_ids: int = FETCH_BATCH,
+                       max_chars: int = FETCH_MAX_CHARS) -> List[List[str]]:
+    """Split ids into batches capped by id count and by total id length (query-string size)."""
+    batches, cur, cur_chars = [], [], 0
+    for vid in ids:
+        cost = len(vid) + 5  # "&ids=" per id
+        if cur and (len(cur) >= max_ids or cur_chars + cost > max_chars):
+            batches.append(cur)
+            cur, cur_chars = [], 0
+        cur.append(vid)
+        cur_chars += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _fetch_once(index, ids: List[str], namespace: str) -> Dict[str, Dict]:
+    fetched = index.fetch(ids=ids, namespace=namespace)
+    vecs = getattr(fetched, "vectors", None)
+    if vecs is None and isinstance(fetched, dict):
+        vecs = fetched.get("vectors", {})
+    out = {}
+    if isinstance(vecs, dict):
+        for vid, vobj in vecs.items():
+            out[vid] = {"values": safe_get_vector_values(vobj), "metadata": safe_get_metadata(vobj)}
+    elif vecs:
+        for entry in vecs:
+            vid = entry.get("id") if isinstance(entry, dict) else getattr(entry, "id", None)
+            if vid:
+                out[vid] = {"values": safe_get_vector_values(entry), "metadata": safe_get_metadata(entry)}
+    return out
+
+
+def _fetch_with_retry(index, ids: List[str], namespace: str, retries: int, backoff: float) -> Dict[str, Dict]:
+    for attempt in range(retries + 1):
+        try:
+            return _fetch_once(index, ids, namespace)
+        except Exception as e:
+            if attempt >= retries:
+                raise RuntimeError(f"Fetch of {len(ids)} ids from namespace '{namespace}' failed "
+                                   f"after {retries + 1} attempts: {e}") from e
+            delay = backoff * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+    return {}
+
+
+def fetch_batches(index, ids: List[str], namespace: str, batch_size: int = FETCH_BATCH,
+                  workers: int = FETCH_WORKERS, retries: int = FETCH_RETRIES,
+                  backoff: float = FETCH_BACKOFF) -> Iterator[Tuple[List[str], Dict[str, Dict]]]:
+    """
+    Yield (batch_ids, {id: {'values': [...], 'metadata': {...}}}) as each batch completes.
+    At most `workers` requests are in flight; a batch that still fails after `retries`
+    retries raises RuntimeError.
+    """
+    batches = plan_fetch_batches(ids, max_ids=batch_size)
+    if not batches:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+        futures = {pool.submit(_fetch_with_retry, index, b, namespace, retries, backoff): b for b in batches}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+
+def fetch_vectors(index, ids: List[str], namespace: str, **kwargs) -> Dict[str, Dict]:
+    """Fetch all ids concurrently. Returns id -> {'values': [...], 'metadata': {...}} (missing ids omitted)."""
+    out = {}
+    for _, part in fetch_batches(index, ids, namespace, **kwargs):
+        out.update(part)
+    return out
+
+
+def fetch_matrix(index, ids: List[str], namespace: str, dim: int = 0,
+                 **kwargs) -> Tuple[List[str], "np.ndarray", List[Dict]]:
+    """
+    Fetch all ids concurrently and return (found_ids, float32 matrix, metadata list),
+    rows in the order of `ids`. Each batch is converted to float32 as it arrives, so
+    Python float lists only live for the batches in flight. Vectors are truncated or
+    zero-padded to `dim` (default: dimension of the first vector seen).
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for fetch_matrix (python -m pip install numpy)")
+    rows: Dict[str, Tuple[Any, Dict]] = {}
+    for _, part in fetch_batches(index, ids, namespace, **kwargs):
+        for vid, entry in part.items():
+            values = entry["values"]
+            if not dim and values:
+                dim = len(values)
+            vec = np.zeros(dim, dtype=np.float32)
+            n = min(len(values), dim)
+            if n:
+                vec[:n] = np.asarray(values[:n], dtype=np.float32)
+            rows[vid] = (vec, entry["metadata"])
+    found = [vid for vid in dict.fromkeys(ids) if vid in rows]
+    mat = np.zeros((len(found), dim), dtype=np.float32)
+    metas = []
+    for i, vid in enumerate(found):
+        vec, meta = rows.pop(vid)
+        mat[i, :len(vec)] = vec[:dim]
+        metas.append(meta)
+    return found, mat, metas
+
+
+# -------------------- Querying --------------------
+def _matches_of(resp) -> List[Dict]:
+    matches = resp.get("matches") if isinstance(resp, dict) else getattr(resp, "matches", None)
+    out = []
+    for m in matches or []:
+        if isinstance(m, dict):
+            out.append({"id": m.get("id"), "score": float(m.get("score") or 0.0), "metadata": m.get("metadata") or {}})
+        else:
+            out.append({"id": getattr(m, "id", None), "score": float(getattr(m, "score", 0.0) or 0.0),
+                        "metadata": getattr(m, "metadata", None) or {}})
+    return [m for m in out if m["id"]]
+
+
+def _query_with_retry(index, vector: List[float], namespace: str, top_k: int, filter: Optional[Dict],
+                      retries: int, backoff: float, include_metadata: bool = True) -> List[Dict]:
+    kwargs = {"vector": vector, "top_k": top_k, "namespace": namespace,
+              "include_metadata": include_metadata, "include_values": False}
+    if filter:
+        kwargs["filter"] = filter
+    for attempt in range(retries + 1):
+        try:
+            return _matches_of(index.query(**kwargs))
+        except Exception as e:
+            if attempt >= retries:
+                raise RuntimeError(f"Query (top_k={top_k}) on namespace '{namespace}' failed "
+                                   f"after {retries + 1} attempts: {e}") from e
+            delay = backoff * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+    return []
+
+
+def query_many(index, queries: Dict[str, List[float]], namespace: str, top_k: int,
+               workers: int = FETCH_WORKERS, retries: int = FETCH_RETRIES, backoff: float = FETCH_BACKOFF,
+               filter: Optional[Dict] = None) -> Iterator[Tuple[str, List[Dict]]]:
+    """
+    Run one top_k query per (key, vector) concurrently; yield (key, [{'id','score','metadata'}, ...])
+    as each completes, matches best first.
+    """
+    if not queries:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(queries)))) as pool:
+        futures = {pool.submit(_query_with_retry, index, vec, namespace, top_k, filter, retries, backoff): key
+                   for key, vec in queries.items()}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+
+def ids_updated_since(index, namespace: str, since: float, dim: int, top_k: int = QUERY_MAX_TOP_K,
+                      retries: int = FETCH_RETRIES, backoff: float = FETCH_BACKOFF) -> Optional[List[str]]:
+    """
+    Ids whose UPDATED_TS stamp is >= since, from one id-only filtered query (no vectors or
+    metadata are transferred). None when the result hits top_k, i.e. the list may be incomplete.
+    """
+    matches = _query_with_retry(index, [1.0] * dim, namespace, top_k, {UPDATED_TS: {"$gte": since}},
+                                retries, backoff, include_metadata=False)
+    if len(matches) >= top_k:
+        return None
+    return [m["id"] for m in matches]
+
+
+# -------------------- Writing --------------------
+def existing_ids(index, ids: List[str], namespace: str, workers: int = FETCH_WORKERS) -> set:
+    """Which of `ids` already exist in the namespace (batched, concurrent fetches)."""
+    found = set()
+    for _, part in fetch_batches(index, list(dict.fromkeys(ids)), namespace, workers=workers):
+        found.update(part)
+    return found
+
+
+def stamp_metadata(meta: Optional[Dict]) -> Dict:
+    """Copy of the metadata with UPDATED_TS set to now."""
+    return dict(meta or {}, **{UPDATED_TS: round(time.time(), 3)})
+
+
+def _upsert_bytes(vec: Tuple[str, List[float], Dict]) -> int:
+    """Rough JSON request size of one (id, values, metadata) vector."""
+    vid, values, meta = vec
+    return len(vid) + 12 * len(values) + len(json.dumps(meta or {}, ensure_ascii=False, default=str)) + 64
+
+
+def plan_upsert_batches(vectors: List[Tuple[str, List[float], Dict]], max_vectors: int = UPSERT_BATCH,
+                        max_bytes: int = UPSERT_MAX_BYTES) -> List[List[Tuple[str, List[float], Dict]]]:
+    """Split vectors into upsert requests capped by vector count and estimated payload size."""
+    batches, cur, cur_bytes = [], [], 0
+    for vec in vectors:
+        cost = _upsert_bytes(vec)
+        if cur and (len(cur) >= max_vectors or cur_bytes + cost > max_bytes):
+            batches.append(cur)
+            cur, cur_bytes = [], 0
+        cur.append(vec)
+        cur_bytes += cost
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _upsert_with_retry(index, vectors: List[Tuple[str, List[float], Dict]], namespace: str,
+                       retries: int, backoff: float) -> int:
+    for attempt in range(retries + 1):
+        try:
+            index.upsert(vectors=vectors, namespace=namespace)
+            return len(vectors)
+        except Exception as e:
+            if attempt >= retries:
+                raise RuntimeError(f"Upsert of {len(vectors)} vectors to namespace '{namespace}' failed "
+                                   f"after {retries + 1} attempts: {e}") from e
+            delay = backoff * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+    return 0
+
+
+def upsert_vectors(index, vectors: List[Tuple[str, List[float], Dict]], namespace: str,
+                   batch_size: int = UPSERT_BATCH, max_bytes: int = UPSERT_MAX_BYTES,
+                   workers: int = 1, retries: int = FETCH_RETRIES, backoff: float = FETCH_BACKOFF) -> int:
+    """Upsert (id, values, metadata) tuples in payload-sized batches, metadata stamped; returns vectors written."""
+    vectors = [(vid, values, stamp_metadata(meta)) for vid, values, meta in vectors]
+    batches = plan_upsert_batches(vectors, max_vectors=batch_size, max_bytes=max_bytes)
+    if not batches:
+        return 0
+    if workers <= 1 or len(batches) == 1:
+        return sum(_upsert_with_retry(index, b, namespace, retries, backoff) for b in batches)
+    written = 0
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        for fut in as_completed([pool.submit(_upsert_with_retry, index, b, namespace, retries, backoff)
+                                 for b in batches]):
+            written += fut.result()
+    return written
+
+
+def delete_ids(index, ids: List[str], namespace: str, batch_size: int = DELETE_BATCH,
+               retries: int = FETCH_RETRIES, backoff: float = FETCH_BACKOFF) -> int:
+    """Delete ids in batches (with retry/backoff); returns the number of ids sent."""
+    ids = list(dict.fromkeys(ids))
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        for attempt in range(retries + 1):
+            try:
+                index.delete(ids=batch, namespace=namespace)
+                break
+            except Exception as e:
+                if attempt >= retries:
+                    raise RuntimeError(f"Delete of {len(batch)} ids from namespace '{namespace}' failed "
+                                       f"after {retries + 1} attempts: {e}") from e
+                delay = backoff * (2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay))
+    return len(ids)
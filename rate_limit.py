@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+rate_limit.py
+
+Client-side rate limiting for the OpenAI calls made by the ingestion scripts.
+
+- TokenBucket: classic token bucket (refill `rate` per second up to `capacity`);
+  acquire(n) blocks until n units are available. Thread-safe.
+- RateLimiter: one bucket for requests and one for tokens per API, sized from
+  requests/tokens-per-minute and kept in step with the server through the
+  x-ratelimit-* response headers (limit, remaining, reset). When the server says
+  a budget is exhausted, callers wait until its reset time instead of collecting 429s.
+- CallController: shared wrapper for every OpenAI call site. Rate limiter + adaptive
+  concurrency (halved on 429, grown back slowly on success) + retries with exponential
+  backoff and full jitter that honour Retry-After / x-ratelimit-reset-* headers. Gives up
+  with CallFailed after max_retries; non-transient errors (400/401/403/404/422, bugs) fail at once.
+  Throttle time (limiter waits, concurrency waits, backoff sleeps) is reported at exit.
+  Build the OpenAI clients with max_retries=0 so the controller is the only retry layer
+  (SDK retries would multiply the attempts and sleep where the limiter cannot see it).
+
+Usage:
+  limiter = RateLimiter(rpm=500, tpm=200_000)
+  limiter.acquire(tokens=estimate)
+  raw = client.responses.with_raw_response.create(...)
+  limiter.observe(raw.headers)
+
+  client = OpenAI(max_retries=0)
+  calls = get_controller("openai-responses", rpm=500, tpm=200_000)
+  resp = call_openai(calls, client.responses, tokens=estimate, model=..., input=prompt)
+"""
+
+import re
+import sys
+import time
+import atexit
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value) -> float:
+    """Seconds from a reset header value: '1s', '6m0s', '250ms', '1h2m3.5s' or a plain number."""
+    if value is None:
+        return 0.0
+    s = str(value).strip()
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    return sum(float(n) * _UNIT[u] for n, u in _DURATION.findall(s))
+
+
+def _header(headers: Mapping, name: str) -> Optional[str]:
+    if headers is None:
+        return None
+    try:
+        v = headers.get(name)
+    except Exception:
+        return None
+    return v if v not in ("", None) else None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def acquire(self, n: float = 1.0) -> float:
+        """Block until n units are available; returns seconds waited."""
+        n = min(float(n), self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= n:
+                    self.tokens -= n
+                    return waited
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                else:
+                    delay = (n - self.tokens) / self.rate if self.rate > 0 else 1.0
+            delay = min(max(delay, 0.005), 5.0)
+            time.sleep(delay)
+            waited += delay
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_s: float) -> None:
+        """Align with the server's view: per-minute limit, units left, seconds until reset."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit:
+                self.rate = limit / 60.0
+                self.capacity = max(1.0, float(limit))
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+                if remaining <= 0 and reset_s > 0:
+                    self.blocked_until = max(self.blocked_until, now + reset_s)
+
+
+class RateLimiter:
+    """Request + token budgets for one API, refreshed from x-ratelimit-* headers."""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm / 60.0, capacity=rpm)
+        self.tokens = TokenBucket(tpm / 60.0, capacity=tpm)
+        self.throttled = 0.0  # total seconds callers spent waiting
+
+    def acquire(self, tokens: float = 0.0) -> None:
+        waited = self.requests.acquire(1)
+        if tokens:
+            waited += self.tokens.acquire(tokens)
+        self.throttled += waited
+
+    def observe(self, headers: Mapping) -> None:
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = _header(headers, f"x-ratelimit-limit-{kind}")
+            remaining = _header(headers, f"x-ratelimit-remaining-{kind}")
+            if limit is None and remaining is None:
+                continue
+            try:
+                bucket.sync(float(limit) if limit is not None else None,
+                            float(remaining) if remaining is not None else None,
+                            parse_reset(_header(headers, f"x-ratelimit-reset-{kind}")))
+            except ValueError:
+                continue
+
+
+# -------------------- Call controller --------------------
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CallFailed(RuntimeError):
+    pass
+
+
+def _status_of(e: BaseException) -> Optional[int]:
+    code = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _transient(e: BaseException, status: Optional[int]) -> bool:
+    """429/5xx-style statuses, or network errors (openai.APIConnectionError / APITimeoutError, socket errors)."""
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(e).__name__
+    return isinstance(e, (ConnectionError, TimeoutError)) or "Connection" in name or "Timeout" in name
+
+
+def _headers_of(e: BaseException) -> Optional[Mapping]:
+    return getattr(getattr(e, "response", None), "headers", None)
+
+
+def retry_after(headers: Optional[Mapping]) -> Optional[float]:
+    """Seconds to wait from retry-after-ms / Retry-After (seconds or HTTP date) / x-ratelimit-reset-*."""
+    ms = _header(headers, "retry-after-ms")
+    if ms is not None:
+        try:
+            return float(ms) / 1000.0
+        except ValueError:
+            pass
+    ra = _header(headers, "retry-after")
+    if ra is not None:
+        try:
+            return float(ra)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(ra).timestamp() - time.time())
+            except Exception:
+                pass
+    resets = [parse_reset(_header(headers, f"x-ratelimit-reset-{k}")) for k in ("requests", "tokens")]
+    resets = [r for r in resets if r > 0]
+    return max(resets) if resets else None
+
+
+class AdaptiveGate:
+    """Concurrency limit that shrinks multiplicatively on throttling and grows additively on success."""
+
+    def __init__(self, limit: int, min_limit: int = 1):
+        self.max_limit = max(1, limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.active = 0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> float:
+        t0 = time.monotonic()
+        with self.cond:
+            while self.active >= int(self.limit):
+                self.cond.wait()
+            self.active += 1
+        return time.monotonic() - t0
+
+    def release(self) -> None:
+        with self.cond:
+            self.active -= 1
+            self.cond.notify()
+
+    def shrink(self) -> None:
+        with self.cond:
+            self.limit = max(float(self.min_limit), self.limit / 2)
+
+    def grow(self) -> None:
+        with self.cond:
+            if self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                self.cond.notify_all()
+
+
+class CallController:
+    def __init__(self, name: str, rpm: float = 500, tpm: float = 200_000, max_concurrency: int = 8,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.name = name
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self.gate = AdaptiveGate(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled_429 = 0
+        self.failures = 0
+        self.waited = 0.0  # concurrency-gate waits + backoff sleeps (limiter waits: self.limiter.throttled)
+
+    def _add(self, **kw) -> None:
+        with self.lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def call(self, fn: Callable[[], Tuple[Any, Optional[Mapping]]], tokens: float = 0.0) -> Any:
+        """
+        Run fn() -> (result, response_headers) under the limits, retrying transient failures.
+        Returns result; raises CallFailed once retries are exhausted (or the error is not retryable).
+        """
+        t_start = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            self._add(waited=self.gate.acquire())
+            delay = None
+            try:
+                result, headers = fn()
+            except Exception as e:
+                status = _status_of(e)
+                headers = _headers_of(e)
+                if headers is not None:
+                    self.limiter.observe(headers)
+                if status == 429:
+                    self.gate.shrink()
+                    self._add(throttled_429=1)
+                transient = _transient(e, status)
+                if not transient or attempt >= self.max_retries:
+                    self._add(calls=1, failures=1)
+                    if status is None and not transient:
+                        raise  # not an API error (e.g. a bug in fn): surface it unchanged
+                    raise CallFailed(f"{self.name}: giving up after {attempt + 1} attempt(s) in "
+                                     f"{time.monotonic() - t_start:.1f}s (status {status or 'n/a'}): {e}") from e
+                delay = retry_after(headers)
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+                delay = min(self.max_delay, delay)
+                self._add(retries=1, waited=delay)
+            finally:
+                self.gate.release()
+            if delay is not None:
+                time.sleep(delay)  # backoff outside the gate: a waiting retry holds no concurrency slot
+                continue
+            if headers is not None:
+                self.limiter.observe(headers)
+            self.gate.grow()
+            self._add(calls=1)
+            return result
+        raise CallFailed(f"{self.name}: no attempts made")
+
+    def report(self) -> str:
+        total = self.waited + self.limiter.throttled
+        return (f"{self.name}: calls={self.calls} retries={self.retries} 429s={self.throttled_429} "
+                f"failed={self.failures} throttled={total:.1f}s concurrency={int(self.gate.limit)}/{self.gate.max_limit}")
+
+
+# starting budgets per API; the x-ratelimit-* headers replace them with the account's real limits
+DEFAULT_LIMITS = {
+    "openai-embeddings": {"rpm": 3000, "tpm": 1_000_000},
+    "openai-responses": {"rpm": 500, "tpm": 200_000},
+    "openai-chat": {"rpm": 500, "tpm": 200_000},
+}
+
+_controllers: Dict[str, CallController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(name: str, **defaults) -> CallController:
+    """Process-wide controller per API (first caller's settings win over DEFAULT_LIMITS)."""
+    with _controllers_lock:
+        if name not in _controllers:
+            if not _controllers:
+                atexit.register(print_throttle_report)
+            _controllers[name] = CallController(name, **{**DEFAULT_LIMITS.get(name, {}), **defaults})
+        return _controllers[name]
+
+
+def print_throttle_report() -> None:
+    used = [c for c in _controllers.values() if c.calls]
+    if used:
+        print("API call report:", file=sys.stderr)
+        for c in used:
+            print("  " + c.report(), file=sys.stderr)
+
+
+def call_openai(controller: CallController, endpoint, tokens: float = 0.0, **kwargs) -> Any:
+    """
+    endpoint.create(**kwargs) (e.g. client.responses / client.embeddings) under `controller`.
+    Uses endpoint.with_raw_response when the SDK has it, so rate-limit headers are seen.
+    """
+    raw_api = getattr(endpoint, "with_raw_response", None)
+
+    def once():
+        if raw_api is None:
+            return endpoint.create(**kwargs), None
+        raw = raw_api.create(**kwargs)
+        return raw.parse(), raw.headers
+
+    return controller.call(once, tokens=tokens)
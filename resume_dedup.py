@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+resume_dedup.py
+
+Near-duplicate resume detection for ingestion. With --id-method uuid (the default in
+upload_to_pinecone.py) a re-submitted resume gets a fresh candidate_id; this index
+recognizes it before anything is embedded or upserted, so it can be flagged or mapped
+onto the existing candidate instead of being merged later with unify_resumes.py.
+
+- Text is normalized (lowercase, punctuation dropped, whitespace collapsed) and cut into
+  word shingles (SHINGLE_WORDS-grams).
+- MinHash signature of NUM_PERM 32-bit permutations (numpy), banded for LSH into
+  LSH_BANDS x LSH_ROWS; only documents sharing a band bucket are compared, and a match
+  needs an estimated Jaccard similarity >= DEDUP_THRESHOLD.
+- Signatures and band buckets live in one SQLite file, one entry per candidate_id
+  (re-adding a candidate replaces its entry).
+
+Configuration (environment):
+  DEDUP_INDEX_PATH   index file (default .dedup_index.sqlite); "off" disables detection
+
+Usage:
+  index = get_dedup_index()
+  hit = index.match(text)            # -> (candidate_id, similarity, source) or None
+  index.add(candidate_id, text, source=path)   # once the resume is actually ingested
+
+  python resume_dedup.py stats
+  python resume_dedup.py check data/chunks/jane.json
+  python resume_dedup.py forget resumes_0a1b2c3d4e5f
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+from typing import Optional, Tuple
+
+import numpy as np
+
+from sqlite_store import SQLiteStore, StoreSingleton, open_for_cli, store_cli
+
+DEDUP_INDEX_PATH = os.environ.get("DEDUP_INDEX_PATH", ".dedup_index.sqlite")
+DEDUP_THRESHOLD = 0.85
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS  # 8 rows/band: pairs above ~0.7 Jaccard almost always share a bucket
+
+_PRIME = np.uint64(4294967291)  # largest 32-bit prime; a*x+b stays below 2**64
+_rng = np.random.RandomState(20240601)  # fixed: signatures must be comparable across runs
+_A = _rng.randint(1, 2 ** 32 - 5, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 32 - 5, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """crc32 of every k-word shingle of the normalized text (the whole text if shorter)."""
+    words = normalize(text).split()
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    grams = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERM uint32), or None for empty text."""
+    sh = shingles(text)
+    if sh.size == 0:
+        return None
+    hashed = (np.outer(_A, sh) + _B[:, None]) % _PRIME
+    return hashed.min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _buckets(sig: np.ndarray):
+    return [(b, sig[b * LSH_ROWS:(b + 1) * LSH_ROWS].tobytes().hex()) for b in range(LSH_BANDS)]
+
+
+class DedupIndex(SQLiteStore):
+    """MinHash LSH index of ingested resumes: signatures per candidate plus band buckets."""
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS docs (candidate_id TEXT PRIMARY KEY, source TEXT, sig BLOB, added_at REAL)",
+              "CREATE TABLE IF NOT EXISTS bands (band INTEGER, bucket TEXT, candidate_id TEXT)",
+              "CREATE INDEX IF NOT EXISTS bands_lookup ON bands(band, bucket)",
+              "CREATE INDEX IF NOT EXISTS bands_owner ON bands(candidate_id)")
+
+    def __init__(self, path: str = DEDUP_INDEX_PATH, threshold: float = DEDUP_THRESHOLD):
+        super().__init__(path)
+        self.threshold = threshold
+
+    def match(self, text_or_sig, exclude: Optional[str] = None) -> Optional[Tuple[str, float, str]]:
+        """Best existing (candidate_id, similarity, source) at or above the threshold, or None."""
+        sig = signature(text_or_sig) if isinstance(text_or_sig, str) else text_or_sig
+        if sig is None:
+            return None
+        with self._lock:
+            seen = set()
+            for band, bucket in _buckets(sig):
+                for (cid,) in self._db.execute("SELECT candidate_id FROM bands WHERE band=? AND bucket=?", (band, bucket)):
+                    seen.add(cid)
+            seen.discard(exclude)
+            best = None
+            for cid in seen:
+                row = self._db.execute("SELECT sig, source FROM docs WHERE candidate_id=?", (cid,)).fetchone()
+                if row is None:
+                    continue
+                sim = similarity(sig, np.frombuffer(row[0], dtype=np.uint32))
+                if sim >= self.threshold and (best is None or sim > best[1]):
+                    best = (cid, sim, row[1] or "")
+        return best
+
+    def add(self, candidate_id: str, text_or_sig, source: str = "") -> None:
+        sig = signature(text_or_sig) if isinstance(text_or_sig, str) else text_or_sig
+        if sig is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM bands WHERE candidate_id=?", (candidate_id,))
+            self._db.execute("INSERT OR REPLACE INTO docs (candidate_id, source, sig, added_at) VALUES (?, ?, ?, ?)",
+                             (candidate_id, source, sig.astype(np.uint32).tobytes(), time.time()))
+            self._db.executemany("INSERT INTO bands (band, bucket, candidate_id) VALUES (?, ?, ?)",
+                                 [(b, bucket, candidate_id) for b, bucket in _buckets(sig)])
+            self._db.commit()
+
+    def match_or_add(self, candidate_id: str, text_or_sig, source: str = "") -> Optional[Tuple[str, float, str]]:
+        """Atomic match + add (so concurrent ingest workers see each other). A match is not added."""
+        sig = signature(text_or_sig) if isinstance(text_or_sig, str) else text_or_sig
+        with self._lock:
+            hit = self.match(sig, exclude=candidate_id) if sig is not None else None
+            if hit is None:
+                self.add(candidate_id, sig, source)
+            return hit
+
+    def forget(self, candidate_id: str) -> bool:
+        with self._lock:
+            self._db.execute("DELETE FROM bands WHERE candidate_id=?", (candidate_id,))
+            n = self._db.execute("DELETE FROM docs WHERE candidate_id=?", (candidate_id,)).rowcount
+            self._db.commit()
+        return bool(n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        return {"candidates": n, "threshold": self.threshold, "perm": NUM_PERM, "bands": LSH_BANDS}
+
+
+_default_index = StoreSingleton(DedupIndex, DEDUP_INDEX_PATH, "Duplicate detection")
+
+
+def get_dedup_index() -> Optional[DedupIndex]:
+    """Process-wide index from DEDUP_INDEX_PATH (see sqlite_store.StoreSingleton)."""
+    return _default_index.get()
+
+
+def resume_text(chunks) -> str:
+    """Full text of a chunk-list resume (the upload_to_pinecone input format)."""
+    return "\n".join((c.get("chunk_text") or c.get("text") or c.get("full_text") or "") for c in chunks
+                     if isinstance(c, dict))
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = store_cli("Inspect the near-duplicate resume index.", ["stats", "check", "forget"], DEDUP_INDEX_PATH,
+                       path_help="Index file")
+    parser.add_argument("target", nargs="?", help="check: chunk-list JSON file; forget: candidate_id")
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD, help="Minimum estimated Jaccard similarity")
+    args = parser.parse_args()
+
+    index = open_for_cli(lambda path: DedupIndex(path, threshold=args.threshold), args.path, "dedup index")
+    if index is None:
+        return
+    if args.command == "stats":
+        print(index.stats())
+    elif not args.target:
+        parser.error(f"{args.command} needs a target")
+    elif args.command == "check":
+        with open(args.target, "r", encoding="utf-8-sig") as fh:
+            hit = index.match(resume_text(json.load(fh)))
+        print(f"duplicate of {hit[0]} (similarity {hit[1]:.2f}, {hit[2] or 'unknown source'})" if hit else "no duplicate")
+    else:
+        print("Removed" if index.forget(args.target) else "Not found", args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,16 @@
 import os
 import json
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
 
+from local_embedder import LocalEmbedder
+
 # === Config ===
 RESUME_DIR = "data/resumes"
 RESUME_NAMESPACE = "resumes"
 INDEX_NAME = "prototype-index"
 
-# Load embedding model
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-# Initialize Pinecone
-pinecone_api_key = os.environ.get("PINECONE_API_KEY", "YOUR_PINECONE_API_KEY")
-pc = Pinecone(api_key=pinecone_api_key)
-index = pc.Index(INDEX_NAME)
+# Embedding model (loaded in load_resumes, not at import: pool workers re-import this module)
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
 
 # === Utility: Flatten metadata ===
@@ -62,12 +58,8 @@ def flatten_metadata(resume_json):
 
 
 # === Load and upsert resumes ===
-def load_resumes():
-    resume_files = [f for f in os.listdir(RESUME_DIR) if f.endswith(".json")]
-    print(f"[INFO] Found {len(resume_files)} resume JSON files.")
-
-    upserts = []
-
+def iter_resume_docs(resume_files):
+    """(id, text, metadata) per resume file; embedding happens in batches downstream."""
     for file in resume_files:
         path = os.path.join(RESUME_DIR, file)
         with open(path, "r", encoding="utf-8") as f:
@@ -85,14 +77,24 @@ def load_resumes():
             text_parts.extend([" ".join(exp.get("responsibilities", [])) for exp in resume_json["experience"]])
 
         full_text = " ".join(text_parts)
-        embedding = model.encode(full_text).tolist()
 
         # Upsert format
-        upserts.append((resume_json.get("id", file), embedding, metadata))
+        yield resume_json.get("id", file), full_text, metadata
+
+
+def load_resumes():
+    resume_files = [f for f in os.listdir(RESUME_DIR) if f.endswith(".json")]
+    print(f"[INFO] Found {len(resume_files)} resume JSON files.")
+
+    # Initialize Pinecone
+    pinecone_api_key = os.environ.get("PINECONE_API_KEY", "YOUR_PINECONE_API_KEY")
+    pc = Pinecone(api_key=pinecone_api_key)
+    index = pc.Index(INDEX_NAME)
+    embedder = LocalEmbedder(EMBEDDING_MODEL)
 
-    if upserts:
-        index.upsert(vectors=upserts, namespace=RESUME_NAMESPACE)
-        print(f"[INFO] Upserted {len(upserts)} resumes into namespace '{RESUME_NAMESPACE}'")
+    upserted = embedder.upsert_stream(iter_resume_docs(resume_files), index, RESUME_NAMESPACE)
+    if upserted:
+        print(f"[INFO] Upserted {upserted} resumes into namespace '{RESUME_NAMESPACE}'")
     else:
         print("[WARNING] No resumes to upsert.")
 
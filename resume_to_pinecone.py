@@ -2,6 +2,19 @@
 """
 Ingest JSON resumes into Pinecone with normalized metadata and a consolidated
 text field for semantic search. Ensures stable IDs using candidate_id from JSON.
+
+Files are processed in groups (--files-per-batch): the chunk ids of a whole group are
+checked for existence in batched fetches, the missing chunks of all files are embedded
+together in token-budgeted requests, and the new vectors are upserted in payload-sized
+batches (--batch-size).
+
+An ingestion manifest (--manifest, see ingest_manifest.py) skips files whose content,
+model and chunking are unchanged since the last run; changed files are re-upserted and
+their orphaned chunk ids, like all ids of deleted files, are removed from the index.
+
+Chunk text stays inline in the vector metadata unless CONTENT_STORE_PATH enables the
+local content store (content_store.py); the metadata then only carries a `text_ref`
+pointer.
 """
 
 import os, sys, json, argparse, time
@@ -10,6 +23,13 @@ from tqdm import tqdm
 from openai import OpenAI
 from pinecone import Pinecone, ServerlessSpec
 
+from pinecone_io import existing_ids, upsert_vectors, delete_ids
+from ingest_manifest import IngestManifest, MANIFEST_PATH, under_dir
+from embedding_cache import get_cache, embed_with_cache
+from embedding_packer import embed_packed
+from rate_limit import get_controller, call_openai
+from content_store import get_content_store, offload_many
+
 # -------------------------
 # Config
 # -------------------------
@@ -17,12 +37,14 @@ OPENAI_KEY = os.environ.get("OPENAI_API_KEY")
 OPENAI_MODEL = os.environ.get("EMBED_MODEL", "text-embedding-3-large")  # 3072 dims
 PINECONE_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_ENV = os.environ.get("PINECONE_ENV")
+RESUMES_NS = "Resumes"
+FILES_PER_BATCH = 50  # files whose chunks share one existence check / upsert pass
 
 if not OPENAI_KEY or not PINECONE_KEY or not PINECONE_ENV:
     print("ERROR: Set OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_ENV in environment.")
     sys.exit(1)
 
-client = OpenAI(api_key=OPENAI_KEY)
+client = OpenAI(api_key=OPENAI_KEY, max_retries=0)  # retries: rate_limit.CallController
 pc = Pinecone(api_key=PINECONE_KEY)
 
 # -------------------------
@@ -42,16 +64,21 @@ def chunk_text(text: str, chunk_size_words: int = 1500, overlap: int = 200):
         i += chunk_size_words - overlap
     return chunks or [""]
 
-def get_embeddings_batch(texts, model=OPENAI_MODEL, sleep_on_error=2):
-    """Batch embed texts using OpenAI, ensure valid input."""
+def get_embeddings_batch(texts, model=OPENAI_MODEL):
+    """
+    Batch embed texts using OpenAI (cached on disk, packed per request limits), ensure valid input.
+    Transient errors are retried with backoff by the shared call controller, which gives up
+    with rate_limit.CallFailed after its retry cap instead of looping forever.
+    """
     texts = [t if isinstance(t, str) and t.strip() else " " for t in texts]
-    while True:
-        try:
-            resp = client.embeddings.create(model=model, input=texts)
-            return [d.embedding for d in resp.data]
-        except Exception as e:
-            print("OpenAI Embeddings error:", e)
-            time.sleep(sleep_on_error)
+
+    def call(batch):
+        resp = call_openai(get_controller("openai-embeddings"), client.embeddings,
+                           tokens=sum(len(t) for t in batch) // 4, model=model, input=batch)
+        return [d.embedding for d in resp.data]
+
+    return embed_with_cache(get_cache(), model, 0, texts,
+                            lambda missing: embed_packed(missing, call, model=model))
 
 def sanitize_metadata(md: dict):
     """Ensure Pinecone metadata contains only strings, numbers, or bools."""
@@ -156,7 +183,8 @@ def ensure_index(index_name: str, example_vector):
 # -------------------------
 # Resume Upsert
 # -------------------------
-def upsert_resume_file(resume_path: Path, index, chunk_size_words=1500, overlap=200, dry_run=False, batch_upsert=100):
+def build_resume_chunks(resume_path: Path, chunk_size_words=1500, overlap=200):
+    """(candidate_id, [(record_id, chunk_text, metadata), ...]) for one resume file."""
     parsed = load_json(resume_path)
     candidate_id = parsed.get("candidate_id")
     if not candidate_id:
@@ -174,23 +202,60 @@ def upsert_resume_file(resume_path: Path, index, chunk_size_words=1500, overlap=
             "text": chunk
         })
         vectors_for_upsert.append((record_id, chunk, md))
-
-    texts = [t for (_id, t, _md) in vectors_for_upsert]
-    embeddings = get_embeddings_batch(texts)
-    tuples = [(record_id, emb, md) for (record_id, _txt, md), emb in zip(vectors_for_upsert, embeddings)]
+    return candidate_id, vectors_for_upsert
+
+def upsert_resume_files(resume_paths, index, chunk_size_words=1500, overlap=200, dry_run=False, batch_upsert=100,
+                        refresh=()):
+    """
+    Ingest a group of resume files with one batched existence check and batched upserts.
+    Chunks already in the index are neither re-embedded nor re-upserted, except for files in
+    `refresh` (known to have changed), whose chunks are all rewritten.
+    Returns [(path, candidate_id, chunks, new_chunks, chunk_ids)]; files that fail to parse are reported and skipped.
+    """
+    prepared = []
+    for p in resume_paths:
+        try:
+            candidate_id, vecs = build_resume_chunks(p, chunk_size_words, overlap)
+            prepared.append((p, candidate_id, vecs))
+        except Exception as e:
+            print("ERROR processing", p, ":", e)
 
     if dry_run:
-        print(f"[DRY RUN] {resume_path.name} -> candidate_id={candidate_id} chunks={len(tuples)}")
-        return candidate_id, len(tuples)
+        get_embeddings_batch([t for _p, _c, vecs in prepared for (_id, t, _md) in vecs])
+        results = []
+        for p, candidate_id, vecs in prepared:
+            print(f"[DRY RUN] {p.name} -> candidate_id={candidate_id} chunks={len(vecs)}")
+            results.append((p, candidate_id, len(vecs), 0, [v[0] for v in vecs]))
+        return results
+
+    # Duplicate check for every chunk of the group at once
+    all_ids = [record_id for _p, _c, vecs in prepared for (record_id, _t, _md) in vecs]
+    existing = existing_ids(index, all_ids, RESUMES_NS)
+
+    results, missing = [], []
+    refresh = set(refresh)
+    for p, candidate_id, vecs in prepared:
+        new = [(record_id, t, md) for (record_id, t, md) in vecs if p in refresh or record_id not in existing]
+        missing.extend(new)
+        results.append((p, candidate_id, len(vecs), len(new), [v[0] for v in vecs]))
+
+    # One packed embedding pass for the missing chunks of every file in the group
+    embeddings = get_embeddings_batch([t for (_id, t, _md) in missing]) if missing else []
+    tuples = [(record_id, emb, md) for (record_id, _txt, md), emb in zip(missing, embeddings)]
+    tuples = offload_many(get_content_store(), RESUMES_NS, tuples)
+
+    upsert_vectors(index, tuples, RESUMES_NS, batch_size=batch_upsert)
+    for p, candidate_id, n_chunks, n_new, _ids in results:
+        print(f"Upserted {p.name} -> candidate_id={candidate_id} chunks={n_chunks} new={n_new}")
+    return results
 
-    # Upsert with duplicate check
-    for record_id, emb, md in tuples:
-        existing = index.fetch(ids=[record_id], namespace="Resumes")
-        if record_id not in existing.vectors:
-            index.upsert(vectors=[(record_id, emb, md)], namespace="Resumes")
-
-    print(f"Upserted {resume_path.name} -> candidate_id={candidate_id} chunks={len(tuples)}")
-    return candidate_id, len(tuples)
+def upsert_resume_file(resume_path: Path, index, chunk_size_words=1500, overlap=200, dry_run=False, batch_upsert=100):
+    results = upsert_resume_files([resume_path], index, chunk_size_words, overlap,
+                                  dry_run=dry_run, batch_upsert=batch_upsert)
+    if not results:
+        raise ValueError(f"{resume_path.name} could not be processed")
+    _p, candidate_id, n_chunks, _n_new, _ids = results[0]
+    return candidate_id, n_chunks
 
 # -------------------------
 # CLI
@@ -202,32 +267,88 @@ def main():
     parser.add_argument("--chunk-size", type=int, default=1500, help="words per chunk")
     parser.add_argument("--overlap", type=int, default=200, help="overlap words")
     parser.add_argument("--batch-size", type=int, default=100, help="upsert batch size")
+    parser.add_argument("--files-per-batch", type=int, default=FILES_PER_BATCH,
+                        help="resume files per existence-check / upsert pass")
     parser.add_argument("--dry-run", action="store_true", help="Do everything but upsert")
+    parser.add_argument("--manifest", default=MANIFEST_PATH,
+                        help="Ingestion manifest for skipping unchanged files ('off' to re-ingest everything)")
     args = parser.parse_args()
 
     data_dir = Path(args.data_dir)
     files = [p for p in data_dir.glob("*.json")]
 
-    if not files:
-        print("No JSON resume files found in", data_dir)
+    manifest = None
+    if args.manifest.lower() != "off" and not args.dry_run:
+        manifest = IngestManifest(args.manifest, scope=f"resume_to_pinecone:{args.index}:{RESUMES_NS}")
+    config = f"chunk_size={args.chunk_size},overlap={args.overlap}"
+    gone, changed = {}, set()
+    if manifest:
+        gone = manifest.vanished([str(p) for p in files], within=under_dir(data_dir))
+        todo = [p for p in files if not manifest.unchanged(p, OPENAI_MODEL, config)]
+        changed = {p for p in todo if manifest.get(p)}
+        print(f"Manifest: {len(files) - len(todo)} unchanged, {len(changed)} changed, "
+              f"{len(todo) - len(changed)} new, {len(gone)} deleted files")
+        files = todo
+
+    if not files and not gone:
+        print("No new or changed JSON resume files in", data_dir)
         return
 
-    # Sample embedding for index creation
-    sample_json = load_json(files[0])
-    _, sample_doc = normalize_resume(sample_json, files[0].name)
-    sample_emb = get_embeddings_batch([sample_doc])[0]
-    idx = ensure_index(args.index, sample_emb)
-
-    for p in tqdm(files, desc="Processing resumes"):
-        try:
-            upsert_resume_file(
-                p, idx,
-                args.chunk_size, args.overlap,
-                dry_run=args.dry_run,
-                batch_upsert=args.batch_size
-            )
-        except Exception as e:
-            print("ERROR processing", p, ":", e)
+    if files:
+        # Sample embedding for index creation
+        sample_json = load_json(files[0])
+        _, sample_doc = normalize_resume(sample_json, files[0].name)
+        sample_emb = get_embeddings_batch([sample_doc])[0]
+        idx = ensure_index(args.index, sample_emb)
+    else:
+        idx = pc.Index(args.index)
+
+    store = get_content_store()
+    if gone:
+        gone_ids = manifest.release(gone)  # ids still produced by another file are kept
+        n = delete_ids(idx, gone_ids, RESUMES_NS)
+        if store:
+            store.delete_many(RESUMES_NS, gone_ids)
+        manifest.save()
+        print(f"Deleted {n} vectors of {len(gone)} removed files")
+
+    def ingest_group(batch):
+        results = upsert_resume_files(
+            batch, idx,
+            args.chunk_size, args.overlap,
+            dry_run=args.dry_run,
+            batch_upsert=args.batch_size,
+            refresh=changed
+        )
+        if manifest:
+            orphans = []
+            for p, _cid, _n, _new, ids in results:
+                orphans.extend(manifest.record(p, ids, OPENAI_MODEL, config))
+            orphans = manifest.unowned(orphans)
+            if orphans:
+                delete_ids(idx, orphans, RESUMES_NS)
+                if store:
+                    store.delete_many(RESUMES_NS, orphans)
+            manifest.save()
+
+    group = max(1, args.files_per_batch)
+    with tqdm(total=len(files), desc="Processing resumes") as bar:
+        for start in range(0, len(files), group):
+            batch = files[start:start + group]
+            try:
+                ingest_group(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    print("ERROR processing", batch[0], ":", e)
+                else:
+                    # one bad file must not fail the whole group: retry its files one by one
+                    print(f"ERROR processing {len(batch)} files starting at {batch[0]}: {e}; retrying file by file")
+                    for p in batch:
+                        try:
+                            ingest_group([p])
+                        except Exception as e:
+                            print("ERROR processing", p, ":", e)
+            bar.update(len(batch))
 
 if __name__ == "__main__":
     main()
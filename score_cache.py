@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+score_cache.py
+
+Persistent chunk x JD score matrix for incremental scoring runs
+(compute_resume_jd_scores.py --incremental).
+
+Rows (resume chunks) and columns (JDs) are keyed by a content hash of their vector
+(plus candidate/section for rows, since those drive aggregation). A run diffs the
+current ids/hashes against the cache: unchanged rows x unchanged columns are reused,
+only new or changed rows and columns are scored, and deleted ids simply drop out.
+
+Layout (under --cache-dir, default .score_cache/):
+  state.json   row ids/hashes/candidates, column ids/hashes, aggregate candidate order
+  scores.npy   float32 (rows x cols) score matrix (loaded memory-mapped)
+  agg.npz      candidate x JD aggregates: max_scores, weighted_sums, weight_sums, counts
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except Exception as e:
+    raise SystemExit("Missing dependency: numpy. Install with: python -m pip install numpy") from e
+
+CACHE_DIR = ".score_cache"
+
+
+def content_hashes(mat: "np.ndarray", tags: Optional[Sequence[str]] = None) -> List[str]:
+    """Hash every row's float32 bytes (plus an optional per-row tag string)."""
+    mat = np.ascontiguousarray(mat, dtype=np.float32)
+    out = []
+    for i in range(mat.shape[0]):
+        h = hashlib.blake2b(mat[i].tobytes(), digest_size=16)
+        if tags is not None:
+            h.update(b"|" + str(tags[i]).encode("utf-8"))
+        out.append(h.hexdigest())
+    return out
+
+
+class DiffPlan:
+    """
+    Index bookkeeping between the cached matrix and the current ids.
+    kept_new / kept_old: positions of unchanged ids in the new / cached order.
+    fresh: positions (in the new order) of ids that are new or whose hash changed.
+    dropped: cached positions whose id is gone or whose hash changed.
+    """
+    def __init__(self, old_ids: List[str], old_hashes: List[str], ids: List[str], hashes: List[str]):
+        old_pos = {vid: i for i, vid in enumerate(old_ids)}
+        self.kept_new, self.kept_old, self.fresh = [], [], []
+        for i, (vid, h) in enumerate(zip(ids, hashes)):
+            j = old_pos.get(vid)
+            if j is not None and old_hashes[j] == h:
+                self.kept_new.append(i)
+                self.kept_old.append(j)
+            else:
+                self.fresh.append(i)
+        kept_old = set(self.kept_old)
+        self.dropped = [j for j in range(len(old_ids)) if j not in kept_old]
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.fresh or self.dropped)
+
+
+class ScoreCache:
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.dir = Path(cache_dir)
+        self.state_path = self.dir / "state.json"
+        self.scores_path = self.dir / "scores.npy"
+        self.agg_path = self.dir / "agg.npz"
+        self.row_ids: List[str] = []
+        self.row_hashes: List[str] = []
+        self.row_candidates: List[str] = []
+        self.col_ids: List[str] = []
+        self.col_hashes: List[str] = []
+        self.candidates: List[str] = []
+        self.scores = None
+        self.agg: Dict[str, "np.ndarray"] = {}
+
+    def load(self) -> bool:
+        """Load a previous run; False (empty cache) if nothing usable is on disk."""
+        if not (self.state_path.exists() and self.scores_path.exists() and self.agg_path.exists()):
+            return False
+        with open(self.state_path, "r", encoding="utf-8") as fh:
+            state = json.load(fh)
+        self.row_ids = state.get("rows") or []
+        self.row_hashes = state.get("row_hashes") or []
+        self.row_candidates = state.get("row_candidates") or []
+        self.col_ids = state.get("cols") or []
+        self.col_hashes = state.get("col_hashes") or []
+        self.candidates = state.get("candidates") or []
+        self.scores = np.load(self.scores_path, mmap_mode="r")
+        with np.load(self.agg_path) as z:
+            self.agg = {k: z[k] for k in z.files}
+        if self.scores.shape != (len(self.row_ids), len(self.col_ids)):
+            print("Score cache is inconsistent; ignoring it.")
+            self.__init__(str(self.dir))
+            return False
+        return True
+
+    def save(self, row_ids: List[str], row_hashes: List[str], row_candidates: List[str],
+             col_ids: List[str], col_hashes: List[str], scores: "np.ndarray",
+             candidates: List[str], agg: Dict[str, "np.ndarray"]) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        # write next to the old files, then swap in, so an interrupted run keeps the previous cache
+        self.scores = None
+        tmp_scores = self.dir / "scores.tmp.npy"
+        np.save(tmp_scores, np.ascontiguousarray(scores, dtype=np.float32))
+        tmp_agg = self.dir / "agg.tmp.npz"
+        np.savez(tmp_agg, **agg)
+        tmp_state = self.dir / "state.json.tmp"
+        with open(tmp_state, "w", encoding="utf-8") as fh:
+            json.dump({"rows": row_ids, "row_hashes": row_hashes, "row_candidates": row_candidates,
+                       "cols": col_ids, "col_hashes": col_hashes, "candidates": candidates}, fh)
+        os.replace(tmp_scores, self.scores_path)
+        os.replace(tmp_agg, self.agg_path)
+        os.replace(tmp_state, self.state_path)
+
+    def plan(self, row_ids: List[str], row_hashes: List[str],
+             col_ids: List[str], col_hashes: List[str]):
+        """(row DiffPlan, column DiffPlan) of the current ids against the cache."""
+        return (DiffPlan(self.row_ids, self.row_hashes, row_ids, row_hashes),
+                DiffPlan(self.col_ids, self.col_hashes, col_ids, col_hashes))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+scoring_engine.py
+
+Vectorized cosine scoring between resume chunk vectors and JD vectors.
+
+- Stacks vectors into contiguous float32 matrices (one row per vector)
+- L2-normalizes every row once
+- Computes every chunk x JD cosine score with a single matrix multiply (BLAS)
+
+Used by compute_resume_jd_scores.py. Requires numpy.
+"""
+
+from typing import List, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception as e:
+    raise SystemExit("Missing dependency: numpy. Install with: python -m pip install numpy") from e
+
+DTYPE = np.float32
+
+
+# -------------------- Matrix building --------------------
+def stack_vectors(vectors: Sequence[Sequence[float]], dim: int = 0) -> np.ndarray:
+    """
+    Stack a list of vectors into a C-contiguous float32 matrix of shape (n, dim).
+    Missing/empty vectors become zero rows; longer vectors are truncated and
+    shorter ones zero-padded to `dim` (defaults to the longest vector).
+    """
+    if not dim:
+        dim = max((len(v) for v in vectors if v is not None), default=0)
+    mat = np.zeros((len(vectors), dim), dtype=DTYPE)
+    for i, v in enumerate(vectors):
+        if not v:
+            continue
+        n = min(len(v), dim)
+        mat[i, :n] = np.asarray(v[:n], dtype=DTYPE)
+    return mat
+
+
+def l2_normalize(mat: np.ndarray) -> np.ndarray:
+    """Normalize rows in place to unit length. Zero rows stay zero (score 0.0)."""
+    if mat.size == 0:
+        return mat
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    np.divide(mat, norms, out=mat, where=norms > 0)
+    return mat
+
+
+def align_dims(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Truncate both matrices to their common dimension (mirrors the old per-pair behaviour)."""
+    n = min(a.shape[1], b.shape[1])
+    if a.shape[1] != n:
+        a = np.ascontiguousarray(a[:, :n])
+    if b.shape[1] != n:
+        b = np.ascontiguousarray(b[:, :n])
+    return a, b
+
+
+def build_normalized_matrix(vectors: Sequence[Sequence[float]], dim: int = 0) -> np.ndarray:
+    """Convenience: stack + normalize."""
+    return l2_normalize(stack_vectors(vectors, dim=dim))
+
+
+# -------------------- Scoring --------------------
+def score_matrix(resume_mat: np.ndarray, jd_mat: np.ndarray) -> np.ndarray:
+    """
+    Cosine scores for normalized matrices: (n_chunks, dim) @ (dim, n_jds) -> (n_chunks, n_jds).
+    Inputs must already be L2-normalized (see build_normalized_matrix).
+    """
+    resume_mat, jd_mat = align_dims(resume_mat, jd_mat)
+    return resume_mat @ jd_mat.T
+
+
+def score_vectors(resume_vectors: List[List[float]], jd_vectors: List[List[float]]) -> np.ndarray:
+    """
+    Score raw vectors end to end. Dimensions are truncated to the common length
+    before normalization, so each score is dot(a, b) / (|a| |b|) over the shared
+    dimensions (0.0 when either vector is all zeros).
+    """
+    r = stack_vectors(resume_vectors)
+    j = stack_vectors(jd_vectors)
+    r, j = align_dims(r, j)
+    return score_matrix(l2_normalize(r), l2_normalize(j))
+
+
+# -------------------- Tiling --------------------
+def rows_for_budget(budget_bytes: int, dim: int, n_jds: int, per_value_overhead: int = 0) -> int:
+    """
+    How many resume rows fit in one tile for a given memory budget.
+    Per row we hold: the float32 vector (plus per_value_overhead bytes per value if the
+    caller keeps Python float lists around), one float32 score per JD, and the
+    temporaries of the candidate aggregation (a float32 reordered copy, a float64 product).
+    """
+    per_row = dim * (per_value_overhead + 4) + n_jds * (4 + 4 + 8)
+    return max(1, int(budget_bytes // max(1, per_row)))
+
+
+def top_pairs(scores: np.ndarray, k: int) -> List[Tuple[float, int, int]]:
+    """
+    Best k (score, row, col) entries of a score block, highest first,
+    without sorting the whole block (argpartition on the flattened view).
+    """
+    if k <= 0 or scores.size == 0:
+        return []
+    flat = scores.ravel()
+    k = min(k, flat.size)
+    idx = np.argpartition(flat, flat.size - k)[flat.size - k:]
+    idx = idx[np.argsort(-flat[idx], kind="stable")]
+    n_cols = scores.shape[1]
+    return [(float(flat[i]), int(i // n_cols), int(i % n_cols)) for i in idx]
+
+
+# -------------------- Per-JD top-K --------------------
+def topk_per_column(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best k rows for every column, via argpartition (no full sort).
+    Returns (rows, values), both shaped (k', n_cols) and ordered best first per column,
+    where k' = min(k, n_rows).
+    """
+    n_rows = scores.shape[0]
+    k = min(k, n_rows)
+    if k <= 0:
+        return np.empty((0, scores.shape[1]), dtype=np.int64), np.empty((0, scores.shape[1]), dtype=scores.dtype)
+    if k < n_rows:
+        rows = np.argpartition(-scores, k - 1, axis=0)[:k]
+    else:
+        rows = np.broadcast_to(np.arange(n_rows)[:, None], scores.shape).copy()
+    vals = np.take_along_axis(scores, rows, axis=0)
+    order = np.argsort(-vals, axis=0, kind="stable")
+    return np.take_along_axis(rows, order, axis=0), np.take_along_axis(vals, order, axis=0)
+
+
+class ColumnTopK:
+    """
+    Streaming per-column top-K over row blocks: keeps at most k (row, score) pairs per
+    column, so memory is O(k * n_cols) no matter how many rows are scored.
+    """
+    def __init__(self, n_cols: int, k: int):
+        self.k = k
+        self.rows = np.empty((0, n_cols), dtype=np.int64)
+        self.vals = np.empty((0, n_cols), dtype=np.float32)
+
+    def update(self, scores: np.ndarray, row_offset: int = 0) -> None:
+        rows, vals = topk_per_column(scores, self.k)
+        merged_rows = np.concatenate([self.rows, rows + row_offset], axis=0)
+        merged_vals = np.concatenate([self.vals, vals.astype(self.vals.dtype, copy=False)], axis=0)
+        keep, self.vals = topk_per_column(merged_vals, self.k)
+        self.rows = np.take_along_axis(merged_rows, keep, axis=0)
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, values) shaped (k', n_cols), best first per column."""
+        return self.rows, self.vals
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+section_splitter.py
+
+Resume section segmentation for txt_to_json.py.
+
+- One compiled regex finds every heading line in a single pass over the text: known
+  heading aliases in any case ("Work Experience", "TECHNICAL SKILLS:", "Education &
+  Training") plus the old fallback of short all-caps lines.
+- Known aliases map onto the canonical section names used for scoring (the
+  SECTION_WEIGHTS keys in compute_resume_jd_scores.py); other headings are slugified.
+  A heading listing several sections ("Projects, Certifications & Achievements") maps
+  to the combined section that covers all of them when there is one.
+- Sections are located by offsets and sliced once; sections longer than
+  MAX_SECTION_WORDS are split into balanced parts, preferably at line breaks, so no
+  single chunk is embedded as one giant blob. Text before the first heading is "BODY".
+
+Usage:
+  from section_splitter import split_sections
+  for key, text in split_sections(raw_text): ...
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+MAX_SECTION_WORDS = 400
+BODY = "BODY"
+
+# canonical section -> heading aliases (case-insensitive; "and" also matches "&")
+SECTION_ALIASES: Dict[str, List[str]] = {
+    "professional_summary": [
+        "summary", "professional summary", "career summary", "executive summary", "profile",
+        "professional profile", "career profile", "objective", "career objective", "about me", "overview",
+    ],
+    "skills": [
+        "skills", "technical skills", "key skills", "core skills", "skill set", "skillset", "competencies",
+        "core competencies", "technologies", "tools and technologies", "tech stack", "areas of expertise",
+        "expertise", "technical proficiency",
+    ],
+    "experience": [
+        "experience", "work experience", "professional experience", "relevant experience", "employment",
+        "employment history", "work history", "career history", "internships", "internship experience",
+    ],
+    "projects": [
+        "projects", "key projects", "academic projects", "personal projects", "project experience",
+        "project details",
+    ],
+    "projects_certifications_achievements": [
+        "certifications", "certificates", "licenses and certifications", "achievements", "accomplishments",
+        "awards", "honors and awards", "awards and achievements", "certifications and achievements",
+    ],
+    "education": [
+        "education", "academic background", "academics", "educational qualifications", "qualifications",
+        "academic qualifications", "education and training",
+    ],
+}
+
+_ALIAS_KEY = {alias: key for key, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+
+def _alias_regex(alias: str) -> str:
+    return r"[ \t]+".join(r"(?:and|&)" if w == "and" else re.escape(w) for w in alias.split())
+
+
+_ALIASES = "|".join(_alias_regex(a) for a in sorted(_ALIAS_KEY, key=len, reverse=True))
+_ALIAS_LIST = r"(?:" + _ALIASES + r")(?:(?:[ \t]*[,/&][ \t]*|[ \t]+and[ \t]+)(?:" + _ALIASES + r"))*"
+_HEADING = re.compile(
+    r"^[ \t]*(?:[#*•-]+[ \t]*)?"                                   # optional markdown / bullet marker
+    r"(?:(?P<alias>(?i:" + _ALIAS_LIST + r"))[ \t]*(?::[ \t]*|$)"     # known heading(s), inline text may follow ':'
+    r"|(?P<caps>[A-Z][A-Z0-9&/,.'() -]{1,58})[ \t]*:?[ \t]*$)",      # short all-caps line
+    re.M)
+_ALIAS_IN = re.compile(r"\b(?:" + _ALIASES + r")\b", re.I)
+_WORD = re.compile(r"\S+")
+
+
+def canonical_section(heading: str) -> str:
+    """Canonical section name for a heading: SECTION_WEIGHTS key if it is (or contains) a known alias, else a slug."""
+    norm = " ".join(heading.lower().replace("&", " and ").split())
+    if norm in _ALIAS_KEY:
+        return _ALIAS_KEY[norm]
+    # e.g. "WORK EXPERIENCE DETAILS"; for "PROJECTS, CERTIFICATIONS & ACHIEVEMENTS" the combined
+    # key covering every alias found wins over the first single-section one
+    keys = list(dict.fromkeys(_ALIAS_KEY[" ".join(m.group(0).split())] for m in _ALIAS_IN.finditer(norm)))
+    if keys:
+        return next((k for k in keys if all(other in k for other in keys)), keys[0])
+    return re.sub(r"[^a-z0-9]+", "_", norm).strip("_") or BODY
+
+
+def segment(text: str) -> List[Tuple[str, int, int]]:
+    """(section, start, end) spans of section bodies, in text order (headings excluded)."""
+    spans = []
+    key, start = BODY, 0
+    for m in _HEADING.finditer(text):
+        heading = m.group("alias") or m.group("caps")
+        section = canonical_section(heading)
+        if m.group("caps") and section not in SECTION_ALIASES and ("," in heading or len(heading.split()) >= 6):
+            continue  # an all-caps list line ("AWS, GCP, SQL"), not a heading
+        spans.append((key, start, m.start()))
+        key, start = section, m.end()
+    spans.append((key, start, len(text)))
+    return [(k, s, e) for k, s, e in spans if _WORD.search(text, s, e)]
+
+
+def _parts(text: str, start: int, end: int, max_words: int) -> List[Tuple[int, int]]:
+    """Split [start, end) into balanced pieces of <= max_words words, cutting at line breaks where possible."""
+    words = [m.start() for m in _WORD.finditer(text, start, end)]
+    if len(words) <= max_words:
+        return [(start, end)]
+    cuts, i = [], 0
+    while len(words) - i > max_words:
+        remaining = len(words) - i
+        target = -(-remaining // -(-remaining // max_words))  # even share of what is left
+        j = i + target
+        k = j
+        floor = i + (target * 3) // 4
+        while k > floor and "\n" not in text[words[k - 1]:words[k]]:
+            k -= 1
+        if k > floor:
+            j = k
+        cuts.append(words[j])
+        i = j
+    bounds = [start] + cuts + [end]
+    return list(zip(bounds, bounds[1:]))
+
+
+def split_sections(text: str, max_words: int = MAX_SECTION_WORDS) -> List[Tuple[str, str]]:
+    """[(section, text)] with canonical section names; long sections come back as several parts."""
+    out = []
+    for key, start, end in segment(text):
+        for s, e in _parts(text, start, end, max_words):
+            out.append((key, text[s:e].strip()))
+    return out or [(BODY, text.strip())]
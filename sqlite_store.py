@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+sqlite_store.py
+
+Shared plumbing for the single-file SQLite stores (embedding_cache.py, note_cache.py,
+content_store.py, extraction_cache.py, resume_dedup.py, the JD result cache in
+jd_extractor.py). Each store module keeps only its schema and domain logic.
+
+- SQLiteStore: base class. Creates the parent directory, opens one connection shared
+  by all threads (every statement runs under self._lock) and applies the subclass SCHEMA.
+- StoreSingleton: the process-wide store behind a *_PATH environment variable, opened
+  on first use; get() returns None when the path is empty / "off" or the file cannot be
+  opened. per_process=True reopens it in pool worker processes.
+- store_cli / open_for_cli: argparse scaffolding for the stats / prune / clear commands.
+
+Usage:
+  class NoteCache(SQLiteStore):
+      SCHEMA = ("CREATE TABLE IF NOT EXISTS notes (...)",)
+
+  _default = StoreSingleton(NoteCache, NOTE_CACHE_PATH, "Note cache")
+  cache = _default.get()
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+import threading
+from typing import Callable, Generic, Optional, Sequence, TypeVar
+
+SQLITE_TIMEOUT = 30  # seconds a writer waits for another process's lock
+
+S = TypeVar("S", bound="SQLiteStore")
+
+
+def is_enabled(path: Optional[str]) -> bool:
+    """False for an empty path or "off" (the disable switch of every *_PATH variable)."""
+    return bool(path) and path.lower() != "off"
+
+
+class SQLiteStore:
+    """Single-file SQLite store. Safe to share between threads."""
+
+    SCHEMA: Sequence[str] = ()  # CREATE ... IF NOT EXISTS statements run on open
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+        for statement in self.SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class StoreSingleton(Generic[S]):
+    """Lazily opened process-wide store; get() is None when disabled or unusable."""
+
+    def __init__(self, factory: Callable[[str], S], path: Optional[str], label: str, per_process: bool = False):
+        self.factory = factory
+        self.path = path
+        self.label = label
+        self.per_process = per_process
+        self._store: Optional[S] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[S]:
+        if not is_enabled(self.path):
+            return None
+        with self._lock:
+            if self._store is None or (self.per_process and self._pid != os.getpid()):
+                try:
+                    self._store = self.factory(self.path)
+                    self._pid = os.getpid()
+                except Exception as e:
+                    print(f"{self.label} disabled ({self.path}): {e}", file=sys.stderr)
+                    return None
+            return self._store
+
+
+# -------------------- CLI --------------------
+def store_cli(description: str, commands: Sequence[str], default_path: str,
+              path_help: str = "Cache file") -> argparse.ArgumentParser:
+    """Parser with the positional command and --path; callers add their own options."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("command", choices=list(commands))
+    parser.add_argument("--path", default=default_path, help=path_help)
+    return parser
+
+
+def open_for_cli(factory: Callable[[str], S], path: str, label: str) -> Optional[S]:
+    """The store at path for a maintenance command; None (after saying so) when there is no file."""
+    if not os.path.exists(path):
+        print(f"No {label} at", path)
+        return None
+    return factory(path)
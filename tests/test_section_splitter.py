@@ -0,0 +1,32 @@
+from section_splitter import canonical_section, split_sections
+
+
+def test_single_alias_headings():
+    assert canonical_section("WORK EXPERIENCE") == "experience"
+    assert canonical_section("Technical Skills:") == "skills"
+    assert canonical_section("Education & Training") == "education"
+
+
+def test_combined_heading_keeps_combined_section():
+    assert canonical_section("PROJECTS, CERTIFICATIONS & ACHIEVEMENTS") == "projects_certifications_achievements"
+    assert canonical_section("Projects and Certifications") == "projects_certifications_achievements"
+
+
+def test_unknown_heading_is_slugified():
+    assert canonical_section("VOLUNTEER WORK") == "volunteer_work"
+
+
+def test_split_sections_mixed_case_combined_heading():
+    text = "Jane Doe\nProjects, Certifications & Achievements\nBuilt a parser\nAWS certified\nSkills: Python, SQL\n"
+    assert split_sections(text) == [
+        ("BODY", "Jane Doe"),
+        ("projects_certifications_achievements", "Built a parser\nAWS certified"),
+        ("skills", "Python, SQL"),
+    ]
+
+
+def test_long_section_is_split_into_balanced_parts():
+    text = "EXPERIENCE\n" + "\n".join(" ".join(["word"] * 10) for _ in range(90))
+    parts = split_sections(text, max_words=400)
+    assert [key for key, _ in parts] == ["experience"] * 3
+    assert all(len(body.split()) <= 400 for _, body in parts)
@@ -9,6 +9,9 @@ import os, sys, json, argparse, uuid, re
 from pathlib import Path
 from datetime import datetime
 
+from extraction_cache import cached_extract
+from section_splitter import split_sections
+
 try:
     import docx   # python-docx
 except Exception:
@@ -17,32 +20,21 @@ except Exception:
 def read_txt(path: Path) -> str:
     return path.read_text(encoding="utf-8-sig")
 
+DOCX_EXTRACTOR = "docx-paragraphs/1"  # extraction cache id; bump when _parse_docx output changes
+
+def _parse_docx(path: Path) -> str:
+    d = docx.Document(str(path))
+    return "\n\n".join(p.text for p in d.paragraphs if p.text and p.text.strip())
+
 def read_docx(path: Path) -> str:
     if not docx:
         raise RuntimeError("python-docx not installed (pip install python-docx) to read .docx files")
-    d = docx.Document(str(path))
-    return "\n\n".join(p.text for p in d.paragraphs if p.text and p.text.strip())
+    return cached_extract(path, DOCX_EXTRACTOR, _parse_docx)
 
 def split_into_sections(text: str) -> list:
-    # naive heuristic: headings lines all-caps or common section words
-    lines = [l.rstrip() for l in text.splitlines()]
-    sections = []
-    cur_lines = []
-    cur_title = None
-    for ln in lines:
-        # treat heading if it's short and contains keywords or is uppercase
-        if ln.strip() and (ln.strip().upper() == ln.strip() and len(ln.strip()) < 60) and len(ln.strip().split()) < 6:
-            # push previous
-            if cur_lines:
-                sections.append((cur_title or "BODY", "\n".join(cur_lines).strip()))
-                cur_lines = []
-            cur_title = ln.strip()
-        else:
-            if ln is not None:
-                cur_lines.append(ln)
-    if cur_lines:
-        sections.append((cur_title or "BODY", "\n".join(cur_lines).strip()))
-    return sections if sections else [("BODY", text.strip())]
+    # single-pass heading detection (section_splitter): headings map onto the scoring
+    # section names (skills, experience, ...) and long sections are split for embedding
+    return split_sections(text)
 
 def extract_name_email(text: str):
     # very simple heuristics
@@ -19,6 +19,7 @@ Behavior:
 """
 import os, sys, argparse, time
 from pinecone import Pinecone
+from pinecone_io import open_index, list_all_ids, fetch_batches
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--from-prefix", required=True, help="Prefix of old vectors (e.g. sumeet_adhav_001)")
@@ -34,29 +35,15 @@ if not API_KEY or not args.index:
     print("ERROR: PINECONE_API_KEY and index name required (env PINECONE_INDEX or --index)."); sys.exit(2)
 
 pc = Pinecone(api_key=API_KEY)
-ix = pc.Index(args.index)
+ix = open_index(pc, args.index)
 ns = args.namespace
 from_pref = args.from_prefix
 to_id = args.to_id
 
 print(f"Scanning namespace '{ns}' for ids starting with '{from_pref}' ...")
-# collect ids (use list pagination)
-found_ids = []
+# collect ids (prefix listing, follows pagination to the end)
 try:
-    for page in ix.list(namespace=ns, limit=100):
-        # normalize page
-        if isinstance(page, str):
-            found_ids.append(page)
-        elif isinstance(page, list):
-            for p in page:
-                if isinstance(p, str):
-                    found_ids.append(p)
-                elif isinstance(p, dict) and "id" in p:
-                    found_ids.append(p["id"])
-        elif isinstance(page, dict):
-            # older SDK shapes
-            for k in page.keys():
-                found_ids.append(k)
+    found_ids = list_all_ids(ix, ns, prefixes=[from_pref])
 except Exception as e:
     print("List failed:", e)
     sys.exit(1)
@@ -75,22 +62,21 @@ def chunks(lst, n):
         yield lst[i:i+n]
 
 all_new_ids = []
-for batch in chunks(found_ids, args.batch_size):
-    print(f"Fetching batch of {len(batch)}")
-    fetched = ix.fetch(ids=batch, namespace=ns)
-    vecs = getattr(fetched, "vectors", None) or (fetched.get("vectors") if isinstance(fetched, dict) else {})
+# batches are fetched concurrently (with retries); upsert each as it arrives
+for batch, vecs in fetch_batches(ix, found_ids, ns, batch_size=args.batch_size):
+    print(f"Fetched batch of {len(batch)}")
     to_upsert = []
     for old_id in batch:
-        vobj = vecs.get(old_id) if isinstance(vecs, dict) else None
+        vobj = vecs.get(old_id)
         if vobj is None:
             print("  WARNING: missing vector for", old_id)
             continue
         # vector values
-        values = getattr(vobj, "values", None) or (vobj.get("values") if isinstance(vobj, dict) else None)
-        if values is None:
+        values = vobj.get("values")
+        if not values:
             print("  WARNING: no values for", old_id); continue
         # metadata
-        meta = getattr(vobj, "metadata", None) or (vobj.get("metadata") if isinstance(vobj, dict) else {}) or {}
+        meta = dict(vobj.get("metadata") or {})
         # derive suffix part after prefix: find first occurrence of '_chunk'
         if "_chunk" in old_id:
             suffix = old_id.split("_chunk",1)[1]
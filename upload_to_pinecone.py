@@ -5,29 +5,66 @@ Ingest resume-chunk JSON files (list of chunk objects) into Pinecone.
 Assumes each input JSON is a list of dicts with keys: chunk_index, section, chunk_text, metadata (candidate_id etc.)
 If candidate_id is not present the script will use deterministic UUID generation as candidate seed.
 Notes: requires PINECONE_API_KEY, PINECONE_INDEX, OPENAI_API_KEY (if you want notes generation)
+
+Usage:
+  python upload_to_pinecone.py --file data/chunks/jane.json --namespace Resumes --id-method email
+  python upload_to_pinecone.py --dir data/chunks --namespace Resumes --id-method email --workers 4
+  python upload_to_pinecone.py --dir "data/chunks/**/*.json" --namespace Resumes
+Bulk mode (--dir) shares the clients and the embed/upsert batches across files and ends
+with a per-file success/failure summary.
+Files unchanged since their last successful ingest (per the ingestion manifest, see
+ingest_manifest.py) are skipped; vector ids a changed or removed file no longer produces
+are deleted from the namespace.
+Re-submitted resumes are caught before embedding by a near-duplicate index (resume_dedup.py):
+--dedup flag marks them in metadata, map re-uses the existing candidate_id, skip leaves them out.
+A resume enters that index only once all of its chunks are upserted, and leaves it when the
+manifest drops the last of its vectors.
 """
-import os, sys, json, argparse, uuid, re
+import os, sys, json, argparse, uuid, re, glob, fnmatch
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from time import sleep
 
 from pinecone import Pinecone
 from openai import OpenAI
 
+from embedding_cache import get_cache, embed_with_cache
+from embedding_packer import embed_packed
+from rate_limit import get_controller, call_openai
+from note_cache import get_note_cache, prompt_fingerprint
+from ingest_pipeline import Stage, run_pipeline, print_stage_stats
+from pinecone_io import upsert_vectors, delete_ids
+from ingest_manifest import IngestManifest, MANIFEST_PATH, under_dir
+from resume_dedup import DedupIndex, get_dedup_index, resume_text, signature
+
 # ensure logs dir
 Path("logs").mkdir(exist_ok=True)
 
 parser = argparse.ArgumentParser()
-parser.add_argument("--file", required=True, help="Input JSON (list of chunk objects)")
+source = parser.add_mutually_exclusive_group(required=True)
+source.add_argument("--file", help="Input JSON (list of chunk objects)")
+source.add_argument("--dir", help="Bulk mode: directory of input JSON files, or a glob pattern")
 parser.add_argument("--namespace", required=True, help="Pinecone namespace")
 parser.add_argument("--index", required=False, help="Pinecone index name (or env)")
 parser.add_argument("--id-method", choices=["uuid","email","name","content_hash"], default="uuid")
 parser.add_argument("--emb-model", default="text-embedding-3-large")
 parser.add_argument("--summ-model", default="gpt-4o-mini")
 parser.add_argument("--batch-size", type=int, default=50)
+parser.add_argument("--notes-workers", type=int, default=8, help="Concurrent note-generation requests")
+parser.add_argument("--notes-rpm", type=int, default=500, help="Notes model requests/minute (refined from rate-limit headers)")
+parser.add_argument("--notes-tpm", type=int, default=200000, help="Notes model tokens/minute (refined from rate-limit headers)")
+parser.add_argument("--workers", "--stage-workers", dest="stage_workers", type=int, default=2,
+                    help="Workers per pipeline stage (parse/notes/embed/upsert)")
+parser.add_argument("--manifest", default=MANIFEST_PATH,
+                    help="Ingestion manifest for skipping unchanged files ('off' to re-ingest everything)")
+parser.add_argument("--dedup", choices=["off", "flag", "map", "skip"], default="flag",
+                    help="Near-duplicate resumes: flag in metadata, map onto the existing candidate_id, or skip the file")
+parser.add_argument("--purge-stale-notes", action="store_true",
+                    help="Delete cached notes of this --summ-model made with an older make_prompt")
 args = parser.parse_args()
 
 INPUT_FILE = args.file
+INPUT_DIR = args.dir
 NAMESPACE = args.namespace
 INDEX_NAME = args.index or os.environ.get("PINECONE_INDEX")
 PINECONE_KEY = os.environ.get("PINECONE_API_KEY")
@@ -36,13 +73,19 @@ ID_METHOD = args.id_method
 EMB_MODEL = args.emb_model
 SUMM_MODEL = args.summ_model
 BATCH_SIZE = int(args.batch_size)
+NOTES_WORKERS = max(1, int(args.notes_workers))
+NOTE_MAX_OUTPUT_TOKENS = 80  # reserved per call in the token bucket (one-line note)
+STAGE_WORKERS = max(1, int(args.stage_workers))
+PIPELINE_QUEUE = 4  # batches buffered between two stages
 
 if not PINECONE_KEY or not INDEX_NAME:
     print("ERROR: set PINECONE_API_KEY and PINECONE_INDEX", file=sys.stderr); sys.exit(2)
 
 pc = Pinecone(api_key=PINECONE_KEY)
 index = pc.Index(INDEX_NAME)
-client = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
+client = OpenAI(api_key=OPENAI_KEY, max_retries=0) if OPENAI_KEY else None  # retries: rate_limit.CallController
+notes_calls = get_controller("openai-responses", rpm=args.notes_rpm, tpm=args.notes_tpm, max_concurrency=NOTES_WORKERS)
+embed_calls = get_controller("openai-embeddings")
 
 def short_hex(s, n=6):
     import hashlib
@@ -84,51 +127,97 @@ def sanitize_meta(meta: dict):
             out[k] = v
     return out
 
-# load file with utf-8-sig
-if not Path(INPUT_FILE).exists():
-    print("ERROR: Input file not found:", INPUT_FILE, file=sys.stderr); sys.exit(1)
-
-with open(INPUT_FILE, "r", encoding="utf-8-sig") as fh:
-    raw = json.load(fh)
-
-if not isinstance(raw, list):
-    print("ERROR: input JSON must be a list of chunk objects", file=sys.stderr); sys.exit(1)
-
-first = raw[0] if raw else {}
-seed_obj = {"metadata": {"candidate_name": first.get("candidate_name") or (first.get("metadata") or {}).get("candidate_name"), "email": (first.get("metadata") or {}).get("email")}, "full_text": first.get("full_text") or json.dumps(raw, sort_keys=True)}
-candidate_id = deterministic_candidate_id(seed_obj, ID_METHOD)
-print(f"Candidate ID: {candidate_id}  (method={ID_METHOD})")
-
-# normalize
-normalized = []
-for i,obj in enumerate(raw, start=1):
-    meta = (obj.get("metadata") or {}).copy()
-    meta.setdefault("candidate_name", meta.get("candidate_name") or first.get("candidate_name",""))
-    meta.setdefault("email", meta.get("email") or (first.get("metadata") or {}).get("email",""))
-    section = obj.get("section") or meta.get("section") or f"section{i}"
-    chunk_index = obj.get("chunk_index") or i
-    vid = build_vector_id(candidate_id, chunk_index, section)
-    text = (obj.get("chunk_text") or obj.get("text") or obj.get("full_text") or "").strip()
-    if not text:
-        print("Skipping empty chunk:", vid)
-        continue
-    meta["candidate_id"] = candidate_id
-    meta["section"] = section
-    meta["source_file"] = meta.get("source_file") or Path(INPUT_FILE).name
-    meta["version"] = meta.get("version", 1)
-    meta["updated_at"] = datetime.now().isoformat()
-    normalized.append({"id": vid, "text": text, "metadata": meta})
-
-if not normalized:
-    print("No chunks to ingest after normalization.")
-    sys.exit(0)
-
-print(f"Prepared {len(normalized)} chunks for {candidate_id}")
+def load_chunks(path):
+    """Parse + normalize one chunk-list JSON file -> (candidate_id, [{'id','text','metadata'}, ...])."""
+    # load file with utf-8-sig
+    if not Path(path).exists():
+        raise ValueError(f"Input file not found: {path}")
+
+    with open(path, "r", encoding="utf-8-sig") as fh:
+        raw = json.load(fh)
+
+    if not isinstance(raw, list):
+        raise ValueError(f"input JSON must be a list of chunk objects: {path}")
+
+    first = raw[0] if raw else {}
+    seed_obj = {"metadata": {"candidate_name": first.get("candidate_name") or (first.get("metadata") or {}).get("candidate_name"), "email": (first.get("metadata") or {}).get("email")}, "full_text": first.get("full_text") or json.dumps(raw, sort_keys=True)}
+    candidate_id = deterministic_candidate_id(seed_obj, ID_METHOD)
+    print(f"Candidate ID: {candidate_id}  (method={ID_METHOD})")
+
+    # normalize
+    normalized = []
+    for i,obj in enumerate(raw, start=1):
+        meta = (obj.get("metadata") or {}).copy()
+        meta.setdefault("candidate_name", meta.get("candidate_name") or first.get("candidate_name",""))
+        meta.setdefault("email", meta.get("email") or (first.get("metadata") or {}).get("email",""))
+        section = obj.get("section") or meta.get("section") or f"section{i}"
+        chunk_index = obj.get("chunk_index") or i
+        vid = build_vector_id(candidate_id, chunk_index, section)
+        text = (obj.get("chunk_text") or obj.get("text") or obj.get("full_text") or "").strip()
+        if not text:
+            print("Skipping empty chunk:", vid)
+            continue
+        meta["candidate_id"] = candidate_id
+        meta["section"] = section
+        meta["source_file"] = meta.get("source_file") or Path(path).name
+        meta["version"] = meta.get("version", 1)
+        meta["updated_at"] = datetime.now().isoformat()
+        normalized.append({"id": vid, "text": text, "metadata": meta})
+    return candidate_id, normalized
+
+# bump PROMPT_VERSION for semantic prompt changes; edits to the template text change the
+# fingerprint on their own, so notes cached for an older prompt are never reused
+PROMPT_VERSION = "v1"
 
 def make_prompt(section, text):
     sec = (section or "SECTION").upper().replace(" ", "_")
     return f"You are a resume summarizer. Produce a short one-line NOTE summarizing this section.\nSECTION: {sec}\n\nTEXT:\n{text}\n\nOutput: {sec}: <one-line summary>"
 
+NOTE_PROMPT_VERSION = f"{PROMPT_VERSION}:{prompt_fingerprint(make_prompt)}"
+note_cache = get_note_cache()
+if note_cache and args.purge_stale_notes:
+    print(f"Purged {note_cache.purge(NOTE_PROMPT_VERSION, SUMM_MODEL)} stale cached notes")
+
+def _create_note_response(prompt):
+    """responses.create under the shared call controller (rate limits, adaptive concurrency, retries)."""
+    return call_openai(notes_calls, client.responses, tokens=len(prompt) // 4 + NOTE_MAX_OUTPUT_TOKENS,
+                       model=SUMM_MODEL, input=prompt)
+
+def _model_note(it):
+    """Raw note text from the model ("" when the call fails)."""
+    prompt = make_prompt(it["metadata"].get("section"), it["text"])
+    try:
+        resp = _create_note_response(prompt)
+        note_text = getattr(resp, "output_text", None) or ""
+        if not note_text and hasattr(resp, "output") and isinstance(resp.output, list) and resp.output:
+            piece = resp.output[0]
+            if isinstance(piece, dict):
+                for c in piece.get("content", []):
+                    if isinstance(c, str):
+                        note_text += c
+                    elif isinstance(c, dict) and "text" in c:
+                        note_text += c["text"]
+        note_text = note_text.strip()
+    except Exception as e:
+        print("Notes error:", e, file=sys.stderr)
+        note_text = ""
+    return note_text
+
+def _finish_note(it, note_text):
+    # ensure starts with SECTION_NAME:
+    sec_label = (it["metadata"].get("section","SECTION")).upper().replace(" ", "_")
+    if not note_text:
+        text = it["text"].replace("\n", " ")
+        snippet = " ".join(text.split())[:240]
+        note_text = f"{sec_label}: {snippet}"
+    elif not note_text.upper().startswith(sec_label + ":"):
+        note_text = sec_label + ": " + note_text
+    return note_text
+
+def gen_note(it):
+    """One-line note for a chunk; falls back to a text snippet when the call fails."""
+    return _finish_note(it, _model_note(it))
+
 def gen_notes(items):
     out = []
     if not client:
@@ -140,40 +229,39 @@ def gen_notes(items):
             out.append(f"{sec_label}: {snippet}")
         return out
 
-    for it in items:
-        prompt = make_prompt(it["metadata"].get("section"), it["text"])
-        try:
-            resp = client.responses.create(model=SUMM_MODEL, input=prompt)
-            note_text = getattr(resp, "output_text", None) or ""
-            if not note_text and hasattr(resp, "output") and isinstance(resp.output, list) and resp.output:
-                piece = resp.output[0]
-                if isinstance(piece, dict):
-                    for c in piece.get("content", []):
-                        if isinstance(c, str):
-                            note_text += c
-                        elif isinstance(c, dict) and "text" in c:
-                            note_text += c["text"]
-            note_text = note_text.strip()
-        except Exception as e:
-            print("Notes error:", e, file=sys.stderr)
-            note_text = ""
-        # ensure starts with SECTION_NAME:
-        sec_label = (it["metadata"].get("section","SECTION")).upper().replace(" ", "_")
-        if not note_text:
-            text = it["text"].replace("\n", " ")
-            snippet = " ".join(text.split())[:240]
-            note_text = f"{sec_label}: {snippet}"
-        elif not note_text.upper().startswith(sec_label + ":"):
-            note_text = sec_label + ": " + note_text
-        out.append(note_text)
+    # cached notes first: (summ model, prompt version, section, text hash)
+    keys = [(it["metadata"].get("section") or "", it["text"]) for it in items]
+    out = note_cache.get_many(SUMM_MODEL, NOTE_PROMPT_VERSION, keys) if note_cache else [None] * len(items)
+    todo = [i for i, n in enumerate(out) if n is None]
+    if not todo:
+        return out
+
+    # concurrent calls, bounded by NOTES_WORKERS and the rate limiter; map() keeps input order
+    with ThreadPoolExecutor(max_workers=min(NOTES_WORKERS, len(todo))) as pool:
+        raw = list(pool.map(_model_note, [items[i] for i in todo]))
+    fresh = []
+    for i, note_text in zip(todo, raw):
+        out[i] = _finish_note(items[i], note_text)
+        if note_text:  # snippet fallbacks are not cached
+            fresh.append((keys[i][0], keys[i][1], out[i]))
+    if note_cache:
+        note_cache.put_many(SUMM_MODEL, NOTE_PROMPT_VERSION, fresh)
     return out
 
-# embed helper
+# embed helper (served from the on-disk embedding cache where possible; misses are
+# packed into token-budgeted requests, oversize chunks split instead of failing)
+def _embed_request(texts):
+    emb_resp = call_openai(embed_calls, client.embeddings, tokens=sum(len(t) for t in texts) // 4,
+                           model=EMB_MODEL, input=texts)
+    return [r.embedding for r in emb_resp.data]
+
+def _embed_api(texts):
+    return embed_packed(texts, _embed_request, model=EMB_MODEL)
+
 def embed_texts(texts):
     try:
-        emb_resp = client.embeddings.create(model=EMB_MODEL, input=texts) if client else None
-        if emb_resp:
-            return [r.embedding for r in emb_resp.data]
+        if client:
+            return embed_with_cache(get_cache(), EMB_MODEL, 0, texts, _embed_api)
         else:
             # placeholder zeros if OpenAI not enabled (avoid upsert of None)
             return [[0.0]*1536 for _ in texts]  # note: dimension depends on model; replace as needed
@@ -181,29 +269,265 @@ def embed_texts(texts):
         print("Embedding failed:", e, file=sys.stderr)
         raise
 
-# batch process
-i = 0
-total = len(normalized)
-while i < total:
-    batch = normalized[i:i+BATCH_SIZE]
-    print(f"Processing batch {i//BATCH_SIZE+1}: items {i+1}-{i+len(batch)} / {total}")
+# -------------------- Pipeline stages --------------------
+# parse -> notes -> embed -> upsert run concurrently with bounded queues in between;
+# a full queue blocks the stage before it (backpressure), so throughput follows the
+# slowest remote API instead of the sum of all of them.
+FILE_STATUS = {}  # path -> {'candidate_id', 'chunks', 'uploaded', 'error', 'ids', 'skipped'}
+MANIFEST = None if args.manifest.lower() == "off" else IngestManifest(args.manifest, scope=f"upload_to_pinecone:{INDEX_NAME}:{NAMESPACE}")
+# besides the embedding model, these change what a file's vectors look like
+MANIFEST_CONFIG = f"id_method={ID_METHOD},summ_model={SUMM_MODEL},prompt={NOTE_PROMPT_VERSION}"
+
+DEDUP = get_dedup_index() if args.dedup != "off" else None
+# resumes of this run, so duplicates inside one batch are caught before any of them is in DEDUP
+RUN_DEDUP = DedupIndex(":memory:") if DEDUP else None
+
+def _status(candidate_id="", chunks=0, error="", skipped=False, duplicate_of=""):
+    return {"candidate_id": candidate_id, "chunks": chunks, "uploaded": 0, "error": error, "ids": [],
+            "skipped": skipped, "duplicate_of": duplicate_of, "dedup_sig": None}
+
+def check_duplicate(path, candidate_id, normalized):
+    """
+    Look the resume up in the near-duplicate index (and among this run's files) before
+    anything is embedded. Returns (candidate_id to use, existing candidate_id it duplicates
+    or "", signature to add to DEDUP once the upload succeeded or None).
+    A hit from the same source file is a re-ingest of an edited file, not a duplicate.
+    """
+    source = os.path.abspath(path)
+    sig = signature(resume_text(normalized))
+    if sig is None:
+        return candidate_id, "", None
+    hit = DEDUP.match(sig, exclude=candidate_id)
+    if hit and hit[2] == source and args.dedup != "map":
+        hit = None  # the index follows the new id; the old id's vectors become manifest orphans
+    hit = hit or RUN_DEDUP.match_or_add(candidate_id, sig, source=source)
+    if not hit:
+        return candidate_id, "", sig
+    dup_id, sim, dup_source = hit
+    if args.dedup == "map":
+        print(f"Near-duplicate of {dup_id} (similarity {sim:.2f}): using its candidate_id for {path}")
+        return dup_id, "", None
+    print(f"Near-duplicate of {dup_id} (similarity {sim:.2f}, {dup_source or 'unknown source'}): {path}")
+    return candidate_id, dup_id, None
+
+def parse_stage(path):
+    try:
+        if MANIFEST and MANIFEST.unchanged(path, EMB_MODEL, MANIFEST_CONFIG):
+            print("Unchanged since last ingest, skipping:", path)
+            FILE_STATUS[path] = _status(skipped=True)
+            return []
+        candidate_id, normalized = load_chunks(path)
+    except Exception as e:
+        print("ERROR:", e, file=sys.stderr)
+        FILE_STATUS[path] = _status(error=str(e))
+        return []
+    if not normalized:
+        FILE_STATUS[path] = _status(candidate_id)
+        print("No chunks to ingest after normalization.")
+        return []
+    duplicate_of, sig = "", None
+    if DEDUP:
+        try:
+            mapped_id, duplicate_of, sig = check_duplicate(path, candidate_id, normalized)
+        except Exception as e:
+            print("WARNING: duplicate check failed:", e, file=sys.stderr)
+            mapped_id = candidate_id
+        if duplicate_of and args.dedup == "skip":
+            FILE_STATUS[path] = _status(candidate_id, skipped=True, duplicate_of=duplicate_of)
+            return []
+        if mapped_id != candidate_id:
+            for it in normalized:
+                it["id"] = mapped_id + it["id"][len(candidate_id):]
+                it["metadata"]["candidate_id"] = mapped_id
+            candidate_id = mapped_id
+        if duplicate_of:
+            for it in normalized:
+                it["metadata"]["duplicate_of"] = duplicate_of
+    FILE_STATUS[path] = _status(candidate_id, len(normalized), duplicate_of=duplicate_of)
+    FILE_STATUS[path]["dedup_sig"] = sig
+    print(f"Prepared {len(normalized)} chunks for {candidate_id}")
+    for it in normalized:
+        it["file"] = path
+    return normalized
+
+class Batcher:
+    """Regroups chunks of consecutive files into BATCH_SIZE batches (single worker)."""
+    def __init__(self):
+        self.pending = []
+        self.count = 0
+
+    def _job(self, items):
+        self.count += 1
+        return {"no": self.count, "items": items}
+
+    def add(self, items):
+        self.pending.extend(items)
+        jobs = []
+        while len(self.pending) >= BATCH_SIZE:
+            jobs.append(self._job(self.pending[:BATCH_SIZE]))
+            self.pending = self.pending[BATCH_SIZE:]
+        return jobs
+
+    def flush(self):
+        jobs = [self._job(self.pending)] if self.pending else []
+        self.pending = []
+        return jobs
+
+def guarded(fn):
+    """A failed batch is marked (and skipped by later stages) instead of stopping the whole run."""
+    def run(job):
+        if job.get("error"):
+            return job
+        try:
+            return fn(job)
+        except Exception as e:
+            print(f"ERROR in batch {job['no']}:", e, file=sys.stderr)
+            job["error"] = str(e)
+            return job
+    return run
+
+def notes_stage(job):
+    batch = job["items"]
+    n_files = len({it["file"] for it in batch})
+    print(f"Processing batch {job['no']}: {len(batch)} items from {n_files} file(s)")
     notes = gen_notes(batch)
     for it,n in zip(batch, notes):
         it["metadata"]["notes"] = n
-    texts = [b["text"] for b in batch]
-    embeddings = embed_texts(texts)
+    return job
+
+def embed_stage(job):
+    batch = job["items"]
+    embeddings = embed_texts([b["text"] for b in batch])
     if len(embeddings) != len(batch):
-        print("Embedding length mismatch", file=sys.stderr); sys.exit(1)
+        raise RuntimeError("Embedding length mismatch")
+    job["embeddings"] = embeddings
+    return job
+
+def upsert_stage(job):
     upsert_tuples = []
-    for it,vec in zip(batch, embeddings):
+    for it,vec in zip(job["items"], job.pop("embeddings")):
         upsert_tuples.append((it["id"], vec, sanitize_meta(it["metadata"])))
     try:
-        index.upsert(vectors=upsert_tuples, namespace=NAMESPACE)
-        print("Upserted", len(upsert_tuples), "vectors.")
+        upsert_vectors(index, upsert_tuples, NAMESPACE, batch_size=BATCH_SIZE)
+    except Exception as e:
+        raise RuntimeError(f"Pinecone upsert failed: {e}") from e
+    print("Upserted", len(upsert_tuples), "vectors.")
+    return job
+
+def ingest(paths):
+    """Run files through the pipeline; per-file results end up in FILE_STATUS."""
+    def record(job):
+        for it in job["items"]:
+            st = FILE_STATUS[it["file"]]
+            if job.get("error"):
+                st["error"] = st["error"] or job["error"]
+            else:
+                st["uploaded"] += 1
+                st["ids"].append(it["id"])
+    batcher = Batcher()
+    stats = run_pipeline(paths, [
+        Stage("parse", parse_stage, workers=STAGE_WORKERS, queue_size=PIPELINE_QUEUE),
+        Stage("batch", batcher.add, workers=1, queue_size=PIPELINE_QUEUE, expand=True, flush=batcher.flush),
+        Stage("notes", guarded(notes_stage), workers=STAGE_WORKERS, queue_size=PIPELINE_QUEUE),
+        Stage("embed", guarded(embed_stage), workers=STAGE_WORKERS, queue_size=PIPELINE_QUEUE),
+        Stage("upsert", guarded(upsert_stage), workers=STAGE_WORKERS, queue_size=PIPELINE_QUEUE),
+    ], sink=record)
+    print("Pipeline stages:")
+    print_stage_stats(stats)
+    return FILE_STATUS
+
+def resolve_inputs(spec):
+    """A directory (its *.json files) or a glob pattern -> sorted file list."""
+    if Path(spec).is_dir():
+        return sorted(str(p) for p in Path(spec).glob("*.json"))
+    return sorted(p for p in glob.glob(spec, recursive=True) if Path(p).is_file())
+
+paths = [INPUT_FILE] if INPUT_FILE else resolve_inputs(INPUT_DIR)
+if not paths:
+    print("ERROR: no input files match", INPUT_DIR, file=sys.stderr); sys.exit(1)
+if INPUT_DIR:
+    print(f"Bulk mode: {len(paths)} files, {STAGE_WORKERS} workers per stage")
+
+try:
+    status = ingest(paths)
+except Exception as e:
+    print("ERROR:", e, file=sys.stderr)
+    sys.exit(1)
+
+def index_uploaded(status):
+    """Add fully uploaded resumes to the near-duplicate index (a failed upload must not shadow its retry)."""
+    for path, st in status.items():
+        if st.get("dedup_sig") is not None and not st["error"] and st["uploaded"] == st["chunks"]:
+            DEDUP.add(st["candidate_id"], st["dedup_sig"], source=os.path.abspath(path))
+
+def candidate_of_id(vid):
+    return re.sub(r"_chunk\d+_.*$", "", vid)
+
+def sync_manifest(status):
+    """
+    Record fully uploaded files; delete ids of removed files and ids changed files no longer
+    produce, unless another file in the manifest still produces them.
+    """
+    candidates = []
+    for path, st in status.items():
+        if not st["skipped"] and not st["error"] and st["uploaded"] == st["chunks"]:
+            candidates.extend(MANIFEST.record(path, st["ids"], EMB_MODEL, MANIFEST_CONFIG))
+    gone = {}
+    if INPUT_DIR:
+        if Path(INPUT_DIR).is_dir():
+            within = under_dir(INPUT_DIR)
+        else:
+            pattern = os.path.abspath(INPUT_DIR)
+            within = lambda k: fnmatch.fnmatch(k, pattern)
+        gone = MANIFEST.vanished(paths, within=within)
+        candidates.extend(MANIFEST.release(gone))
+    orphans = MANIFEST.unowned(candidates)  # after all records / releases: ids no remaining file produces
+    if orphans:
+        n = delete_ids(index, orphans, NAMESPACE)
+        print(f"Deleted {n} orphaned vectors ({len(gone)} removed files)")
+    MANIFEST.save()
+    if DEDUP and orphans:
+        # candidates whose vectors are all gone leave the near-duplicate index too
+        live = {candidate_of_id(vid) for e in MANIFEST.entries.values() for vid in (e.get("ids") or [])}
+        for cid in {candidate_of_id(vid) for vid in orphans} - live:
+            DEDUP.forget(cid)
+
+if DEDUP:
+    try:
+        index_uploaded(status)
+    except Exception as e:
+        print("WARNING: near-duplicate index update failed:", e, file=sys.stderr)
+
+if MANIFEST:
+    try:
+        sync_manifest(status)
     except Exception as e:
-        print("Pinecone upsert failed:", e, file=sys.stderr)
+        print("ERROR: manifest update failed:", e, file=sys.stderr)
         sys.exit(1)
-    i += BATCH_SIZE
-    sleep(0.15)
 
-print("SUCCESS: uploaded", len(normalized), "chunks for", candidate_id)
+failed = 0
+if INPUT_DIR:
+    print("\nSummary:")
+for path in paths:
+    st = status.get(path) or _status(error="not processed")
+    ok = not st["error"] and st["uploaded"] == st["chunks"]
+    failed += not ok
+    if st.get("skipped"):
+        if st.get("duplicate_of"):
+            print(f"  SKIPPED {path} (near-duplicate of {st['duplicate_of']})")
+        elif INPUT_DIR:
+            print(f"  SKIPPED {path} (unchanged)")
+    elif ok and not INPUT_DIR:
+        if st["chunks"]:
+            print("SUCCESS: uploaded", st["uploaded"], "chunks for", st["candidate_id"])
+    elif ok:
+        print(f"  OK      {path} -> {st['candidate_id']} chunks={st['uploaded']}")
+    else:
+        print(f"  FAILED  {path} -> {st['candidate_id'] or '-'} uploaded {st['uploaded']}/{st['chunks']}: "
+              f"{st['error'] or 'incomplete'}")
+if INPUT_DIR:
+    skipped = sum(1 for st in status.values() if st.get("skipped"))
+    dups = sum(1 for st in status.values() if st.get("duplicate_of"))
+    print(f"{len(paths) - failed - skipped}/{len(paths)} files uploaded, {skipped} skipped, {dups} near-duplicates")
+if failed:
+    sys.exit(1)
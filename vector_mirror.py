@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+vector_mirror.py
+
+Local mirror of Pinecone namespaces ('Resumes', 'Job_Descriptions') so scoring runs
+can start from disk instead of re-downloading every vector.
+
+Layout (per namespace, under --dir, default .vector_mirror/):
+  <namespace>/vectors.f32   raw float32 rows, opened as a numpy memmap (rows x dim)
+  <namespace>/index.json    dim, row -> id, per-row metadata and sync stamp
+
+Sync is a delta:
+  - ids are listed (paginated) and compared with the mirror
+  - new ids are fetched and appended, ids gone from Pinecone are dropped
+  - vectors re-upserted in place are found with one id-only query filtered on the numeric
+    'updated_ts' stamp that pinecone_io.upsert_vectors writes (>= the previous sync, minus
+    CLOCK_SKEW); only those are fetched and rewritten
+  - --recheck re-fetches every existing id and rewrites those whose stamp changed (for
+    writes that bypass upsert_vectors); sync falls back to it on its own for a mirror
+    without a previous sync stamp or when more than QUERY_MAX_TOP_K vectors changed
+Rows freed by a deletion are reused only after the index.json that frees them is saved, so
+a crash mid-sync never leaves an id pointing at another vector's row.
+
+Usage:
+  python vector_mirror.py sync                         # both namespaces, new/deleted/changed vectors
+  python vector_mirror.py sync --recheck               # re-fetch everything, rewrite what changed
+  python vector_mirror.py sync --namespaces Resumes --rebuild
+  python vector_mirror.py stats
+
+Readers: compute_resume_jd_scores.py / match_candidates_llm_v2.py --from-mirror .vector_mirror
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception as e:
+    raise SystemExit("Missing dependency: numpy. Install with: python -m pip install numpy") from e
+
+from pinecone_io import list_all_ids, fetch_batches, ids_updated_since, FETCH_WORKERS, UPDATED_TS
+
+MIRROR_DIR = ".vector_mirror"
+NAMESPACES = ["Resumes", "Job_Descriptions"]
+GROW_ROWS = 1024  # minimum rows added when the vector file grows
+CLOCK_SKEW = 600  # seconds: writer clocks / index freshness lag tolerated by the updated_ts query
+
+
+def stamp_of(meta: Dict) -> str:
+    """Change marker for a vector: its updated_ts stamp + updated_at / version metadata."""
+    meta = meta or {}
+    return f"{meta.get(UPDATED_TS, '')}|{meta.get('updated_at', '')}|{meta.get('version', '')}"
+
+
+class NamespaceMirror:
+    """One namespace on disk: memmapped float32 rows + a JSON id/metadata index."""
+
+    def __init__(self, root: str, namespace: str):
+        self.namespace = namespace
+        self.dir = Path(root) / namespace
+        self.vec_path = self.dir / "vectors.f32"
+        self.index_path = self.dir / "index.json"
+        self.dim = 0
+        self.row_ids: List[str] = []  # row -> id ("" for a free row)
+        self.metadata: List[Dict] = []
+        self.stamps: List[str] = []
+        self.rows: Dict[str, int] = {}  # id -> row
+        self.free: List[int] = []  # rows free in the saved index.json, reused first
+        self.released: List[int] = []  # rows freed since the last save; not reusable until saved
+        self.synced_at = None
+        self.synced_ts = 0.0  # epoch start of the last sync (for the updated_ts query)
+        if self.index_path.exists():
+            self.load()
+
+    # ---------- persistence ----------
+    def load(self) -> None:
+        with open(self.index_path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        self.dim = int(data.get("dim") or 0)
+        self.row_ids = data.get("ids") or []
+        self.metadata = data.get("metadata") or [{} for _ in self.row_ids]
+        self.stamps = data.get("stamps") or ["" for _ in self.row_ids]
+        self.synced_at = data.get("synced_at")
+        self.synced_ts = float(data.get("synced_ts") or 0.0)
+        self.rows = {vid: r for r, vid in enumerate(self.row_ids) if vid}
+        self.free = [r for r, vid in enumerate(self.row_ids) if not vid]
+
+    def save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"namespace": self.namespace, "dim": self.dim, "synced_at": self.synced_at,
+                       "synced_ts": self.synced_ts, "ids": self.row_ids, "stamps": self.stamps,
+                       "metadata": self.metadata}, fh, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+        self.free.extend(self.released)
+        self.released = []
+
+    def reset(self) -> None:
+        self.dim = 0
+        self.synced_ts = 0.0
+        self.row_ids, self.metadata, self.stamps, self.rows, self.free, self.released = [], [], [], {}, [], []
+        if self.vec_path.exists():
+            self.vec_path.unlink()
+
+    def _capacity(self) -> int:
+        if not self.dim or not self.vec_path.exists():
+            return 0
+        return self.vec_path.stat().st_size // (4 * self.dim)
+
+    def _memmap(self, mode: str = "r"):
+        n = self._capacity()
+        if not n:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self.vec_path, dtype=np.float32, mode=mode, shape=(n, self.dim))
+
+    def _ensure_capacity(self, n_rows: int) -> None:
+        cap = self._capacity()
+        if n_rows <= cap:
+            return
+        new_cap = max(n_rows, cap + GROW_ROWS, int(cap * 1.5))
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.vec_path, "ab") as fh:
+            fh.truncate(new_cap * self.dim * 4)
+
+    # ---------- writes ----------
+    def delete(self, ids: List[str]) -> None:
+        for vid in ids:
+            r = self.rows.pop(vid, None)
+            if r is not None:
+                self.row_ids[r] = ""
+                self.metadata[r] = {}
+                self.stamps[r] = ""
+                self.released.append(r)
+
+    def write(self, entries: Dict[str, Dict]) -> int:
+        """Insert/replace vectors ({id: {'values', 'metadata'}}). Returns rows written."""
+        entries = {vid: e for vid, e in entries.items() if e.get("values")}
+        if not entries:
+            return 0
+        dim = len(next(iter(entries.values()))["values"])
+        if not self.dim:
+            self.dim = dim
+        elif dim != self.dim:
+            raise RuntimeError(f"Namespace '{self.namespace}' has dim {dim} but the mirror has {self.dim}; "
+                               f"re-run with --rebuild")
+        targets = []
+        for vid in entries:
+            if vid in self.rows:
+                targets.append(self.rows[vid])
+            elif self.free:
+                targets.append(self.free.pop())
+            else:
+                self.row_ids.append("")
+                self.metadata.append({})
+                self.stamps.append("")
+                targets.append(len(self.row_ids) - 1)
+        self._ensure_capacity(len(self.row_ids))
+        mm = self._memmap("r+")
+        for r, (vid, e) in zip(targets, entries.items()):
+            mm[r, :] = np.asarray(e["values"][:self.dim], dtype=np.float32)
+            meta = e.get("metadata") or {}
+            self.row_ids[r] = vid
+            self.metadata[r] = meta
+            self.stamps[r] = stamp_of(meta)
+            self.rows[vid] = r
+        mm.flush()
+        del mm
+        return len(entries)
+
+    # ---------- reads ----------
+    def ids(self) -> List[str]:
+        """Live ids, sorted."""
+        return sorted(self.rows)
+
+    def fetch_matrix(self, ids: List[str], dim: int = 0) -> Tuple[List[str], np.ndarray, List[Dict]]:
+        """
+        Same contract as pinecone_io.fetch_matrix, served from disk:
+        (found_ids, float32 matrix rows in id order, metadata list).
+        """
+        found = [vid for vid in dict.fromkeys(ids) if vid in self.rows]
+        dim = dim or self.dim
+        mat = np.zeros((len(found), dim), dtype=np.float32)
+        if found:
+            rows = np.fromiter((self.rows[vid] for vid in found), dtype=np.int64, count=len(found))
+            n = min(dim, self.dim)
+            mat[:, :n] = self._memmap("r")[rows, :n]
+        return found, mat, [self.metadata[self.rows[vid]] for vid in found]
+
+    def fetch_vectors(self, ids: List[str]) -> Dict[str, Dict]:
+        """id -> {'values': [...], 'metadata': {...}} for ids present in the mirror."""
+        found, mat, metas = self.fetch_matrix(ids)
+        return {vid: {"values": mat[i].tolist(), "metadata": metas[i]} for i, vid in enumerate(found)}
+
+    # ---------- sync ----------
+    def updated_ids(self, index) -> Optional[List[str]]:
+        """Ids re-upserted since the last sync (updated_ts query); None when unknown (first sync, saturated)."""
+        if not self.synced_ts or not self.dim:
+            return None
+        return ids_updated_since(index, self.namespace, self.synced_ts - CLOCK_SKEW, self.dim)
+
+    def sync(self, index, recheck: bool = False, workers: int = FETCH_WORKERS) -> Dict[str, int]:
+        started = time.time()
+        remote = list_all_ids(index, self.namespace)
+        remote_set = set(remote)
+        gone = [vid for vid in self.rows if vid not in remote_set]
+        new = [vid for vid in remote if vid not in self.rows]
+        existing = [vid for vid in remote if vid in self.rows]
+        if not recheck and existing:
+            updated = self.updated_ids(index)
+            if updated is not None:
+                updated = set(updated)
+                existing = [vid for vid in existing if vid in updated]
+            elif self.synced_ts:
+                print(f"{self.namespace}: too many updated vectors for one query, re-checking all", file=sys.stderr)
+        self.delete(gone)
+
+        added = changed = 0
+        for _, part in fetch_batches(index, new, self.namespace, workers=workers):
+            added += self.write(part)
+        for _, part in fetch_batches(index, existing, self.namespace, workers=workers):
+            stale = {vid: e for vid, e in part.items()
+                     if stamp_of(e.get("metadata")) != self.stamps[self.rows[vid]]}
+            changed += self.write(stale)
+        self.synced_at = datetime.now().isoformat()
+        self.synced_ts = started
+        self.save()
+        return {"listed": len(remote), "added": added, "changed": changed, "deleted": len(gone)}
+
+
+# -------------------- CLI --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Sync/inspect the local memory-mapped vector mirror.")
+    parser.add_argument("command", choices=["sync", "stats"])
+    parser.add_argument("--dir", default=MIRROR_DIR, help="Mirror directory")
+    parser.add_argument("--namespaces", nargs="+", default=NAMESPACES)
+    parser.add_argument("--index", default=os.environ.get("PINECONE_INDEX"), help="Pinecone index name (or env)")
+    parser.add_argument("--recheck", action="store_true",
+                        help="Re-fetch all existing ids (not only updated_ts hits) and rewrite those that changed")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the local copy and pull everything")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="Concurrent fetch requests")
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        for ns in args.namespaces:
+            m = NamespaceMirror(args.dir, ns)
+            print(f"{ns:20} vectors={len(m.rows)} dim={m.dim} synced_at={m.synced_at}")
+        return
+
+    api_key = os.environ.get("PINECONE_API_KEY")
+    if not api_key or not args.index:
+        print("ERROR: PINECONE_API_KEY and PINECONE_INDEX (or --index) must be set.", file=sys.stderr)
+        sys.exit(2)
+    from pinecone import Pinecone
+    from pinecone_io import open_index
+    index = open_index(Pinecone(api_key=api_key), args.index, pool_threads=args.workers)
+
+    for ns in args.namespaces:
+        m = NamespaceMirror(args.dir, ns)
+        if args.rebuild:
+            m.reset()
+        stats = m.sync(index, recheck=args.recheck, workers=args.workers)
+        print(f"{ns}: listed={stats['listed']} added={stats['added']} changed={stats['changed']} "
+              f"deleted={stats['deleted']} -> {len(m.rows)} vectors in {m.dir}")
+
+
+if __name__ == "__main__":
+    main()